@@ -0,0 +1,212 @@
+"""
+asyncio-native API for WhatsApp Bulk Sender.
+
+AsyncWhatsAppBulkSender runs campaigns on an event loop instead of blocking
+the calling thread: rate-limit waits are asyncio sleeps, every session is a
+task, and several messages per session can be in flight at once. Cancelling
+the task running send_bulk() stops the campaign mid-way.
+
+Contacts are read from their source in a worker thread, a batch at a time,
+so file parsing and journal and suppression lookups never block the loop.
+"""
+
+import asyncio
+import itertools
+import logging
+import time
+from collections import deque
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Iterator, Optional
+
+from whatsapp_bulk_sender import WhatsAppBulkSender
+from campaign_journal import CampaignJournal
+from retry import DeadLetterFile
+from result_log import ResultLog
+from send_scheduler import monotonic_deadline, next_occurrence
+from sessions import SenderSession
+
+
+# Contacts read from the source per worker-thread call
+FEED_BATCH_SIZE = 64
+
+
+class AsyncContactFeed:
+    """
+    Lets the session tasks of a campaign share one contact iterator without
+    running it on the event loop: contacts are read in a worker thread,
+    FEED_BATCH_SIZE at a time, and each is handed to exactly one task.
+    """
+
+    def __init__(self, contacts: Iterator[Dict], batch_size: int = FEED_BATCH_SIZE):
+        self._contacts = contacts
+        self.batch_size = batch_size
+        self._buffer = deque()
+        self._exhausted = False
+        self._lock = asyncio.Lock()
+
+    async def next(self) -> Optional[Dict]:
+        """Next contact, or None when the feed is exhausted."""
+        async with self._lock:
+            if not self._buffer and not self._exhausted:
+                batch = await asyncio.to_thread(list, itertools.islice(self._contacts, self.batch_size))
+                self._buffer.extend(batch)
+                self._exhausted = len(batch) < self.batch_size
+            return self._buffer.popleft() if self._buffer else None
+
+
+class AsyncWhatsAppBulkSender(WhatsAppBulkSender):
+    """
+    WhatsAppBulkSender with async send_bulk() and send_single().
+    Loading contacts, sessions, journals and rate limits work exactly as in
+    the blocking sender.
+    """
+
+    async def send_bulk(self, contacts: Iterable[Dict], default_message: str = "",
+                        start_hour: int = None, start_minute: int = None,
+                        journal: Optional[CampaignJournal] = None, max_in_flight: int = 1,
+                        dedupe: bool = True, dead_letter: Optional[DeadLetterFile] = None,
+                        progress: Optional[Callable[[Dict, Dict, str], None]] = None,
+                        result_log: Optional[ResultLog] = None) -> Dict:
+        """
+        Send bulk messages to a list of contacts without blocking the event loop.
+
+        Args:
+            contacts: Contact dictionaries (a list or any iterable)
+            default_message: Default message to send if contact doesn't have specific message
+            start_hour: Hour to start sending (24-hour format)
+            start_minute: Minute to start sending
+            journal: Optional campaign journal; contacts it marks as delivered are skipped
+            max_in_flight: Messages each session may have in flight at the same time
+            dedupe: Drop contacts whose phone number already appeared in this campaign
+            dead_letter: Optional file that contacts are written to once they finally fail
+            progress: Called as progress(results, contact, outcome) after every send attempt
+            result_log: Optional columnar log that every send attempt is recorded in
+        """
+        results = self._new_results()
+        start_at = self._campaign_start(contacts, start_hour, start_minute)
+
+        # All session tasks pull from the same feed
+        pending = AsyncContactFeed(self._pending_contacts(contacts, journal, results, dedupe))
+        self.metrics.campaigns_running.inc()
+        try:
+            await asyncio.sleep(max(0.0, start_at - time.monotonic()))
+            await asyncio.gather(*(
+                self._run_session_async(session, pending, default_message, results, journal, max_in_flight,
+                                        dead_letter, progress, result_log)
+                for session in self.sessions
+            ))
+        except asyncio.CancelledError:
+            logging.warning(f"Bulk sending cancelled. Success: {results['success']}, Failed: {results['failed']}")
+            raise
+        finally:
+            self.metrics.campaigns_running.dec()
+            if journal is not None:
+                journal.flush()
+            if result_log is not None:
+                result_log.flush()
+
+        self._log_completion(results)
+        return results
+
+    async def _run_session_async(self, session: SenderSession, pending: AsyncContactFeed, default_message: str,
+                                 results: Dict, journal: Optional[CampaignJournal], max_in_flight: int,
+                                 dead_letter: Optional[DeadLetterFile] = None,
+                                 progress: Optional[Callable[[Dict, Dict, str], None]] = None,
+                                 result_log: Optional[ResultLog] = None):
+        """
+        Dispatch contacts through one session until the iterator is exhausted
+        and no retries are pending.
+        """
+        slots = asyncio.Semaphore(max_in_flight)
+        in_flight = set()
+        retries = set()
+
+        def finished(task):
+            in_flight.discard(task)
+            slots.release()
+
+        async def dispatch(contact: Dict, attempt: int = 1, scheduled_at: Optional[float] = None):
+            scheduled_at = scheduled_at or time.time()
+            await slots.acquire()
+
+            # Wait for a send slot to avoid being blocked
+            wait = session.rate_limiter.reserve()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self.metrics.schedule_wait_seconds.observe(wait, session=session.name)
+
+            task = asyncio.create_task(self._send_contact_async(
+                session, contact, default_message, results, journal, attempt, requeue, dead_letter, result_log,
+                scheduled_at
+            ))
+            in_flight.add(task)
+            task.add_done_callback(finished)
+            if progress is not None:
+                def report(task):
+                    if not task.cancelled() and task.exception() is None:
+                        progress(results, contact, task.result())
+                task.add_done_callback(report)
+
+        async def retry_later(contact: Dict, attempt: int, delay: float):
+            scheduled_at = time.time() + delay
+            await asyncio.sleep(delay)
+            await dispatch(contact, attempt, scheduled_at)
+
+        # Retries wait in their own tasks, so new contacts keep flowing meanwhile
+        def requeue(contact: Dict, attempt: int, delay: float):
+            task = asyncio.create_task(retry_later(contact, attempt, delay))
+            retries.add(task)
+            task.add_done_callback(retries.discard)
+
+        try:
+            while True:
+                contact = await pending.next()
+                if contact is None:
+                    break
+                await dispatch(contact)
+
+            while in_flight or retries:
+                await asyncio.gather(*in_flight, *retries)
+        finally:
+            for task in in_flight | retries:
+                task.cancel()
+
+    async def _send_contact_async(self, session: SenderSession, contact: Dict, default_message: str,
+                                  results: Dict, journal: Optional[CampaignJournal] = None, attempt: int = 1,
+                                  requeue=None, dead_letter: Optional[DeadLetterFile] = None,
+                                  result_log: Optional[ResultLog] = None, scheduled_at: Optional[float] = None) -> str:
+        """
+        Send one message through a session and record the outcome in results.
+        Returns the outcome: SENT, RETRY or FAILED.
+        """
+        with self._attempt(session, contact, default_message, results, journal, attempt, requeue, dead_letter,
+                           result_log, scheduled_at) as record:
+            message = self._render_message(contact, default_message)
+            record.sending()
+            with self.metrics.send_seconds.time(session=session.name):
+                await session.transport.send_async(contact['phone'], message)
+        return record.outcome
+
+    async def send_single(self, phone: str, message: str, hour: int = None, minute: int = None) -> bool:
+        """
+        Send a single message to a phone number.
+        """
+        try:
+            phone = self._format_phone_number(phone)
+
+            # Send immediately unless a time is given
+            if hour is not None and minute is not None:
+                send_time = next_occurrence(hour, minute)
+                logging.info(f"Waiting until {send_time:%Y-%m-%d %H:%M:%S} to message {phone}")
+                await asyncio.sleep(max(0.0, monotonic_deadline(send_time) - time.monotonic()))
+
+            logging.info(f"Sending message to {phone} at {datetime.now():%H:%M:%S}")
+
+            await self.transport.send_async(phone, message)
+
+            logging.info(f"Message sent successfully to {phone}")
+            return True
+
+        except Exception as e:
+            logging.error(f"Failed to send message to {phone}: {e}")
+            return False
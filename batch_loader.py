@@ -0,0 +1,124 @@
+"""
+Parallel loading of many contact files for WhatsApp Bulk Sender.
+
+Campaigns assembled from many CSV and Excel exports are loaded with a
+process pool: every file is parsed and its phone numbers normalized in a
+worker process, so openpyxl's single-core Excel parsing runs on all cores.
+The parent merges the files in order into one contact stream and drops
+numbers already seen in an earlier file.
+"""
+
+import glob
+import itertools
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING, Iterable, List, Optional, Tuple, Union
+
+from phone_numbers import PhoneNormalizer
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+CONTACT_EXTENSIONS = ('.csv', '.xlsx', '.xlsm', '.xls')
+
+
+def expand_sources(sources: Union[str, Iterable[str]]) -> List[str]:
+    """
+    Contact files for a list of sources, each a file, a directory (its
+    contact files, non-recursively) or a glob pattern such as
+    'exports/**/*.xlsx'. Files are returned in a stable, sorted order per
+    source, without repeats.
+    """
+    if isinstance(sources, str):
+        sources = [sources]
+
+    files = []
+    for source in sources:
+        if os.path.isdir(source):
+            matches = sorted(os.path.join(source, name) for name in os.listdir(source))
+        elif glob.has_magic(source):
+            matches = sorted(glob.glob(source, recursive=True))
+        elif os.path.exists(source):
+            files.append(source)
+            continue
+        else:
+            raise FileNotFoundError(f"No such file or directory: {source}")
+        files.extend(path for path in matches
+                     if os.path.isfile(path) and path.lower().endswith(CONTACT_EXTENSIONS))
+
+    seen = set()
+    unique = []
+    for path in files:
+        key = os.path.abspath(path)
+        if key not in seen:
+            seen.add(key)
+            unique.append(path)
+    return unique
+
+
+def file_source(path: str) -> str:
+    """'excel' or 'csv', by file extension"""
+    return 'csv' if path.lower().endswith('.csv') else 'excel'
+
+
+def load_file(path: str, sheet_name: str = 'Sheet1', country_code: Optional[str] = None,
+              dedupe: bool = True) -> Tuple[Optional['pd.DataFrame'], float, Optional[str]]:
+    """
+    Read one contacts file and normalize its phone column; runs in a worker
+    process. Returns (DataFrame or None, seconds taken, error message or None).
+    """
+    import pandas as pd
+
+    started = time.perf_counter()
+    try:
+        if file_source(path) == 'csv':
+            df = pd.read_csv(path, dtype={'phone': str})
+        else:
+            df = pd.read_excel(path, sheet_name=sheet_name, dtype={'phone': str})
+        if 'phone' not in df.columns:
+            raise ValueError("no 'phone' column")
+
+        df['phone'] = PhoneNormalizer(country_code).normalize_series(df['phone'])
+        if dedupe:
+            # Dropping repeats here keeps them out of the data sent back to the parent
+            df = df[~df['phone'].duplicated()]
+        return df, time.perf_counter() - started, None
+    except Exception as e:
+        return None, time.perf_counter() - started, str(e)
+
+
+def load_files(files: List[str], sheet_name: str = 'Sheet1', country_code: Optional[str] = None,
+               workers: Optional[int] = None, dedupe: bool = True):
+    """
+    Yield (path, DataFrame or None, seconds, error) for every file, in order,
+    parsing up to `workers` files at once in separate processes (one per
+    CPU by default). Only a couple of parsed files per worker are held
+    ahead of the consumer.
+    """
+    workers = min(workers or os.cpu_count() or 1, len(files)) or 1
+    if workers == 1:
+        for path in files:
+            yield (path, *load_file(path, sheet_name, country_code, dedupe))
+        return
+
+    logging.info(f"Loading {len(files)} contact files with {workers} processes")
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        remaining = iter(files)
+        try:
+            for path in itertools.islice(remaining, workers * 2):
+                pending.append((path, pool.submit(load_file, path, sheet_name, country_code, dedupe)))
+            while pending:
+                path, future = pending.popleft()
+                next_path = next(remaining, None)
+                if next_path is not None:
+                    pending.append((next_path, pool.submit(load_file, next_path, sheet_name, country_code,
+                                                           dedupe)))
+                yield (path, *future.result())
+        finally:
+            for _, future in pending:
+                future.cancel()
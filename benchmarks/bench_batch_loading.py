@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Benchmark: loading many contact files in one process vs a process pool
+
+Generates a directory of CSV and Excel files and times
+iter_contacts_from_files() with one worker and with one worker per CPU.
+
+Usage:
+    python benchmarks/bench_batch_loading.py [--files 16] [--rows 20000] [--excel-share 0.5]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import pandas as pd
+
+from whatsapp_bulk_sender import WhatsAppBulkSender
+from transports import FakeTransport
+
+
+def write_files(directory, files, rows, excel_share):
+    """Write `files` contact files, roughly excel_share of them as .xlsx"""
+    excel_files = round(files * excel_share)
+    for i in range(files):
+        df = pd.DataFrame({
+            'phone': [f"{9000000000 + i * rows + j}" for j in range(rows)],
+            'name': [f"Contact {j}" for j in range(rows)],
+            'message': 'Hello {name}!'
+        })
+        if i < excel_files:
+            df.to_excel(os.path.join(directory, f'contacts_{i:03d}.xlsx'), index=False)
+        else:
+            df.to_csv(os.path.join(directory, f'contacts_{i:03d}.csv'), index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Multi-file contact loading benchmark')
+    parser.add_argument('--files', type=int, default=16, help='Number of files')
+    parser.add_argument('--rows', type=int, default=20000, help='Contacts per file')
+    parser.add_argument('--excel-share', type=float, default=0.5, help='Fraction of files written as Excel')
+    args = parser.parse_args()
+
+    sender = WhatsAppBulkSender(transport=FakeTransport(), message_delay=0)
+    cpus = os.cpu_count() or 1
+
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"📝 Writing {args.files} files with {args.rows} contacts each...")
+        write_files(directory, args.files, args.rows, args.excel_share)
+
+        timings = {}
+        for workers in sorted({1, cpus}):
+            start = time.perf_counter()
+            count = sum(1 for _ in sender.iter_contacts_from_files(directory, workers=workers))
+            timings[workers] = time.perf_counter() - start
+            print(f"  {workers:3d} worker(s): {timings[workers]:7.2f}s  ({count / timings[workers]:,.0f} contacts/s)")
+
+        if cpus > 1:
+            print(f"  Speedup with {cpus} workers: {timings[1] / timings[cpus]:.1f}x")
+        else:
+            print("  Only one CPU available; no parallel run")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Benchmark: memory held by a loaded contact list, dicts vs ContactStore
+
+Loads a synthetic contacts file into the old list of dicts and into the
+compact ContactStore, and reports the memory each keeps once the DataFrame
+is gone (measured with tracemalloc), as well as the size of the records kept
+for failed contacts. Each measurement runs in a fresh process.
+
+Usage:
+    python benchmarks/bench_contact_memory.py [--rows 1000000]
+"""
+
+import argparse
+import gc
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+
+def write_synthetic_csv(path, rows):
+    """Contacts with names, a shared message template and an extra column"""
+    cities = ['Mumbai', 'Delhi', 'Pune', 'Chennai']
+    with open(path, 'w') as f:
+        f.write('phone,name,message,city\n')
+        for i in range(rows):
+            f.write(f'+91{9000000000 + i},Contact {i},Hello {{name}} from {{city}}!,{cities[i % len(cities)]}\n')
+
+
+def dict_contacts(df, phones):
+    """The previous loader: one dict per contact"""
+    keys = [str(column) for column in df.columns]
+    columns = [phones] + [df[column].tolist() for column in df.columns[1:]]
+    return [dict(zip(keys, row)) for row in zip(*columns)]
+
+
+def store_contacts(df, phones):
+    from contacts import ContactStore
+    return ContactStore.from_dataframe(df, phones)
+
+
+def dict_failures(contacts):
+    return [{'phone': contact['phone'], 'name': contact['name'], 'error': 'Timed out', 'attempts': 3}
+            for contact in contacts]
+
+
+def record_failures(contacts):
+    from contacts import FailedContact
+    return [FailedContact(contact['phone'], contact['name'], 'Timed out', 3) for contact in contacts]
+
+
+def measure(kind, path):
+    """Bytes retained by the contacts (and their failure records) built by `kind`"""
+    import pandas as pd
+    from phone_numbers import PhoneNormalizer
+
+    build = dict_contacts if kind == 'dict' else store_contacts
+    failures = dict_failures if kind == 'dict' else record_failures
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+
+    df = pd.read_csv(path)
+    contacts = build(df, PhoneNormalizer().normalize_series(df['phone']).tolist())
+    del df
+    gc.collect()
+    loaded = tracemalloc.get_traced_memory()[0] - baseline
+
+    # Failure records for every contact, on top of contacts that have been read
+    read = list(contacts)
+    before = tracemalloc.get_traced_memory()[0]
+    failed = failures(read)
+    return {'loaded': loaded, 'failed': tracemalloc.get_traced_memory()[0] - before, 'count': len(failed)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Contact memory benchmark')
+    parser.add_argument('--rows', type=int, default=1000000, help='Number of synthetic contacts')
+    parser.add_argument('--measure', choices=['dict', 'store'], help=argparse.SUPPRESS)
+    parser.add_argument('--file', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(args.measure, args.file)))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'contacts.csv')
+        print(f"📝 Generating {args.rows} synthetic contacts...")
+        write_synthetic_csv(path, args.rows)
+
+        results = {}
+        for kind in ('dict', 'store'):
+            output = subprocess.run([sys.executable, __file__, '--measure', kind, '--file', path],
+                                    capture_output=True, text=True, check=True)
+            results[kind] = json.loads(output.stdout)
+
+    rows = args.rows
+    for kind, label in (('dict', 'list of dicts'), ('store', 'ContactStore')):
+        result = results[kind]
+        print(f"  {label:14s} {result['loaded'] / 2 ** 20:8.1f} MB  ({result['loaded'] / rows:6.1f} bytes/contact)")
+    print(f"  Reduction: {results['dict']['loaded'] / results['store']['loaded']:.1f}x")
+    print(f"  Failed-contact records: {results['dict']['failed'] / rows:.1f} -> "
+          f"{results['store']['failed'] / rows:.1f} bytes each")
+
+
+if __name__ == "__main__":
+    main()
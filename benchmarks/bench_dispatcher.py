@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark: urgent campaigns behind a bulk campaign, one at a time vs dispatched
+
+Starts a bulk campaign, submits a small urgent campaign shortly after, and
+measures how long the urgent one takes to finish when campaigns run one
+after another (send_bulk_messages) and when they share a Dispatcher. Also
+reports how two bulk campaigns with weights 3 and 1 split the send slots.
+
+Usage:
+    python benchmarks/bench_dispatcher.py [--bulk 5000] [--urgent 10] [--rate 500]
+"""
+
+import argparse
+import logging
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from dispatcher import Dispatcher
+from rate_limiter import RateLimiter
+from transports import FakeTransport
+from whatsapp_bulk_sender import WhatsAppBulkSender
+
+
+def contacts(count, first):
+    return [{'phone': f"+91{first + i}", 'name': f"Contact {i}"} for i in range(count)]
+
+
+def new_sender(rate):
+    return WhatsAppBulkSender(transport=FakeTransport(latency=0), rate_limiter=RateLimiter(rate))
+
+
+def sequential(args):
+    """Urgent campaign latency when it has to wait for the bulk one"""
+    sender = new_sender(args.rate)
+    bulk = threading.Thread(target=sender.send_bulk_messages, args=(contacts(args.bulk, 9000000000), 'Sale!'))
+    bulk.start()
+    time.sleep(args.delay)
+    submitted = time.perf_counter()
+    bulk.join()  # the next campaign starts once the current one is done
+    sender.send_bulk_messages(contacts(args.urgent, 8000000000), 'Alert!')
+    return time.perf_counter() - submitted
+
+
+def dispatched(args):
+    """Urgent campaign latency through a dispatcher"""
+    with Dispatcher(new_sender(args.rate)) as dispatcher:
+        bulk = dispatcher.submit(contacts(args.bulk, 9000000000), 'Sale!', priority='bulk')
+        time.sleep(args.delay)
+        submitted = time.perf_counter()
+        dispatcher.send(contacts(args.urgent, 8000000000), 'Alert!', priority='urgent')
+        latency = time.perf_counter() - submitted
+        bulk.cancel()
+    return latency
+
+
+def fair_share(args):
+    """Send slots taken by two bulk campaigns with weights 3 and 1"""
+    slots = {'heavy': 0, 'light': 0}
+    lock = threading.Lock()
+
+    def count(name):
+        def progress(results, contact, outcome):
+            with lock:
+                slots[name] += 1
+        return progress
+
+    with Dispatcher(new_sender(args.rate)) as dispatcher:
+        heavy = dispatcher.submit(contacts(args.bulk, 9000000000), 'A', priority='bulk', weight=3,
+                                  progress=count('heavy'))
+        light = dispatcher.submit(contacts(args.bulk, 7000000000), 'B', priority='bulk', weight=1,
+                                  progress=count('light'))
+        time.sleep(args.delay * 2)
+        heavy.cancel()
+        light.cancel()
+    return slots
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Dispatcher priority and fair-share benchmark')
+    parser.add_argument('--bulk', type=int, default=5000, help='Contacts in the bulk campaign')
+    parser.add_argument('--urgent', type=int, default=10, help='Contacts in the urgent campaign')
+    parser.add_argument('--rate', type=float, default=500, help='Messages per second allowed by the rate limiter')
+    parser.add_argument('--delay', type=float, default=1.0, help='Seconds between the bulk and urgent submissions')
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    print(f"📦 Bulk campaign of {args.bulk}, urgent campaign of {args.urgent}, {args.rate:g} messages/s")
+    one_at_a_time = sequential(args)
+    print(f"  One campaign at a time: urgent finished after {one_at_a_time:7.2f}s")
+    with_dispatcher = dispatched(args)
+    print(f"  Dispatcher:             urgent finished after {with_dispatcher:7.2f}s "
+          f"(ideal {args.urgent / args.rate:.2f}s)")
+
+    slots = fair_share(args)
+    total = sum(slots.values()) or 1
+    print(f"  Weights 3:1 got {slots['heavy']}:{slots['light']} slots "
+          f"({slots['heavy'] / total:.0%} / {slots['light'] / total:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Benchmark: the campaign pipeline, stage by stage
+
+Generates synthetic contact files and times each stage against the fake
+transport:
+
+    load       stream contacts from CSV (iter_contacts_from_csv)
+    normalize  vectorized normalize_series per chunk, and _format_phone_number per number
+    render     message rendering from the contact's template
+    dispatch   a full send_bulk_messages() campaign (dedupe, rate limiter, fake transport)
+
+Every stage runs in a fresh interpreter so its peak memory (max RSS) is
+measured on its own. Results are printed as a table and written as JSON;
+pass an earlier JSON file with --compare to see the change per stage.
+
+Usage:
+    python benchmarks/bench_pipeline.py [--sizes 10k,1m] [--stages load,dispatch]
+                                        [--output results.json] [--compare old.json]
+
+The 10m size is supported (--sizes 10k,1m,10m) but takes a long time; the
+generated files are kept in --data-dir, so later runs reuse them.
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from bench_contact_loading import write_synthetic_csv
+
+SIZES = {'10k': 10_000, '1m': 1_000_000, '10m': 10_000_000}
+STAGES = ['load', 'normalize', 'render', 'dispatch']
+
+# _format_phone_number is timed on at most this many numbers
+SCALAR_SAMPLE = 200_000
+
+
+def peak_rss_mb() -> float:
+    """Peak resident memory of this process in MB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def run_stage(stage: str, path: str, chunk_size: int) -> dict:
+    """Run one stage in this process and return its measurements"""
+    import pandas as pd
+    from whatsapp_bulk_sender import WhatsAppBulkSender
+    from transports import FakeTransport
+
+    sender = WhatsAppBulkSender(transport=FakeTransport(), message_delay=0)
+    baseline_rss = peak_rss_mb()
+    result = {}
+
+    start = time.perf_counter()
+    if stage == 'load':
+        rows = sum(1 for _ in sender.iter_contacts_from_csv(path, chunk_size))
+
+    elif stage == 'normalize':
+        rows = 0
+        elapsed = 0.0
+        scalar_phones = []
+        for chunk in pd.read_csv(path, chunksize=chunk_size, usecols=['phone']):
+            phones = chunk['phone'].astype(str)
+            started = time.perf_counter()
+            sender._format_phone_series(phones)
+            elapsed += time.perf_counter() - started
+            rows += len(phones)
+            if len(scalar_phones) < SCALAR_SAMPLE:
+                scalar_phones.extend(phones.tolist()[:SCALAR_SAMPLE - len(scalar_phones)])
+
+        started = time.perf_counter()
+        for phone in scalar_phones:
+            sender._format_phone_number(phone)
+        result['scalar_ns_per_number'] = (time.perf_counter() - started) / max(1, len(scalar_phones)) * 1e9
+        start = time.perf_counter() - elapsed  # report vectorized time only
+
+    elif stage == 'render':
+        rows = 0
+        elapsed = 0.0
+        for contact in sender.iter_contacts_from_csv(path, chunk_size):
+            started = time.perf_counter()
+            sender._render_message(contact, "Hello {name}!")
+            elapsed += time.perf_counter() - started
+            rows += 1
+        start = time.perf_counter() - elapsed
+        result['cache'] = sender.templates.cache_info()._asdict()
+
+    elif stage == 'dispatch':
+        results = sender.send_bulk_messages(sender.iter_contacts_from_csv(path, chunk_size), "Hello {name}!")
+        rows = results['success'] + results['failed']
+
+    else:
+        raise ValueError(f"Unknown stage: {stage}")
+    seconds = time.perf_counter() - start
+
+    result.update({
+        'rows': rows,
+        'seconds': seconds,
+        'rows_per_second': rows / seconds if seconds > 0 else None,
+        'peak_rss_mb': peak_rss_mb(),
+        'baseline_rss_mb': baseline_rss,
+    })
+    return result
+
+
+def dataset(data_dir: str, rows: int) -> str:
+    """Path of the synthetic file with `rows` contacts, generating it if needed"""
+    path = os.path.join(data_dir, f'contacts_{rows}.csv')
+    if not os.path.exists(path):
+        print(f"📝 Generating {rows} synthetic contacts...")
+        write_synthetic_csv(path + '.tmp', rows)
+        os.replace(path + '.tmp', path)
+    return path
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+def compare(results: list, baseline_path: str):
+    """Print the change in throughput and peak memory against an earlier run"""
+    with open(baseline_path) as f:
+        baseline = {(r['size'], r['stage']): r for r in json.load(f)['results']}
+
+    print(f"\nCompared with {baseline_path}:")
+    for result in results:
+        old = baseline.get((result['size'], result['stage']))
+        if old is None or not old.get('rows_per_second') or not result.get('rows_per_second'):
+            continue
+        speed = result['rows_per_second'] / old['rows_per_second'] - 1
+        memory = result['peak_rss_mb'] - old['peak_rss_mb']
+        print(f"  {result['size']:>4s} {result['stage']:10s} throughput {speed:+7.1%}  peak memory {memory:+8.1f}MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Campaign pipeline benchmark')
+    parser.add_argument('--sizes', default='10k,1m', help=f"Comma-separated sizes from {', '.join(SIZES)} (default: 10k,1m)")
+    parser.add_argument('--stages', default=','.join(STAGES), help='Comma-separated stages (default: all)')
+    parser.add_argument('--chunk-size', type=int, default=10000, help='Rows per chunk when streaming (default: 10000)')
+    parser.add_argument('--data-dir', help='Where synthetic files are kept (default: a temporary directory)')
+    parser.add_argument('--output', help='Write JSON results to this file (default: print them)')
+    parser.add_argument('--compare', help='Earlier JSON results to compare against')
+    parser.add_argument('--run-stage', help=argparse.SUPPRESS)
+    parser.add_argument('--file', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    # Child process: run a single stage and report it on stdout
+    if args.run_stage:
+        print(json.dumps(run_stage(args.run_stage, args.file, args.chunk_size)))
+        return
+
+    sizes = [size.strip().lower() for size in args.sizes.split(',')]
+    stages = [stage.strip() for stage in args.stages.split(',')]
+    for size in sizes:
+        if size not in SIZES:
+            parser.error(f"Unknown size {size!r}, choose from {', '.join(SIZES)}")
+    for stage in stages:
+        if stage not in STAGES:
+            parser.error(f"Unknown stage {stage!r}, choose from {', '.join(STAGES)}")
+
+    tmp = None
+    data_dir = args.data_dir
+    if data_dir is None:
+        tmp = tempfile.TemporaryDirectory()
+        data_dir = tmp.name
+    os.makedirs(data_dir, exist_ok=True)
+
+    # Keep the stages' own settings deterministic
+    env = {key: value for key, value in os.environ.items()
+           if key not in ('GLOBAL_MESSAGE_DELAY', 'SUPPRESSION_DB', 'FAKE_FAILURE_RATE', 'FAKE_LATENCY')}
+
+    results = []
+    try:
+        for size in sizes:
+            path = dataset(data_dir, SIZES[size])
+            for stage in stages:
+                output = subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), '--run-stage', stage, '--file', path,
+                     '--chunk-size', str(args.chunk_size)],
+                    cwd=ROOT, env=env, capture_output=True, text=True
+                )
+                if output.returncode != 0:
+                    print(f"  ❌ {size} {stage} failed:\n{output.stderr}")
+                    sys.exit(1)
+
+                result = {'size': size, 'stage': stage, **json.loads(output.stdout.splitlines()[-1])}
+                results.append(result)
+                print(f"  {size:>4s} {stage:10s} {result['seconds']:9.3f}s  "
+                      f"{result['rows_per_second'] or 0:12,.0f} rows/s  peak {result['peak_rss_mb']:8.1f}MB")
+    finally:
+        if tmp is not None:
+            tmp.cleanup()
+
+    report = {
+        'benchmark': 'pipeline',
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'chunk_size': args.chunk_size,
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Results written to {args.output}")
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Benchmark: cost of the per-attempt result log
+
+Times a fake-transport campaign with and without a ResultLog, the cost of
+one ResultLog.record() call in the send loop, and how long pandas takes to
+read back a log with a million attempts.
+
+Usage:
+    python benchmarks/bench_result_log.py [--campaign 100000] [--rows 1000000] [--format csv]
+"""
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import pandas as pd
+
+from contacts import ContactStore
+from result_log import ResultLog
+from transports import FakeTransport
+from whatsapp_bulk_sender import WhatsAppBulkSender
+
+
+def run_campaign(contacts, result_log=None):
+    sender = WhatsAppBulkSender(transport=FakeTransport(), message_delay=0)
+    start = time.perf_counter()
+    sender.send_bulk_messages(contacts, 'Hello {name}!', result_log=result_log)
+    return time.perf_counter() - start
+
+
+def read_log(path):
+    start = time.perf_counter()
+    if path.endswith('.parquet'):
+        df = pd.read_parquet(path)
+    else:
+        df = pd.read_csv(path, parse_dates=['scheduled_at', 'sent_at'], dtype={'phone': str})
+    return df, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Result log benchmark')
+    parser.add_argument('--campaign', type=int, default=100000, help='Contacts in the timed campaign')
+    parser.add_argument('--rows', type=int, default=1000000, help='Attempts written to the log read back by pandas')
+    parser.add_argument('--format', choices=['csv', 'parquet'], default='csv',
+                        help='Log format (parquet needs pyarrow)')
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    contacts = ContactStore([f'+91{9000000000 + i}' for i in range(args.campaign)],
+                            [f'Contact {i}' for i in range(args.campaign)])
+
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"📤 Campaign of {args.campaign:,} contacts:")
+        without = run_campaign(contacts)
+        log = ResultLog(os.path.join(directory, f'campaign.{args.format}'))
+        try:
+            with_log = run_campaign(contacts, log)
+        finally:
+            log.close()
+        print(f"  without result log: {without:7.2f}s  ({args.campaign / without:,.0f} sends/s)")
+        print(f"  with result log:    {with_log:7.2f}s  ({args.campaign / with_log:,.0f} sends/s, "
+              f"{(with_log - without) / args.campaign * 1e6:+.1f}µs per send)")
+
+        print(f"\n📝 {args.rows:,} attempts logged directly:")
+        log = ResultLog(os.path.join(directory, f'attempts.{args.format}'))
+        now = time.time()
+        start = time.perf_counter()
+        for i in range(args.rows):
+            log.record(f'+91{9000000000 + i}', '3f2a9c1b7d4e', now, now + 0.5, 0.25, 1 + i % 3,
+                       'sent' if i % 10 else 'retry', 'default', None if i % 10 else 'Simulated failure')
+        recorded = time.perf_counter() - start
+        log.close()
+        print(f"  record(): {recorded / args.rows * 1e6:.2f}µs per attempt in the send loop")
+        print(f"  file size: {os.path.getsize(log.path) / 1e6:.1f} MB ({log.path.rsplit('.', 1)[1]})")
+
+        df, elapsed = read_log(log.path)
+        print(f"  pandas read: {elapsed:.2f}s for {len(df):,} rows, "
+              f"{(df['outcome'] == 'retry').sum():,} retries, "
+              f"median duration {df['duration_seconds'].median():.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Benchmark: command-line startup time
+
+Times `python cli.py --help` and a bare import of the sender in fresh
+interpreters, and checks that heavy dependencies are not imported on startup.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 10] [--max-ms 300]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# Modules that must only be imported on the code paths that need them
+HEAVY_MODULES = ['pandas', 'numpy', 'pywhatkit', 'openpyxl', 'dotenv', 'asyncio']
+
+COMMANDS = [
+    ('cli.py --help', [sys.executable, 'cli.py', '--help']),
+    ('import whatsapp_bulk_sender', [sys.executable, '-c', 'import whatsapp_bulk_sender']),
+]
+
+
+def time_command(command, runs):
+    """Run a command `runs` times and return the wall-clock times in milliseconds"""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+
+def heavy_modules_on_startup():
+    """Heavy modules that end up in sys.modules after importing the cli"""
+    code = f"import sys, cli; print(' '.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    output = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True)
+    return output.stdout.split()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='CLI startup benchmark')
+    parser.add_argument('--runs', type=int, default=10, help='Runs per command')
+    parser.add_argument('--max-ms', type=float, help='Fail if the median `cli.py --help` time exceeds this')
+    args = parser.parse_args()
+
+    baseline = statistics.median(time_command([sys.executable, '-c', 'pass'], args.runs))
+    print(f"  {'python -c pass':30s} median {baseline:7.1f}ms")
+
+    medians = {}
+    for label, command in COMMANDS:
+        times = time_command(command, args.runs)
+        medians[label] = statistics.median(times)
+        print(f"  {label:30s} median {medians[label]:7.1f}ms  "
+              f"min {min(times):7.1f}ms  max {max(times):7.1f}ms")
+
+    heavy = heavy_modules_on_startup()
+    if heavy:
+        print(f"  ❌ Imported on startup: {', '.join(heavy)}")
+    else:
+        print("  ✅ No heavy modules imported on startup")
+
+    too_slow = args.max_ms is not None and medians['cli.py --help'] > args.max_ms
+    if too_slow:
+        print(f"  ❌ cli.py --help is slower than {args.max_ms:.0f}ms")
+    if heavy or too_slow:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Benchmark: webdriver transport against the mock WhatsApp Web page
+
+Sends messages through WebDriverTransport to mock_web/whatsapp.html in a
+headless browser and reports the time per send, so the transport can be
+tested and timed without a WhatsApp account. Needs Selenium
+(pip install selenium) and Chrome or Firefox.
+
+Usage:
+    python benchmarks/bench_webdriver_transport.py [--messages 50] [--browser chrome] [--open-ms 200] [--ack-ms 500]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from transports import PermanentTransportError, WebDriverTransport
+
+MOCK_PAGE = Path(__file__).resolve().parent.parent / 'mock_web' / 'whatsapp.html'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Webdriver transport benchmark')
+    parser.add_argument('--messages', type=int, default=50, help='Messages to send')
+    parser.add_argument('--browser', choices=['chrome', 'firefox'], default='chrome')
+    parser.add_argument('--load-ms', type=int, default=500, help='Mock page load time')
+    parser.add_argument('--open-ms', type=int, default=200, help='Mock time to open a chat')
+    parser.add_argument('--ack-ms', type=int, default=500, help='Mock time until a message is acknowledged')
+    args = parser.parse_args()
+
+    url = f"{MOCK_PAGE.as_uri()}?load={args.load_ms}&open={args.open_ms}&ack={args.ack_ms}"
+    transport = WebDriverTransport(url=url, browser=args.browser, headless=True, login_timeout=30)
+
+    try:
+        start = time.perf_counter()
+        transport.send('+910000000000', 'warm-up')
+        print(f"  Browser start and page load: {time.perf_counter() - start:.2f}s")
+
+        times = []
+        for i in range(args.messages):
+            start = time.perf_counter()
+            transport.send(f"+91{9000000000 + i}", f"Hello {i}!")
+            times.append((time.perf_counter() - start) * 1000)
+
+        try:
+            transport.send('+1234', 'invalid')
+            print("  ❌ Invalid number was not rejected")
+        except PermanentTransportError:
+            print("  ✅ Invalid number rejected")
+
+        sent = transport._driver.execute_script('return window.mockSent.length')
+        print(f"  Sent {args.messages} messages (mock page recorded {sent - 1})")
+        print(f"  Per send: median {statistics.median(times):7.1f}ms  min {min(times):7.1f}ms  "
+              f"max {max(times):7.1f}ms  (mock chat open {args.open_ms}ms, ack {args.ack_ms}ms)")
+    finally:
+        transport.close()
+
+
+if __name__ == "__main__":
+    main()
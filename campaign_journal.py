@@ -0,0 +1,137 @@
+"""
+Persistent campaign journal for WhatsApp Bulk Sender.
+
+Every state change of a contact (queued, sent, retry, failed) is appended to a
+SQLite database in WAL mode, so an interrupted campaign can be resumed
+without resending messages that were already delivered.
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+
+QUEUED = 'queued'
+SENT = 'sent'
+RETRY = 'retry'
+FAILED = 'failed'
+
+
+class CampaignJournal:
+    """
+    Append-only on-disk journal of contact states for one campaign.
+
+    Writes are buffered and flushed in a single transaction once batch_size
+    events are pending or flush_interval seconds have passed, so the send loop
+    never waits on a disk sync per message. At most one unflushed batch can be
+    lost if the process is killed.
+
+    Args:
+        path: SQLite database file (created if it doesn't exist)
+        batch_size: Number of buffered events that triggers a flush
+        flush_interval: Maximum seconds an event stays buffered
+    """
+
+    def __init__(self, path: str, batch_size: int = 100, flush_interval: float = 1.0):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._pending = []
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS campaign (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+            CREATE TABLE IF NOT EXISTS events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                phone TEXT NOT NULL,
+                name TEXT,
+                state TEXT NOT NULL,
+                error TEXT,
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS events_state_phone ON events (state, phone);
+        """)
+        self._conn.commit()
+
+        self._delivered = {
+            phone for (phone,) in self._conn.execute(
+                'SELECT DISTINCT phone FROM events WHERE state = ?', (SENT,)
+            )
+        }
+
+    def set_metadata(self, **values):
+        """Store campaign settings (source file, message, ...) needed to resume it."""
+        with self._lock:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO campaign (key, value) VALUES (?, ?)',
+                [(key, json.dumps(value)) for key, value in values.items()]
+            )
+            self._conn.commit()
+
+    def get_metadata(self) -> Dict:
+        with self._lock:
+            rows = self._conn.execute('SELECT key, value FROM campaign').fetchall()
+        return {key: json.loads(value) for key, value in rows}
+
+    def is_delivered(self, phone: str) -> bool:
+        return phone in self._delivered
+
+    @property
+    def delivered_count(self) -> int:
+        return len(self._delivered)
+
+    def record(self, phone: str, state: str, name: str = '', error: Optional[str] = None):
+        """
+        Append a state change for a contact.
+        The event is buffered and written with the next batch.
+        """
+        if state == SENT:
+            self._delivered.add(phone)
+
+        with self._lock:
+            self._pending.append((phone, str(name), state, error, time.time()))
+            due = (len(self._pending) >= self.batch_size or
+                   time.monotonic() - self._last_flush >= self.flush_interval)
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Write all buffered events in one transaction."""
+        with self._lock:
+            if not self._pending:
+                self._last_flush = time.monotonic()
+                return
+            pending, self._pending = self._pending, []
+            try:
+                self._conn.executemany(
+                    'INSERT INTO events (phone, name, state, error, created_at) VALUES (?, ?, ?, ?, ?)',
+                    pending
+                )
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logging.error(f"Failed to write {len(pending)} journal events: {e}")
+                self._pending = pending + self._pending
+                raise
+            finally:
+                self._last_flush = time.monotonic()
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,328 @@
+"""
+Persistent campaign scheduler for WhatsApp Bulk Sender.
+
+Scheduled campaigns are one-shot jobs stored in a SQLite database, so they
+survive restarts. CampaignScheduler is the long-running daemon that sends
+them: it keeps the pending campaigns in a heap ordered by due time and
+sleeps on an Event until the earliest one is due (or a new one is added),
+so thousands of pending campaigns cost no CPU while waiting.
+"""
+
+import heapq
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from send_scheduler import next_occurrence
+
+
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+# Seconds between checks for campaigns added by other processes. A check is
+# one PRAGMA data_version query, so it can be frequent.
+RESCAN_INTERVAL = 1.0
+
+
+def parse_send_time(send_time: str, date: Optional[str] = None, now: Optional[datetime] = None) -> datetime:
+    """
+    Datetime for a send time given as 'HH:MM' (optionally with a 'YYYY-MM-DD'
+    date) or 'YYYY-MM-DD HH:MM'. Without a date, the next occurrence of the
+    time is used. Raises ValueError for malformed or past times.
+    """
+    now = now or datetime.now()
+    if date is None and ' ' in send_time.strip():
+        date, send_time = send_time.strip().split(None, 1)
+
+    when = datetime.strptime(send_time.strip(), '%H:%M')
+    if date is None:
+        return next_occurrence(when.hour, when.minute, now=now)
+
+    when = datetime.strptime(f"{date.strip()} {send_time.strip()}", '%Y-%m-%d %H:%M')
+    if when < now.replace(second=0, microsecond=0):
+        raise ValueError(f"{when:%Y-%m-%d %H:%M} is in the past")
+    return when
+
+
+class CampaignStore:
+    """
+    On-disk store of scheduled campaigns.
+
+    A campaign is a JSON spec (either a contacts file or an inline contact
+    list, plus the message and options) with a due time and a status.
+
+    Args:
+        path: SQLite database file (created if it doesn't exist)
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS campaigns (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                due_at REAL NOT NULL,
+                status TEXT NOT NULL,
+                spec TEXT NOT NULL,
+                created_at REAL,
+                started_at REAL,
+                finished_at REAL,
+                result TEXT,
+                error TEXT
+            );
+            CREATE INDEX IF NOT EXISTS campaigns_pending ON campaigns (status, due_at);
+        """)
+        self._conn.commit()
+
+    def add(self, due: datetime, spec: Dict) -> int:
+        """Store a campaign due at `due` and return its id."""
+        with self._lock:
+            cursor = self._conn.execute(
+                'INSERT INTO campaigns (due_at, status, spec, created_at) VALUES (?, ?, ?, ?)',
+                (due.timestamp(), PENDING, json.dumps(spec, default=str), time.time())
+            )
+            self._conn.commit()
+        return cursor.lastrowid
+
+    def get(self, campaign_id: int) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT id, due_at, status, spec, created_at, started_at, finished_at, result, error '
+                'FROM campaigns WHERE id = ?', (campaign_id,)
+            ).fetchone()
+        return self._to_dict(row) if row else None
+
+    def list(self, statuses: Optional[List[str]] = None) -> List[Dict]:
+        """Campaigns ordered by due time, optionally only those with the given statuses."""
+        query = ('SELECT id, due_at, status, spec, created_at, started_at, finished_at, result, error '
+                 'FROM campaigns')
+        params = ()
+        if statuses:
+            query += f" WHERE status IN ({','.join('?' * len(statuses))})"
+            params = tuple(statuses)
+        with self._lock:
+            rows = self._conn.execute(query + ' ORDER BY due_at, id', params).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def pending_due_times(self) -> List[tuple]:
+        """(due timestamp, id) of every pending campaign"""
+        with self._lock:
+            return self._conn.execute(
+                'SELECT due_at, id FROM campaigns WHERE status = ?', (PENDING,)
+            ).fetchall()
+
+    def claim(self, campaign_id: int) -> bool:
+        """
+        Mark a pending campaign as running. Returns False if it is no longer
+        pending (cancelled, or claimed by another daemon).
+        """
+        return self._transition(campaign_id, PENDING, RUNNING, started_at=time.time())
+
+    def finish(self, campaign_id: int, result: Optional[Dict] = None, error: Optional[str] = None):
+        self._transition(campaign_id, RUNNING, FAILED if error else DONE, finished_at=time.time(),
+                         result=json.dumps(result) if result is not None else None, error=error)
+
+    def cancel(self, campaign_id: int) -> bool:
+        """Cancel a pending campaign. Returns False if it wasn't pending."""
+        return self._transition(campaign_id, PENDING, CANCELLED, finished_at=time.time())
+
+    def requeue(self, campaign_id: int) -> bool:
+        """Put a running campaign back to pending (used after a crash)."""
+        return self._transition(campaign_id, RUNNING, PENDING, started_at=None)
+
+    def _transition(self, campaign_id: int, from_status: str, to_status: str, **fields) -> bool:
+        assignments = ''.join(f', {name} = ?' for name in fields)
+        with self._lock:
+            cursor = self._conn.execute(
+                f'UPDATE campaigns SET status = ?{assignments} WHERE id = ? AND status = ?',
+                (to_status, *fields.values(), campaign_id, from_status)
+            )
+            self._conn.commit()
+        return cursor.rowcount == 1
+
+    def data_version(self) -> int:
+        """Changes whenever another connection (e.g. another process) commits."""
+        with self._lock:
+            return self._conn.execute('PRAGMA data_version').fetchone()[0]
+
+    @staticmethod
+    def _to_dict(row) -> Dict:
+        return {
+            'id': row[0],
+            'due_at': datetime.fromtimestamp(row[1]),
+            'status': row[2],
+            'spec': json.loads(row[3]),
+            'created_at': row[4],
+            'started_at': row[5],
+            'finished_at': row[6],
+            'result': json.loads(row[7]) if row[7] else None,
+            'error': row[8]
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class CampaignScheduler:
+    """
+    Daemon that sends stored campaigns when they are due.
+
+    Campaigns run one at a time through the given sender. Campaigns added
+    through add() wake the daemon immediately; campaigns added by another
+    process (e.g. `cli.py schedule add` while the daemon runs) are picked up
+    within rescan_interval seconds.
+
+    Args:
+        store: Where campaigns are stored
+        sender: WhatsAppBulkSender used to send them
+        rescan_interval: Longest sleep between checks of the store for changes
+            made by other processes
+        clock: Wall-clock time function
+    """
+
+    def __init__(self, store: CampaignStore, sender, rescan_interval: float = RESCAN_INTERVAL, clock=time.time):
+        self.store = store
+        self.sender = sender
+        self.rescan_interval = rescan_interval
+        self._clock = clock
+        self._heap = []
+        self._data_version = None
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+
+    def add(self, due: datetime, spec: Dict) -> int:
+        """Store a campaign and wake the daemon to account for it."""
+        campaign_id = self.store.add(due, spec)
+        self._data_version = None  # the daemon thread reloads its heap
+        self._wakeup.set()
+        return campaign_id
+
+    def stop(self):
+        """Stop the daemon after the campaign that is running (if any) finishes."""
+        self._stopped.set()
+        self._wakeup.set()
+
+    def run(self):
+        """Run until stop() is called."""
+        self._recover()
+        self._reload()
+        logging.info(f"Scheduler started with {len(self._heap)} pending campaigns")
+
+        while not self._stopped.is_set():
+            if self.store.data_version() != self._data_version:
+                self._reload()
+
+            now = self._clock()
+            if self._heap and self._heap[0][0] <= now:
+                due_at, campaign_id = heapq.heappop(self._heap)
+                self.run_campaign(campaign_id, lateness=now - due_at)
+                continue
+
+            timeout = self.rescan_interval
+            if self._heap:
+                timeout = min(timeout, self._heap[0][0] - now)
+            self._wakeup.wait(timeout)
+            self._wakeup.clear()
+
+        logging.info("Scheduler stopped")
+
+    def _recover(self):
+        """
+        Campaigns left running by a crash are resumed if they have a journal
+        (already delivered contacts are skipped), and failed otherwise so no
+        one is messaged twice.
+        """
+        for campaign in self.store.list([RUNNING]):
+            if campaign['spec'].get('journal'):
+                logging.warning(f"Resuming campaign {campaign['id']} interrupted while running")
+                self.store.requeue(campaign['id'])
+            else:
+                logging.warning(f"Campaign {campaign['id']} was interrupted and has no journal to resume from")
+                self.store.finish(campaign['id'], error='Interrupted before completion')
+
+    def _reload(self):
+        self._data_version = self.store.data_version()
+        self._heap = self.store.pending_due_times()
+        heapq.heapify(self._heap)
+
+    def run_campaign(self, campaign_id: int, lateness: float = 0.0):
+        """Send one stored campaign now, if it is still pending."""
+        if not self.store.claim(campaign_id):
+            return  # cancelled or already taken
+
+        campaign = self.store.get(campaign_id)
+        logging.info(f"Starting scheduled campaign {campaign_id} ({lateness:.1f}s after its due time)")
+        try:
+            results = self._send(campaign['spec'])
+        except Exception as e:
+            logging.error(f"Scheduled campaign {campaign_id} failed: {e}")
+            self.store.finish(campaign_id, error=str(e))
+            return
+
+        summary = {key: results[key] for key in
+                   ('success', 'failed', 'retried', 'duplicates', 'suppressed', 'skipped')}
+        self.store.finish(campaign_id, summary)
+        logging.info(f"Scheduled campaign {campaign_id} finished: {summary}")
+
+    def _send(self, spec: Dict) -> Dict:
+        from campaign_journal import CampaignJournal
+        from retry import DeadLetterFile
+        from suppression import SuppressionStore
+
+        if 'contacts' in spec:
+            contacts = spec['contacts']
+        elif spec['source'] == 'excel':
+            contacts = self.sender.iter_contacts_from_excel(
+                spec['file'], spec.get('sheet') or 'Sheet1', spec.get('chunk_size', 10000), spec.get('country_code'))
+        else:
+            contacts = self.sender.iter_contacts_from_csv(
+                spec['file'], spec.get('chunk_size', 10000), spec.get('country_code'))
+
+        # The suppression list given when the campaign was scheduled (which the
+        # daemon itself may not have been started with), else the sender's. It
+        # is opened fresh for each campaign so the daemon's long-lived store
+        # never serves a stale filter.
+        suppression = None
+        suppression_path = spec.get('suppression')
+        if suppression_path:
+            if not os.path.exists(suppression_path):
+                raise FileNotFoundError(f"Suppression list not found: {suppression_path}")
+        elif self.sender.suppression is not None:
+            suppression_path = self.sender.suppression.path
+        if suppression_path:
+            suppression = SuppressionStore(suppression_path, self.sender.normalizer)
+
+        journal = CampaignJournal(spec['journal']) if spec.get('journal') else None
+        dead_letter = DeadLetterFile(spec['dead_letter']) if spec.get('dead_letter') else None
+        try:
+            return self.sender.send_bulk_messages(contacts, spec.get('message', ''), journal=journal,
+                                                  dead_letter=dead_letter, suppression=suppression)
+        finally:
+            if journal is not None:
+                journal.close()
+            if dead_letter is not None:
+                dead_letter.close()
+            if suppression is not None:
+                suppression.close()
+
+
+def default_store_path() -> str:
+    """Campaign store used when none is given (SCHEDULE_DB, or scheduled_campaigns.db)."""
+    return os.getenv('SCHEDULE_DB', 'scheduled_campaigns.db')
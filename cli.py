@@ -4,11 +4,207 @@ Simple command-line interface for WhatsApp Bulk Sender
 """
 
 import argparse
+import itertools
+import os
+import signal
 import sys
-from whatsapp_bulk_sender import WhatsAppBulkSender
+from whatsapp_bulk_sender import WhatsAppBulkSender, load_environment, setup_logging
+from transports import TransportError, create_transport
+from sessions import create_sessions
+from campaign_journal import CampaignJournal
+from suppression import SuppressionStore
+from metrics import MetricsRegistry
+from retry import DeadLetterFile, RetryPolicy
+from result_log import ResultLog
+from campaign_scheduler import (CampaignScheduler, CampaignStore, PENDING, RESCAN_INTERVAL, RUNNING,
+                                default_store_path, parse_send_time)
+from batch_loader import expand_sources
+
+SOURCE_NAMES = {'csv': 'CSV file', 'excel': 'Excel file', 'files': 'the files'}
+
+def dead_letter_path(file_path):
+    """Default dead-letter file for a contacts file: contacts.csv -> contacts.failed.csv"""
+    return os.path.splitext(file_path)[0] + '.failed.csv'
+
+def default_dead_letter(source, file_path):
+    """Dead-letter file used when none is given (contacts.failed.csv for the 'files' command)"""
+    return 'contacts.failed.csv' if source == 'files' else dead_letter_path(file_path)
+
+def run_campaign(sender, source, file_path, sheet, chunk_size, message, hour, minute, journal=None,
+                 country_code=None, dead_letter=None, workers=None, results_file=None, suppression=None):
+    """
+    Stream contacts from a CSV or Excel file (or, for source 'files', from a
+    list of files, directories and globs) and send the campaign
+    """
+    if source == 'csv':
+        contacts = sender.iter_contacts_from_csv(file_path, chunk_size, country_code)
+    elif source == 'files':
+        contacts = sender.iter_contacts_from_files(file_path, sheet or 'Sheet1', country_code, workers)
+    else:
+        contacts = sender.iter_contacts_from_excel(file_path, sheet, chunk_size, country_code)
+    
+    first = next(contacts, None)
+    if first is None:
+        print(f"❌ Failed to load contacts from {SOURCE_NAMES[source]}")
+        sys.exit(1)
+    contacts = itertools.chain([first], contacts)
+    
+    if dead_letter is None:
+        dead_letter = default_dead_letter(source, file_path)
+    dead_letter_file = DeadLetterFile(dead_letter)
+    result_log = ResultLog(results_file) if results_file else None
+    try:
+        results = sender.send_bulk_messages(contacts, message, hour, minute, journal=journal,
+                                            dead_letter=dead_letter_file, result_log=result_log,
+                                            suppression=suppression)
+    finally:
+        dead_letter_file.close()
+        if result_log is not None:
+            result_log.close()
+    
+    print(f"✅ Bulk sending completed!")
+    print(f"📤 Sent: {results['success']}")
+    print(f"❌ Failed: {results['failed']}")
+    if results['retried']:
+        print(f"🔄 Retries: {results['retried']}")
+    if results['duplicates']:
+        print(f"🔁 Duplicates collapsed: {results['duplicates']}")
+    if results['suppressed']:
+        print(f"🚫 Suppressed (opted out): {results['suppressed']}")
+    if results['skipped']:
+        print(f"⏭️  Skipped (already delivered): {results['skipped']}")
+    
+    if results['failed_contacts']:
+        print("\n❌ Failed contacts:")
+        for contact in results['failed_contacts']:
+            print(f"  - {contact['phone']} ({contact['name']}): {contact['error']}")
+        print(f"\n📝 Failed contacts saved to {dead_letter_file.path}")
+        print(f"   Send them again with: python cli.py csv {dead_letter_file.path}")
+    if result_log is not None:
+        print(f"📊 {result_log.count} send attempts logged to {result_log.path}")
+
+def validate_contacts(files, sheet, message, country_code=None, report_file=None):
+    """
+    Validate contact files before a campaign, print a summary and write the
+    row-level report if there are problems. Returns True if nothing blocks the campaign.
+    """
+    import pandas as pd
+    from validation import ContactValidator, report_path
+    
+    try:
+        paths = expand_sources(files)
+    except FileNotFoundError as e:
+        print(f"❌ {e}")
+        return False
+    if not paths:
+        print(f"❌ No contact files found in {', '.join(files)}")
+        return False
+    
+    report = ContactValidator(message or "", country_code).validate_files(paths, sheet or 'Sheet1')
+    print(f"🔍 Validated {report.rows} contacts in {len(paths)} file{'s' if len(paths) != 1 else ''}")
+    if not report.error_count and not report.warning_count:
+        print("✅ No problems found")
+        return True
+    
+    print(f"{'❌' if report.error_count else '✅'} {report.error_count} errors, ⚠️  {report.warning_count} warnings")
+    for code, count in report.counts().items():
+        print(f"  - {code}: {count}")
+    for _, issue in report.examples(1).iterrows():
+        where = 'file' if pd.isna(issue['row']) else f"row {int(issue['row'])}"
+        print(f"    e.g. {issue['source']} {where}: {issue['message']}")
+    
+    report_file = report_file or (report_path(paths[0]) if len(paths) == 1 else 'contacts.validation.csv')
+    report.write_csv(report_file)
+    print(f"📝 Row-level report written to {report_file}")
+    return report.ok
+
+def run_suppress(suppression, args):
+    """Run a 'suppress' subcommand against the suppression list"""
+    if args.action == 'import':
+        added = suppression.import_file(args.file, args.reason)
+        print(f"✅ Imported {added} new numbers ({len(suppression)} suppressed in total)")
+    elif args.action == 'add':
+        if suppression.add(args.phone, args.reason):
+            print(f"✅ {args.phone} suppressed")
+        else:
+            print(f"ℹ️  {args.phone} was already suppressed")
+    elif args.action == 'check':
+        if args.phone in suppression:
+            print(f"🚫 {args.phone} is suppressed")
+        else:
+            print(f"✅ {args.phone} is not suppressed")
+    elif args.action == 'remove':
+        if suppression.remove(args.phone):
+            print(f"✅ {args.phone} removed from the suppression list")
+        else:
+            print(f"ℹ️  {args.phone} was not suppressed")
+
+def run_schedule(store, args, suppression_db=None):
+    """Run a 'schedule' subcommand against the campaign store"""
+    if args.action == 'add':
+        try:
+            due = parse_send_time(args.at)
+        except ValueError as e:
+            print(f"❌ Invalid --at time: {e}")
+            sys.exit(1)
+        
+        message = args.message or "Hello {name}!"
+        if not args.no_validate and not validate_contacts([args.file], args.sheet, message, args.country_code):
+            print("❌ Fix the problems above before scheduling (or pass --no-validate)")
+            sys.exit(1)
+        
+        source = 'excel' if args.file.lower().endswith(('.xlsx', '.xls')) else 'csv'
+        campaign_id = store.add(due, {
+            'source': source,
+            'file': os.path.abspath(args.file),
+            'sheet': args.sheet,
+            'message': message,
+            'chunk_size': args.chunk_size,
+            'country_code': args.country_code,
+            'journal': os.path.abspath(args.journal) if args.journal else None,
+            'dead_letter': os.path.abspath(args.dead_letter or dead_letter_path(args.file)),
+            'suppression': os.path.abspath(suppression_db) if suppression_db else None
+        })
+        print(f"⏰ Campaign {campaign_id} scheduled for {due:%Y-%m-%d %H:%M}")
+        print("   Keep `python cli.py daemon` running to send it")
+    
+    elif args.action == 'list':
+        campaigns = store.list(None if args.all else [PENDING, RUNNING])
+        if not campaigns:
+            print("No scheduled campaigns")
+        for campaign in campaigns:
+            spec = campaign['spec']
+            target = spec.get('file') or f"{len(spec.get('contacts', []))} contacts"
+            line = f"  {campaign['id']:>5}  {campaign['due_at']:%Y-%m-%d %H:%M}  {campaign['status']:9s}  {target}"
+            if campaign['result']:
+                line += f"  (sent {campaign['result']['success']}, failed {campaign['result']['failed']})"
+            if campaign['error']:
+                line += f"  ({campaign['error']})"
+            print(line)
+    
+    elif args.action == 'cancel':
+        if store.cancel(args.id):
+            print(f"✅ Campaign {args.id} cancelled")
+        else:
+            print(f"❌ Campaign {args.id} is not pending")
+            sys.exit(1)
 
 def main():
     parser = argparse.ArgumentParser(description='WhatsApp Bulk Message Sender')
+    parser.add_argument('--transport', choices=['pywhatkit', 'webdriver', 'fake'],
+                        help='Delivery backend (default: TRANSPORT env or pywhatkit)')
+    parser.add_argument('--sessions', type=int, default=1,
+                        help='Number of sessions to shard bulk campaigns across (default: 1)')
+    parser.add_argument('--max-attempts', type=int,
+                        help='Attempts per contact before it counts as failed (default: RETRY_MAX_ATTEMPTS or 3)')
+    parser.add_argument('--metrics-port', type=int,
+                        help='Serve Prometheus metrics on this port while running (http://host:PORT/metrics)')
+    parser.add_argument('--metrics-file',
+                        help='Write Prometheus metrics to this file every few seconds and on exit')
+    parser.add_argument('--schedule-db',
+                        help='Scheduled campaigns database (default: SCHEDULE_DB env or scheduled_campaigns.db)')
+    parser.add_argument('--suppression',
+                        help='Suppression list database; listed numbers are never messaged (default: SUPPRESSION_DB env)')
     
     # Subcommands
     subparsers = parser.add_subparsers(dest='command', help='Available commands')
@@ -26,6 +222,12 @@ def main():
     csv_parser.add_argument('--message', help='Default message (use {name} for personalization)')
     csv_parser.add_argument('--hour', type=int, help='Hour to start sending (24-hour format)')
     csv_parser.add_argument('--minute', type=int, help='Minute to start sending')
+    csv_parser.add_argument('--chunk-size', type=int, default=10000, help='Rows to read per chunk (default: 10000)')
+    csv_parser.add_argument('--journal', help='Campaign journal file (SQLite) for crash-safe resume')
+    csv_parser.add_argument('--country-code', help='Country code for numbers without one (default: DEFAULT_COUNTRY_CODE or +91)')
+    csv_parser.add_argument('--dead-letter', help='CSV for contacts that finally fail (default: <file>.failed.csv)')
+    csv_parser.add_argument('--no-validate', action='store_true', help='Skip the validation pass before sending')
+    csv_parser.add_argument('--results', help='Log every send attempt to this file (.parquet with pyarrow, else CSV)')
     
     # Bulk Excel command
     excel_parser = subparsers.add_parser('excel', help='Send bulk messages from Excel file')
@@ -34,6 +236,76 @@ def main():
     excel_parser.add_argument('--message', help='Default message (use {name} for personalization)')
     excel_parser.add_argument('--hour', type=int, help='Hour to start sending (24-hour format)')
     excel_parser.add_argument('--minute', type=int, help='Minute to start sending')
+    excel_parser.add_argument('--chunk-size', type=int, default=10000, help='Rows to read per chunk (default: 10000)')
+    excel_parser.add_argument('--journal', help='Campaign journal file (SQLite) for crash-safe resume')
+    excel_parser.add_argument('--country-code', help='Country code for numbers without one (default: DEFAULT_COUNTRY_CODE or +91)')
+    excel_parser.add_argument('--dead-letter', help='CSV for contacts that finally fail (default: <file>.failed.csv)')
+    excel_parser.add_argument('--no-validate', action='store_true', help='Skip the validation pass before sending')
+    excel_parser.add_argument('--results', help='Log every send attempt to this file (.parquet with pyarrow, else CSV)')
+    
+    # Bulk from many files command
+    files_parser = subparsers.add_parser('files', help='Send bulk messages from many CSV/Excel files, loaded in parallel')
+    files_parser.add_argument('file', nargs='+', help='Files, directories or glob patterns (quote globs, e.g. "exports/*.xlsx")')
+    files_parser.add_argument('--sheet', default='Sheet1', help='Sheet name for Excel files (default: Sheet1)')
+    files_parser.add_argument('--message', help='Default message (use {name} for personalization)')
+    files_parser.add_argument('--hour', type=int, help='Hour to start sending (24-hour format)')
+    files_parser.add_argument('--minute', type=int, help='Minute to start sending')
+    files_parser.add_argument('--workers', type=int, help='Processes used to parse files (default: one per CPU)')
+    files_parser.add_argument('--journal', help='Campaign journal file (SQLite) for crash-safe resume')
+    files_parser.add_argument('--country-code', help='Country code for numbers without one (default: DEFAULT_COUNTRY_CODE or +91)')
+    files_parser.add_argument('--dead-letter', help='CSV for contacts that finally fail (default: contacts.failed.csv)')
+    files_parser.add_argument('--no-validate', action='store_true', help='Skip the validation pass before sending')
+    files_parser.add_argument('--results', help='Log every send attempt to this file (.parquet with pyarrow, else CSV)')
+    
+    # Validate command
+    validate_parser = subparsers.add_parser('validate', help='Check contact files for problems without sending')
+    validate_parser.add_argument('file', nargs='+', help='Files, directories or glob patterns')
+    validate_parser.add_argument('--sheet', default='Sheet1', help='Sheet name for Excel files (default: Sheet1)')
+    validate_parser.add_argument('--message', help='Default message the campaign would use (checks its placeholders)')
+    validate_parser.add_argument('--country-code', help='Country code for numbers without one (default: DEFAULT_COUNTRY_CODE or +91)')
+    validate_parser.add_argument('--report', help='Row-level report CSV (default: <file>.validation.csv)')
+    
+    # Resume command
+    resume_parser = subparsers.add_parser('resume', help='Resume an interrupted campaign from its journal')
+    resume_parser.add_argument('journal', help='Campaign journal file created with --journal')
+    
+    # Suppression list commands
+    suppress_parser = subparsers.add_parser('suppress', help='Manage the suppression (opt-out) list')
+    suppress_actions = suppress_parser.add_subparsers(dest='action', required=True)
+    suppress_import = suppress_actions.add_parser('import', help='Import numbers from a CSV or one-per-line text file')
+    suppress_import.add_argument('file', help='File with a "phone" column, or one number per line')
+    suppress_import.add_argument('--reason', default='opt-out', help='Reason stored with the numbers (default: opt-out)')
+    suppress_add = suppress_actions.add_parser('add', help='Suppress a single number')
+    suppress_add.add_argument('phone', help='Phone number')
+    suppress_add.add_argument('--reason', default='opt-out', help='Reason stored with the number (default: opt-out)')
+    suppress_check = suppress_actions.add_parser('check', help='Check whether a number is suppressed')
+    suppress_check.add_argument('phone', help='Phone number')
+    suppress_remove = suppress_actions.add_parser('remove', help='Lift the suppression for a number')
+    suppress_remove.add_argument('phone', help='Phone number')
+    
+    # Scheduled campaign commands
+    schedule_parser = subparsers.add_parser('schedule', help='Schedule campaigns for the daemon to send')
+    schedule_actions = schedule_parser.add_subparsers(dest='action', required=True)
+    schedule_add = schedule_actions.add_parser('add', help='Schedule a CSV or Excel campaign')
+    schedule_add.add_argument('file', help='CSV or Excel file path')
+    schedule_add.add_argument('--at', required=True, help='Send time: "YYYY-MM-DD HH:MM", or "HH:MM" for the next occurrence')
+    schedule_add.add_argument('--message', help='Default message (use {name} for personalization)')
+    schedule_add.add_argument('--sheet', default='Sheet1', help='Sheet name for Excel files (default: Sheet1)')
+    schedule_add.add_argument('--chunk-size', type=int, default=10000, help='Rows to read per chunk (default: 10000)')
+    schedule_add.add_argument('--journal', help='Campaign journal file (SQLite) so the campaign can resume after a crash')
+    schedule_add.add_argument('--country-code', help='Country code for numbers without one (default: DEFAULT_COUNTRY_CODE or +91)')
+    schedule_add.add_argument('--dead-letter', help='CSV for contacts that finally fail (default: <file>.failed.csv)')
+    schedule_add.add_argument('--no-validate', action='store_true', help='Skip the validation pass when scheduling')
+    schedule_list = schedule_actions.add_parser('list', help='List pending and running campaigns')
+    schedule_list.add_argument('--all', action='store_true', help='Include finished and cancelled campaigns')
+    schedule_cancel = schedule_actions.add_parser('cancel', help='Cancel a pending campaign')
+    schedule_cancel.add_argument('id', type=int, help='Campaign id')
+    
+    # Daemon command
+    daemon_parser = subparsers.add_parser('daemon', help='Run the scheduler daemon that sends scheduled campaigns')
+    daemon_parser.add_argument('--rescan-interval', type=float, default=RESCAN_INTERVAL,
+                               help='Max seconds before campaigns added by other processes are noticed '
+                                    f'(default: {RESCAN_INTERVAL:g})')
     
     # Sample file command
     sample_parser = subparsers.add_parser('sample', help='Create sample contacts file')
@@ -45,7 +317,45 @@ def main():
         parser.print_help()
         return
     
-    sender = WhatsAppBulkSender()
+    load_environment()
+    setup_logging()
+    
+    suppression_db = args.suppression or os.getenv('SUPPRESSION_DB')
+    suppression = SuppressionStore(suppression_db) if suppression_db else None
+    
+    if args.command == 'suppress':
+        if suppression is None:
+            print("❌ No suppression list given (use --suppression or SUPPRESSION_DB)")
+            sys.exit(1)
+        with suppression:
+            run_suppress(suppression, args)
+        return
+    
+    if args.command == 'validate':
+        ok = validate_contacts(args.file, args.sheet, args.message or "Hello {name}!", args.country_code, args.report)
+        sys.exit(0 if ok else 1)
+    
+    schedule_db = args.schedule_db or default_store_path()
+    if args.command == 'schedule':
+        with CampaignStore(schedule_db) as store:
+            run_schedule(store, args, suppression_db)
+        return
+    
+    registry = MetricsRegistry()
+    retry_policy = RetryPolicy.from_env(args.max_attempts)
+    try:
+        if args.sessions > 1:
+            sender = WhatsAppBulkSender(sessions=create_sessions(args.sessions, args.transport),
+                                        suppression=suppression, metrics=registry, retry_policy=retry_policy)
+        else:
+            sender = WhatsAppBulkSender(transport=create_transport(args.transport) if args.transport else None,
+                                        suppression=suppression, metrics=registry, retry_policy=retry_policy)
+    except TransportError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    
+    metrics_server = registry.serve(args.metrics_port) if args.metrics_port else None
+    metrics_exporter = registry.start_file_exporter(args.metrics_file) if args.metrics_file else None
     
     try:
         if args.command == 'single':
@@ -61,51 +371,79 @@ def main():
                 print("❌ Failed to send message")
                 sys.exit(1)
         
-        elif args.command == 'csv':
-            contacts = sender.load_contacts_from_csv(args.file)
-            if not contacts:
-                print("❌ Failed to load contacts from CSV file")
+        elif args.command in ('csv', 'excel', 'files'):
+            message = args.message or "Hello {name}!"
+            files = args.file if args.command == 'files' else [args.file]
+            if not args.no_validate and not validate_contacts(files, getattr(args, 'sheet', None), message,
+                                                              args.country_code):
+                print("❌ Fix the problems above before sending (or pass --no-validate)")
                 sys.exit(1)
             
-            default_message = args.message or "Hello {name}!"
-            results = sender.send_bulk_messages(
-                contacts, 
-                default_message, 
-                args.hour, 
-                args.minute
-            )
-            
-            print(f"✅ Bulk sending completed!")
-            print(f"📤 Sent: {results['success']}")
-            print(f"❌ Failed: {results['failed']}")
+            chunk_size = getattr(args, 'chunk_size', 10000)
+            journal = CampaignJournal(args.journal) if args.journal else None
+            if journal is not None:
+                journal.set_metadata(
+                    source=args.command,
+                    file=([os.path.abspath(path) for path in args.file] if args.command == 'files'
+                          else os.path.abspath(args.file)),
+                    sheet=getattr(args, 'sheet', None),
+                    message=message,
+                    chunk_size=chunk_size,
+                    country_code=args.country_code,
+                    dead_letter=os.path.abspath(args.dead_letter or default_dead_letter(args.command, args.file)),
+                    suppression=os.path.abspath(suppression_db) if suppression_db else None
+                )
             
-            if results['failed_contacts']:
-                print("\n❌ Failed contacts:")
-                for contact in results['failed_contacts']:
-                    print(f"  - {contact['phone']} ({contact['name']}): {contact['error']}")
+            try:
+                run_campaign(
+                    sender, args.command, args.file, getattr(args, 'sheet', None), chunk_size,
+                    message, args.hour, args.minute, journal, args.country_code,
+                    args.dead_letter, getattr(args, 'workers', None), args.results
+                )
+            finally:
+                if journal is not None:
+                    journal.close()
         
-        elif args.command == 'excel':
-            contacts = sender.load_contacts_from_excel(args.file, args.sheet)
-            if not contacts:
-                print("❌ Failed to load contacts from Excel file")
+        elif args.command == 'resume':
+            if not os.path.exists(args.journal):
+                print(f"❌ Journal not found: {args.journal}")
                 sys.exit(1)
             
-            default_message = args.message or "Hello {name}!"
-            results = sender.send_bulk_messages(
-                contacts, 
-                default_message, 
-                args.hour, 
-                args.minute
-            )
-            
-            print(f"✅ Bulk sending completed!")
-            print(f"📤 Sent: {results['success']}")
-            print(f"❌ Failed: {results['failed']}")
-            
-            if results['failed_contacts']:
-                print("\n❌ Failed contacts:")
-                for contact in results['failed_contacts']:
-                    print(f"  - {contact['phone']} ({contact['name']}): {contact['error']}")
+            with CampaignJournal(args.journal) as journal:
+                campaign = journal.get_metadata()
+                if 'source' not in campaign:
+                    print("❌ Journal has no campaign settings to resume from")
+                    sys.exit(1)
+                
+                # The campaign's own suppression list, even if it isn't given this time
+                campaign_suppression = None
+                recorded = campaign.get('suppression')
+                if recorded:
+                    if not os.path.exists(recorded):
+                        print(f"❌ The campaign's suppression list is missing: {recorded}")
+                        sys.exit(1)
+                    if suppression is None or os.path.abspath(suppression.path) != recorded:
+                        campaign_suppression = SuppressionStore(recorded)
+                
+                print(f"🔁 Resuming campaign from {campaign['file']} "
+                      f"({journal.delivered_count} contacts already delivered)")
+                try:
+                    run_campaign(
+                        sender, campaign['source'], campaign['file'], campaign.get('sheet'),
+                        campaign.get('chunk_size', 10000), campaign['message'], None, None, journal,
+                        campaign.get('country_code'), campaign.get('dead_letter'),
+                        suppression=campaign_suppression
+                    )
+                finally:
+                    if campaign_suppression is not None:
+                        campaign_suppression.close()
+        
+        elif args.command == 'daemon':
+            with CampaignStore(schedule_db) as store:
+                scheduler = CampaignScheduler(store, sender, args.rescan_interval)
+                signal.signal(signal.SIGTERM, lambda signum, frame: scheduler.stop())
+                print(f"⏰ Scheduler daemon running on {schedule_db} (Ctrl+C to stop)")
+                scheduler.run()
         
         elif args.command == 'sample':
             sender.create_sample_contacts_file(args.file)
@@ -117,6 +455,11 @@ def main():
     except Exception as e:
         print(f"❌ Error: {e}")
         sys.exit(1)
+    finally:
+        if metrics_exporter is not None:
+            metrics_exporter.stop()
+        if metrics_server is not None:
+            metrics_server.shutdown()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,380 @@
+"""
+Compact contact storage for WhatsApp Bulk Sender.
+
+A loaded contact list used to be a list of dicts, which at millions of
+contacts costs hundreds of bytes per contact in dict and string objects
+before any work starts. ContactStore keeps the contacts column by column:
+
+- phone numbers as 64-bit integers
+- text columns (name, ...) as one UTF-8 buffer with a sparse offset index
+- columns with few distinct values (typically the message) as an array of
+  codes into the distinct values
+- numeric columns as numpy arrays
+
+Contacts are only turned into objects when they are read, as Contact
+records: read-only mappings with __slots__, so code written for dicts
+(contact['phone'], contact.get('name'), {**contact}) keeps working. The
+loaders, the sender and the results all pass these records around, and
+failed contacts are kept as FailedContact records that share their strings
+while the campaign runs, and handed back as plain dicts when it finishes.
+"""
+
+import itertools
+import re
+from array import array
+from collections.abc import Mapping, Sequence
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from message_templates import is_missing
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+# The fields every contact has; any others are kept as extra fields
+BASE_FIELDS = ('phone', 'name', 'message')
+
+# Contacts decoded at a time while iterating over a ContactStore
+ITER_BLOCK_SIZE = 4096
+
+# Numbers that fit the integer phone column: '+' and up to 19 digits, no leading zero
+_CANONICAL_PHONE = re.compile(r'\+[1-9]\d{0,18}')
+
+
+class Contact(Mapping):
+    """
+    One contact: phone, name and message plus any extra fields from the
+    contacts file. Behaves like a read-only dict.
+    """
+
+    __slots__ = ('phone', 'name', 'message', '_keys', '_values')
+
+    def __init__(self, phone: str, name='', message='', keys: Tuple[str, ...] = (), values: Tuple = ()):
+        self.phone = phone
+        self.name = name
+        self.message = message
+        self._keys = keys  # extra field names, shared by all contacts from the same store
+        self._values = values
+
+    @classmethod
+    def from_mapping(cls, values: Mapping) -> 'Contact':
+        """A contact with the fields of a dict (or any mapping with a 'phone' key)."""
+        if isinstance(values, Contact):
+            return values
+        keys = tuple(key for key in values if key not in BASE_FIELDS)
+        return cls(values['phone'], values.get('name', ''), values.get('message', ''),
+                   keys, tuple(values[key] for key in keys))
+
+    def __getitem__(self, key):
+        if key == 'phone':
+            return self.phone
+        if key == 'name':
+            return self.name
+        if key == 'message':
+            return self.message
+        try:
+            return self._values[self._keys.index(key)]
+        except ValueError:
+            raise KeyError(key) from None
+
+    def __iter__(self) -> Iterator[str]:
+        yield from BASE_FIELDS
+        yield from self._keys
+
+    def __len__(self) -> int:
+        return len(BASE_FIELDS) + len(self._keys)
+
+    def to_dict(self) -> Dict:
+        """The contact as a plain dict (e.g. for JSON)."""
+        return dict(self)
+
+    def replace(self, **changes) -> 'Contact':
+        """A copy with some fields changed (phone, name, message or extra fields)."""
+        values = list(self._values)
+        for key, value in changes.items():
+            if key not in BASE_FIELDS:
+                values[self._keys.index(key)] = value
+        return Contact(changes.get('phone', self.phone), changes.get('name', self.name),
+                       changes.get('message', self.message), self._keys, tuple(values))
+
+    def __repr__(self):
+        return f"Contact({dict(self)!r})"
+
+
+class FailedContact(Mapping):
+    """A contact that could not be messaged, as kept in results['failed_contacts']."""
+
+    __slots__ = ('phone', 'name', 'error', 'attempts')
+
+    _FIELDS = ('phone', 'name', 'error', 'attempts')
+
+    def __init__(self, phone: str, name, error: str, attempts: int = 1):
+        self.phone = phone
+        self.name = name
+        self.error = error
+        self.attempts = attempts
+
+    def __getitem__(self, key):
+        if key not in self._FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._FIELDS)
+
+    def __len__(self) -> int:
+        return len(self._FIELDS)
+
+    def to_dict(self) -> Dict:
+        """The record as a plain dict (e.g. for JSON)."""
+        return {'phone': self.phone, 'name': self.name, 'error': self.error, 'attempts': self.attempts}
+
+    def __repr__(self):
+        return f"FailedContact({dict(self)!r})"
+
+
+def frame_from_rows(rows: List[tuple], columns: List[str]) -> 'pd.DataFrame':
+    """
+    DataFrame from worksheet rows, with the phone column kept as text the way
+    the file loaders read it (pandas would turn a column of numbers with a
+    blank cell into floats, so 9876543210 became '9876543210.0').
+    """
+    import pandas as pd
+
+    df = pd.DataFrame(rows, columns=columns)
+    if 'phone' in columns:
+        position = columns.index('phone')
+        df['phone'] = pd.Series([None if row[position] is None else str(row[position]) for row in rows],
+                                index=df.index, dtype=object)
+    return df
+
+
+def with_phone(contact: Mapping, phone: str) -> Mapping:
+    """The contact with its phone number replaced by `phone` (dicts stay dicts)."""
+    if isinstance(contact, Contact):
+        return contact.replace(phone=phone)
+    return {**contact, 'phone': phone}
+
+
+class _TextColumn:
+    """
+    Strings stored as one UTF-8 buffer, each followed by a NUL character, so
+    a run of them is decoded and split in one go. Only the offset of every
+    INDEX_STEP-th string is kept; reading one string decodes its run.
+    """
+
+    SEPARATOR = '\x00'
+    INDEX_STEP = 64
+
+    def __init__(self, values: List[str]):
+        self._data = (self.SEPARATOR.join(values) + self.SEPARATOR).encode('utf-8')
+        self._length = len(values)
+        if len(self._data) == sum(map(len, values)) + len(values):
+            lengths = (len(value) + 1 for value in values)  # all ASCII
+        else:
+            lengths = (len(value.encode('utf-8')) + 1 for value in values)
+        offsets = itertools.islice(itertools.accumulate(lengths, initial=0), 0, None, self.INDEX_STEP)
+        self._offsets = array('Q', offsets)
+
+    def _offset(self, step: int) -> int:
+        return self._offsets[step] if step < len(self._offsets) else len(self._data)
+
+    def __getitem__(self, index: int) -> str:
+        return self.block(index, index + 1)[0]
+
+    def block(self, start: int, stop: int) -> List[str]:
+        first = start // self.INDEX_STEP
+        last = min(-(-stop // self.INDEX_STEP), -(-self._length // self.INDEX_STEP))
+        values = self._data[self._offsets[first]:self._offset(last) - 1].decode('utf-8').split(self.SEPARATOR)
+        skip = start - first * self.INDEX_STEP
+        return values[skip:skip + stop - start]
+
+    def nbytes(self) -> int:
+        return len(self._data) + self._offsets.itemsize * len(self._offsets)
+
+
+class _PhoneColumn:
+    """Canonical '+<digits>' phone numbers stored as 64-bit integers"""
+
+    def __init__(self, numbers: array):
+        self._numbers = numbers
+
+    @classmethod
+    def build(cls, phones: List[str]) -> Optional['_PhoneColumn']:
+        """The column, or None if some numbers are not canonical."""
+        if not all(type(phone) is str and _CANONICAL_PHONE.fullmatch(phone) for phone in phones):
+            return None
+        return cls(array('Q', [int(phone[1:]) for phone in phones]))
+
+    def __getitem__(self, index: int) -> str:
+        return f"+{self._numbers[index]}"
+
+    def block(self, start: int, stop: int) -> List[str]:
+        return list(map('+{}'.format, self._numbers[start:stop]))
+
+    def nbytes(self) -> int:
+        return self._numbers.itemsize * len(self._numbers)
+
+
+class _CodedColumn:
+    """Values with few distinct values, stored as codes into the distinct values"""
+
+    def __init__(self, values: List, distinct: Dict):
+        self._values = list(distinct)
+        codes = {value: code for code, value in enumerate(self._values)}
+        self._codes = array('B' if len(codes) <= 2 ** 8 else 'H' if len(codes) <= 2 ** 16 else 'I',
+                            map(codes.__getitem__, values))
+
+    def __getitem__(self, index: int):
+        return self._values[self._codes[index]]
+
+    def block(self, start: int, stop: int) -> List:
+        return list(map(self._values.__getitem__, self._codes[start:stop]))
+
+    def nbytes(self) -> int:
+        return self._codes.itemsize * len(self._codes)
+
+
+class _ArrayColumn:
+    """A numeric column kept as its numpy array"""
+
+    def __init__(self, values):
+        self._values = values
+
+    def __getitem__(self, index: int):
+        return self._values[index].item()
+
+    def block(self, start: int, stop: int) -> List:
+        return self._values[start:stop].tolist()
+
+    def nbytes(self) -> int:
+        return self._values.nbytes
+
+
+class _ObjectColumn:
+    """Fallback for values of mixed types"""
+
+    def __init__(self, values: List):
+        self._values = values
+
+    def __getitem__(self, index: int):
+        return self._values[index]
+
+    def block(self, start: int, stop: int) -> List:
+        return self._values[start:stop]
+
+    def nbytes(self) -> int:
+        return 8 * len(self._values)
+
+
+def _column(values):
+    """The most compact column type for a list (or numpy array) of values"""
+    if hasattr(values, 'dtype'):
+        if values.dtype.kind in 'biuf':
+            return _ArrayColumn(values)
+        values = values.tolist()
+    if not values:
+        return _ObjectColumn(values)
+
+    # Missing markers (None, NaN) all become '' so they share one code
+    values = [value if type(value) is str or not is_missing(value) else '' for value in values]
+    try:
+        distinct = dict.fromkeys(values)
+    except TypeError:
+        return _ObjectColumn(values)  # unhashable values
+    if len(distinct) <= len(values) // 2:
+        return _CodedColumn(values, distinct)
+    if all(type(value) is str and _TextColumn.SEPARATOR not in value for value in distinct):
+        return _TextColumn(values)
+    return _ObjectColumn(values)
+
+
+class ContactStore(Sequence):
+    """
+    A read-only list of contacts stored column by column (see the module
+    docstring). Indexing and iteration produce Contact records.
+
+    Args:
+        phones: Phone numbers (already normalized)
+        names: Names, or None for no names
+        messages: Per-contact messages, or None to use the campaign default
+        extra: Any other fields by name, each a list or numpy array as long as phones
+    """
+
+    def __init__(self, phones: List[str], names: Optional[List] = None, messages: Optional[List] = None,
+                 extra: Optional[Dict[str, Iterable]] = None):
+        self._length = len(phones)
+        self._phones = _PhoneColumn.build(phones) or _column(list(phones))
+        self._names = _column(names) if names is not None else None
+        self._messages = _column(messages) if messages is not None else None
+        extra = extra or {}
+        self._keys = tuple(str(key) for key in extra)
+        self._extra = tuple(_column(values) for values in extra.values())
+
+    @classmethod
+    def from_dataframe(cls, df: 'pd.DataFrame', phones: Optional[List[str]] = None) -> 'ContactStore':
+        """
+        Contacts from a DataFrame with a 'phone' column and optionally 'name',
+        'message' and any other columns. Pass phones to use already normalized numbers.
+        """
+        if phones is None:
+            phones = df['phone'].tolist()
+        extra = {column: df[column].to_numpy() if df[column].dtype.kind in 'biuf' else df[column].tolist()
+                 for column in df.columns if column not in BASE_FIELDS}
+        return cls(phones,
+                   df['name'].tolist() if 'name' in df.columns else None,
+                   df['message'].tolist() if 'message' in df.columns else None,
+                   extra)
+
+    @classmethod
+    def from_records(cls, contacts: Iterable[Mapping]) -> 'ContactStore':
+        """Contacts from dicts; fields missing from some of them are left empty."""
+        contacts = list(contacts)
+        keys = list(dict.fromkeys(key for contact in contacts for key in contact if key not in BASE_FIELDS))
+        return cls([contact['phone'] for contact in contacts],
+                   [contact.get('name', '') for contact in contacts],
+                   [contact.get('message', '') for contact in contacts],
+                   {key: [contact.get(key) for contact in contacts] for key in keys})
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._contact(i) for i in range(*index.indices(self._length))]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError('contact index out of range')
+        return self._contact(index)
+
+    def __iter__(self) -> Iterator[Contact]:
+        # Columns are decoded a block at a time, which is much faster than one value at a time
+        for start in range(0, self._length, ITER_BLOCK_SIZE):
+            stop = min(start + ITER_BLOCK_SIZE, self._length)
+            count = stop - start
+            names = self._names.block(start, stop) if self._names is not None else itertools.repeat('', count)
+            messages = self._messages.block(start, stop) if self._messages is not None \
+                else itertools.repeat('', count)
+            extra = zip(*(column.block(start, stop) for column in self._extra)) if self._extra \
+                else itertools.repeat((), count)
+            keys = self._keys
+            for phone, name, message, values in zip(self._phones.block(start, stop), names, messages, extra):
+                yield Contact(phone, name, message, keys, values)
+
+    def _contact(self, index: int) -> Contact:
+        return Contact(
+            self._phones[index],
+            self._names[index] if self._names is not None else '',
+            self._messages[index] if self._messages is not None else '',
+            self._keys,
+            tuple(column[index] for column in self._extra)
+        )
+
+    def nbytes(self) -> int:
+        """Bytes held by the stored columns (not counting shared distinct values)"""
+        columns = [self._phones, self._names, self._messages, *self._extra]
+        return sum(column.nbytes() for column in columns if column is not None)
+
+    def __repr__(self):
+        return f"ContactStore({self._length} contacts)"
@@ -0,0 +1,418 @@
+"""
+Central campaign dispatcher for WhatsApp Bulk Sender.
+
+send_bulk_messages() runs one campaign at a time, so a ten-message alert
+started after a 50k-contact blast waits for the whole blast. A Dispatcher
+holds any number of campaigns at once and hands every send slot of the
+sender's sessions to one of them:
+
+- priority lanes: 'urgent' campaigns go before 'normal' ones, which go
+  before 'bulk'. The lane is checked for every slot, so an urgent campaign
+  takes the very next one while still respecting the sessions' rate limits.
+- weighted fair share: campaigns in the same lane take turns in proportion
+  to their weights (stride scheduling), so one large campaign can't starve
+  the others in its lane.
+
+Each campaign keeps its own results, journal, dead-letter file, retries and
+progress callback, just like a send_bulk_messages() call. Its contacts are
+loaded ahead by a feeder thread of its own, so a slow source (file parsing,
+journal and suppression lookups) never holds up the other campaigns.
+"""
+
+import heapq
+import itertools
+import logging
+import math
+import threading
+import time
+import uuid
+from collections import deque
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, List, Optional
+
+from campaign_journal import CampaignJournal
+from result_log import ResultLog
+from retry import DeadLetterFile
+from send_scheduler import wall_time
+
+if TYPE_CHECKING:
+    from sessions import SenderSession
+    from whatsapp_bulk_sender import WhatsAppBulkSender
+
+
+URGENT = 'urgent'
+NORMAL = 'normal'
+BULK = 'bulk'
+
+# Lanes from highest to lowest priority
+PRIORITIES = (URGENT, NORMAL, BULK)
+
+# Longest an idle session waits before checking for cancelled campaigns again
+POLL_INTERVAL = 0.5
+
+# New contacts each campaign's feeder loads ahead of the sessions
+PREFETCH = 256
+
+
+def validate_weight(weight: float) -> float:
+    """Return weight, or raise ValueError unless it is a positive finite number."""
+    if not math.isfinite(weight) or weight <= 0:
+        raise ValueError("weight must be a positive finite number")
+    return weight
+
+
+class Campaign:
+    """
+    One campaign held by a Dispatcher (returned by Dispatcher.submit).
+
+    Use wait() for its results, and cancel() or its cancel_event to stop it;
+    messages already being sent finish first.
+    """
+
+    def __init__(self, contacts: Iterable[Dict], default_message: str, priority: str, weight: float,
+                 start_at: float, results: Dict, cancel_event: threading.Event,
+                 journal: Optional[CampaignJournal] = None, dead_letter: Optional[DeadLetterFile] = None,
+                 progress: Optional[Callable[[Dict, Dict, str], None]] = None, name: Optional[str] = None,
+                 result_log: Optional[ResultLog] = None):
+        self.id = uuid.uuid4().hex[:12]
+        self.name = name or self.id
+        self.default_message = default_message
+        self.priority = priority
+        self.weight = weight
+        self.start_at = start_at
+        self.results = results
+        self.cancel_event = cancel_event
+        self.journal = journal
+        self.dead_letter = dead_letter
+        self.progress = progress
+        self.result_log = result_log
+        self.dispatched = 0
+        self.in_flight = 0
+        self.error = None
+        self._contacts = contacts
+        self._buffer = deque()  # contacts loaded by the feeder thread
+        self._exhausted = False  # set once the feeder has loaded every contact
+        self._retries = []  # heap of (due, sequence, contact, attempt)
+        self._pass = 0.0  # stride scheduling position; the lowest in a lane goes next
+        self._done = threading.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self._done.is_set()
+
+    def cancel(self):
+        """Stop handing out this campaign's contacts."""
+        self.cancel_event.set()
+
+    def wait(self, timeout: Optional[float] = None) -> Optional[Dict]:
+        """
+        Wait for the campaign to finish and return its results, or None on
+        timeout. Raises the error that stopped it, if loading its contacts failed.
+        """
+        if not self._done.wait(timeout):
+            return None
+        if self.error is not None:
+            raise self.error
+        return self.results
+
+    def to_dict(self) -> Dict:
+        return {
+            'id': self.id,
+            'name': self.name,
+            'priority': self.priority,
+            'weight': self.weight,
+            'dispatched': self.dispatched,
+            'in_flight': self.in_flight,
+            'retries_pending': len(self._retries),
+            'finished': self.finished
+        }
+
+
+class Dispatcher:
+    """
+    Runs many campaigns at once over one sender's sessions, with priority
+    lanes and weighted fair sharing (see the module docstring).
+
+    Every session of the sender gets a worker thread. Once some contact is
+    due, it takes its next send slot from the session's rate limiter and only
+    then picks the campaign and contact to use it for, so campaigns submitted
+    while a session is waiting are considered for that slot. No slot is held
+    while the dispatcher is idle.
+
+    Args:
+        sender: WhatsAppBulkSender whose sessions, retry policy, suppression
+            list and metrics the campaigns use
+        poll_interval: Longest an idle session waits before checking for
+            campaigns cancelled through their cancel_event
+    """
+
+    def __init__(self, sender: 'WhatsAppBulkSender', poll_interval: float = POLL_INTERVAL):
+        self.sender = sender
+        self.poll_interval = poll_interval
+        self._lanes = {priority: [] for priority in PRIORITIES}
+        self._virtual_time = {priority: 0.0 for priority in PRIORITIES}
+        self._sequence = itertools.count()
+        self._changed = threading.Condition()
+        self._stopping = False
+        self._workers = [
+            threading.Thread(target=self._work, args=(session,), name=f'dispatch-{session.name}', daemon=True)
+            for session in sender.sessions
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.shutdown(cancel=exc_type is not None)
+
+    def submit(self, contacts: Iterable[Dict], default_message: str = "", priority: str = NORMAL,
+               weight: float = 1.0, start_hour: int = None, start_minute: int = None,
+               journal: Optional[CampaignJournal] = None, dedupe: bool = True,
+               dead_letter: Optional[DeadLetterFile] = None,
+               progress: Optional[Callable[[Dict, Dict, str], None]] = None,
+               cancel_event: Optional[threading.Event] = None, name: Optional[str] = None,
+               result_log: Optional[ResultLog] = None) -> Campaign:
+        """
+        Add a campaign and return it without waiting for it.
+
+        Args:
+            contacts: Contact dictionaries (a list or any iterable)
+            default_message: Default message for contacts without their own
+            priority: Lane: 'urgent', 'normal' or 'bulk'
+            weight: Share of its lane's send slots relative to the other campaigns in the lane
+            name: Label used in logs (defaults to the campaign id)
+
+        The remaining arguments work as in WhatsAppBulkSender.send_bulk_messages.
+        """
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority {priority!r} (choose from {', '.join(PRIORITIES)})")
+        validate_weight(weight)
+
+        results = self.sender._new_results()
+        start_at = self.sender._campaign_start(contacts, start_hour, start_minute)
+        cancel_event = cancel_event or threading.Event()
+        pending = self.sender._pending_contacts(contacts, journal, results, dedupe, cancel_event)
+        campaign = Campaign(pending, default_message, priority, weight, start_at, results, cancel_event,
+                            journal, dead_letter, progress, name, result_log)
+
+        with self._changed:
+            if self._stopping:
+                raise RuntimeError("The dispatcher has been shut down")
+            # Join at the lane's current position instead of catching up on past slots
+            campaign._pass = self._virtual_time[priority]
+            self._lanes[priority].append(campaign)
+            self._changed.notify_all()
+        self.sender.metrics.campaigns_running.inc()
+        threading.Thread(target=self._feed, args=(campaign,), name=f'feed-{campaign.name}', daemon=True).start()
+        logging.info(f"Dispatching campaign {campaign.name} ({priority}, weight {weight:g})")
+        return campaign
+
+    def send(self, contacts: Iterable[Dict], default_message: str = "", **kwargs) -> Dict:
+        """Submit a campaign and wait for its results (arguments as for submit)."""
+        return self.submit(contacts, default_message, **kwargs).wait()
+
+    def cancel(self, campaign: Campaign):
+        campaign.cancel()
+        with self._changed:
+            self._changed.notify_all()
+
+    def campaigns(self) -> List[Campaign]:
+        """Unfinished campaigns, highest priority first"""
+        with self._changed:
+            return [campaign for priority in PRIORITIES for campaign in self._lanes[priority]]
+
+    def stats(self) -> Dict:
+        with self._changed:
+            return {
+                'sessions': len(self._workers),
+                'lanes': {priority: len(self._lanes[priority]) for priority in PRIORITIES},
+                'in_flight': sum(campaign.in_flight for priority in PRIORITIES
+                                 for campaign in self._lanes[priority])
+            }
+
+    def shutdown(self, cancel: bool = True, timeout: Optional[float] = None):
+        """
+        Stop the session workers. Unfinished campaigns are cancelled, or
+        waited for if cancel is False.
+        """
+        for campaign in self.campaigns():
+            if cancel:
+                campaign.cancel()
+            else:
+                campaign._done.wait(timeout)
+        with self._changed:
+            self._stopping = True
+            self._changed.notify_all()
+        for worker in self._workers:
+            worker.join(timeout)
+        with self._changed:
+            for campaign in [campaign for priority in PRIORITIES for campaign in self._lanes[priority]]:
+                self._finish(campaign)
+
+    def _work(self, session: 'SenderSession'):
+        while True:
+            # Wait until something is due before taking a slot: a slot taken
+            # before an idle period would let the next two messages go out back
+            # to back. Then take the slot, and only then decide who gets it.
+            if not self._wait_for_work():
+                return
+            waited = session.rate_limiter.acquire()
+            with self._changed:
+                item = None if self._stopping else self._pick(time.monotonic())[0]
+            if item is None:
+                continue  # another session took it, or the dispatcher is stopping
+
+            campaign, contact, attempt, due = item
+            try:
+                outcome = self.sender._send_contact(
+                    session, contact, campaign.default_message, campaign.results, campaign.journal, attempt,
+                    lambda contact, attempt, delay: self._requeue(campaign, contact, attempt, delay),
+                    campaign.dead_letter, waited, campaign.result_log, wall_time(due) if due is not None else None,
+                    campaign.cancel_event
+                )
+                if outcome is not None and campaign.progress is not None:
+                    campaign.progress(campaign.results, contact, outcome)
+            except Exception as e:
+                logging.error(f"[{session.name}] Campaign {campaign.name} failed to send to {contact['phone']}: {e}")
+            finally:
+                with self._changed:
+                    campaign.in_flight -= 1
+                    self._check_finished(campaign)
+                    self._changed.notify_all()
+
+    def _wait_for_work(self) -> bool:
+        """
+        Block until some campaign has a contact due, without taking it.
+        Returns False when the dispatcher is stopping.
+        """
+        with self._changed:
+            while not self._stopping:
+                now = time.monotonic()
+                due = self._next_due(now)
+                if due is not None and due <= now:
+                    return True
+                timeout = self.poll_interval if due is None else min(self.poll_interval, due - now)
+                self._changed.wait(max(0.0, timeout))
+            return False
+
+    def _next_due(self, now: float) -> Optional[float]:
+        """Earliest monotonic time any campaign has a contact due (None if none has one)."""
+        earliest = None
+        for priority in PRIORITIES:
+            for campaign in list(self._lanes[priority]):
+                if self._check_finished(campaign) or campaign.cancel_event.is_set():
+                    continue
+                due = self._due(campaign, now)
+                if due is not None:
+                    earliest = due if earliest is None else min(earliest, due)
+        return earliest
+
+    def _pick(self, now: float):
+        """
+        Choose the next contact: the highest lane with a campaign that has
+        one due, and within it the campaign furthest behind on its share.
+        Returns (item or None, monotonic time something becomes due or None),
+        where item is (campaign, contact, attempt, monotonic due time of a
+        retry or None).
+        """
+        wake_at = None
+        for priority in PRIORITIES:
+            ready = []
+            waiting = []
+            for campaign in list(self._lanes[priority]):
+                if self._check_finished(campaign) or campaign.cancel_event.is_set():
+                    continue
+                due = self._due(campaign, now)
+                if due is None:
+                    continue
+                if due <= now:
+                    ready.append(campaign)
+                else:
+                    waiting.append(campaign)
+                    wake_at = due if wake_at is None else min(wake_at, due)
+            if not ready:
+                continue
+
+            campaign = min(ready, key=lambda campaign: campaign._pass)
+            position = campaign._pass
+            self._virtual_time[priority] = position
+            campaign._pass += 1.0 / campaign.weight
+            # Campaigns that had nothing due don't bank the slots they missed
+            for other in waiting:
+                other._pass = max(other._pass, position)
+
+            if campaign._retries and campaign._retries[0][0] <= now:
+                due, _, contact, attempt = heapq.heappop(campaign._retries)
+            else:
+                due, contact, attempt = None, campaign._buffer.popleft(), 1
+                self._changed.notify_all()  # the feeder can load another
+            campaign.dispatched += 1
+            campaign.in_flight += 1
+            return (campaign, contact, attempt, due), wake_at
+        return None, wake_at
+
+    def _due(self, campaign: Campaign, now: float) -> Optional[float]:
+        """When the campaign next has a contact to send (None if it has none left)."""
+        due = None
+        if campaign._retries:
+            due = campaign._retries[0][0]
+        if campaign._buffer:
+            due = now if due is None else min(due, now)
+        return max(due, campaign.start_at) if due is not None else None
+
+    def _feed(self, campaign: Campaign):
+        """
+        Load the campaign's contacts into its buffer, up to PREFETCH ahead,
+        without holding the dispatcher lock while the source is read.
+        """
+        def stopped():
+            return campaign.cancel_event.is_set() or self._stopping
+
+        try:
+            for contact in campaign._contacts:
+                with self._changed:
+                    campaign._buffer.append(contact)
+                    self._changed.notify_all()
+                    while len(campaign._buffer) >= PREFETCH and not stopped():
+                        self._changed.wait(self.poll_interval)
+                    if stopped():
+                        break
+        except Exception as e:
+            logging.error(f"Loading contacts for campaign {campaign.name} failed: {e}")
+            with self._changed:
+                campaign.error = e
+                campaign.cancel_event.set()
+        finally:
+            with self._changed:
+                campaign._exhausted = True
+                self._changed.notify_all()
+
+    def _requeue(self, campaign: Campaign, contact: Dict, attempt: int, delay: float):
+        with self._changed:
+            heapq.heappush(campaign._retries, (time.monotonic() + delay, next(self._sequence), contact, attempt))
+            self._changed.notify_all()
+
+    def _check_finished(self, campaign: Campaign) -> bool:
+        """Finish the campaign if it has nothing left to send. Returns whether it is finished."""
+        if campaign.finished:
+            return True
+        if campaign.in_flight or not (campaign.cancel_event.is_set()
+                                      or (campaign._exhausted and not campaign._buffer and not campaign._retries)):
+            return False
+        self._finish(campaign)
+        return True
+
+    def _finish(self, campaign: Campaign):
+        self._lanes[campaign.priority].remove(campaign)
+        self.sender.metrics.campaigns_running.dec()
+        if campaign.journal is not None:
+            campaign.journal.flush()
+        if campaign.result_log is not None:
+            campaign.result_log.flush()
+        if campaign.cancel_event.is_set() and campaign.error is None:
+            campaign.results['cancelled'] = True
+            logging.warning(f"Campaign {campaign.name} cancelled")
+        logging.info(f"Campaign {campaign.name} ({campaign.priority}) finished")
+        self.sender._log_completion(campaign.results)
+        campaign._done.set()
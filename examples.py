@@ -1,4 +1,4 @@
-from whatsapp_bulk_sender import WhatsAppBulkSender
+from whatsapp_bulk_sender import WhatsAppBulkSender, setup_logging
 import pandas as pd
 
 def example_usage():
@@ -96,6 +96,8 @@ def advanced_example():
     # print(f"Results: {results}")
 
 if __name__ == "__main__":
+    setup_logging()
+    
     print("WhatsApp Bulk Sender - Examples")
     print("=" * 40)
     
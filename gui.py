@@ -1,8 +1,23 @@
 import tkinter as tk
 from tkinter import messagebox, scrolledtext
-from whatsapp_bulk_sender import WhatsAppBulkSender
+from whatsapp_bulk_sender import WhatsAppBulkSender, load_environment, setup_logging
 import threading
 
+# Latest progress of the running campaign, written by the sending thread and
+# shown by refresh_status() on the Tk thread twice a second
+progress = {}
+
+def refresh_status():
+    if progress:
+        results = progress['results']
+        status_label.config(text=f"Sent: {results['success']}  Failed: {results['failed']}  "
+                                 f"Retried: {results['retried']}  of {progress['total']}\n"
+                                 f"{progress['last']}")
+        if progress.get('done'):
+            progress.clear()
+            messagebox.showinfo("Done", f"Sent: {results['success']}\nFailed: {results['failed']}")
+    root.after(500, refresh_status)
+
 def send_messages():
     numbers = phone_entry.get()
     message = message_text.get("1.0", tk.END).strip()
@@ -19,16 +34,23 @@ def send_messages():
     # Prepare contacts list for WhatsAppBulkSender
     contacts = [{"phone": num, "name": "", "message": message} for num in phone_list]
     
+    def on_progress(results, contact, outcome):
+        progress.update(results=dict(results), total=len(contacts), last=f"{contact['phone']}: {outcome}")
+    
     def run_sender():
         sender = WhatsAppBulkSender()
-        result = sender.send_bulk_messages(contacts, message)
-        messagebox.showinfo("Done", f"Sent: {result['success']}\nFailed: {result['failed']}")
+        result = sender.send_bulk_messages(contacts, message, progress=on_progress)
+        progress.update(results=result, total=len(contacts), done=True, last=progress.get('last', ''))
     
+    status_label.config(text=f"Sending to {len(contacts)} numbers...")
     threading.Thread(target=run_sender).start()
 
+load_environment()
+setup_logging()
+
 root = tk.Tk()
 root.title("WhatsApp Bulk Sender GUI")
-root.geometry("500x400")
+root.geometry("500x460")
 
 # Message label and box
 tk.Label(root, text="Message:").pack(anchor="w", padx=10, pady=(10,0))
@@ -43,4 +65,9 @@ phone_entry.pack(padx=10, pady=5)
 # Send button
 tk.Button(root, text="Send", command=send_messages, bg="#25D366", fg="white", font=("Arial", 12, "bold")).pack(pady=20)
 
+# Campaign progress
+status_label = tk.Label(root, text="", justify="left")
+status_label.pack(anchor="w", padx=10)
+refresh_status()
+
 root.mainloop()
@@ -0,0 +1,331 @@
+"""
+Background job queue for WhatsApp Bulk Sender.
+
+Campaigns submitted through the web GUI run as jobs on a fixed pool of
+worker threads, each with its own long-lived sender. The queue is bounded
+(by number of jobs and, optionally, by queued contacts), so a burst of
+submissions is rejected up front instead of piling up threads and browser
+sessions on the host. Every job has an id that can be used to follow its
+progress or cancel it.
+
+Jobs also keep their most recent per-contact outcomes and a version number
+that changes on every update, so progress streams can wait for changes and
+send them in batches instead of one message per contact.
+
+Jobs have a priority ('urgent', 'normal' or 'bulk'); higher priority jobs
+leave the queue first. Given a Dispatcher, the workers run their jobs
+through it, so running jobs share its sessions and an urgent job overtakes
+bulk traffic message by message instead of waiting for it to finish.
+"""
+
+import itertools
+import logging
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Callable, Dict, Iterable, List, Optional, Union
+
+from dispatcher import NORMAL, PRIORITIES, Dispatcher, validate_weight
+
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+FINISHED = (DONE, FAILED, CANCELLED)
+
+# Per-contact outcomes kept per job for progress streams
+EVENT_HISTORY = 200
+
+
+class QueueFull(Exception):
+    """Raised when a job is submitted while the queue is at capacity"""
+
+
+class Job:
+    """
+    One bulk campaign waiting in or run by a JobQueue.
+
+    Args:
+        contacts: Contacts to message, or a callable that takes the worker's
+            sender and returns them (e.g. a streaming loader for an uploaded file)
+        message: Default message
+        total: Number of contacts, if known (used for progress)
+        on_finish: Called once the job has finished, however it ended
+        priority: 'urgent', 'normal' or 'bulk'
+        weight: Share of the send slots relative to running jobs of the same priority
+            (only used with a Dispatcher)
+    """
+
+    def __init__(self, contacts: Union[List[Dict], Callable[..., Iterable[Dict]]], message: str = "",
+                 total: Optional[int] = None, on_finish: Optional[Callable[[], None]] = None,
+                 priority: str = NORMAL, weight: float = 1.0):
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority {priority!r} (choose from {', '.join(PRIORITIES)})")
+        validate_weight(weight)
+        self.id = uuid.uuid4().hex[:12]
+        self.contacts = contacts
+        self.message = message
+        self.priority = priority
+        self.weight = weight
+        self.total = len(contacts) if total is None and not callable(contacts) else total
+        self.on_finish = on_finish
+        self.status = QUEUED
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.results = {}
+        self.error = None
+        self.cancel_event = threading.Event()
+        self.events = deque(maxlen=EVENT_HISTORY)
+        self.version = 0
+        self._sequence = 0
+        self._changed = threading.Condition()
+
+    def update(self, results: Dict, contact: Optional[Dict] = None, outcome: Optional[str] = None):
+        """
+        Record a progress snapshot and, if given, the outcome for one contact
+        (used as the sender's progress callback, from the worker thread).
+        """
+        snapshot = {key: results[key] for key in
+                    ('success', 'failed', 'retried', 'duplicates', 'suppressed', 'skipped')}
+        with self._changed:
+            self.results = snapshot
+            if contact is not None:
+                self._sequence += 1
+                self.events.append({'seq': self._sequence, 'phone': contact['phone'],
+                                    'name': contact.get('name', ''), 'status': outcome, 'at': time.time()})
+            self._notify()
+
+    def touch(self):
+        """Wake progress streams after a status change."""
+        with self._changed:
+            self._notify()
+
+    def _notify(self):
+        self.version += 1
+        self._changed.notify_all()
+
+    def wait_for_update(self, version: int, timeout: Optional[float] = None) -> int:
+        """Wait until the job's version differs from `version` (or timeout) and return it."""
+        with self._changed:
+            self._changed.wait_for(lambda: self.version != version, timeout)
+            return self.version
+
+    def events_since(self, sequence: int) -> tuple:
+        """
+        Per-contact outcomes recorded after `sequence`, and how many of those
+        are no longer kept (the history holds the most recent EVENT_HISTORY).
+        """
+        with self._changed:
+            events = [event for event in self.events if event['seq'] > sequence]
+        missed = events[0]['seq'] - sequence - 1 if events else 0
+        return events, max(0, missed)
+
+    def to_dict(self) -> Dict:
+        results = dict(self.results)
+        processed = sum(results.get(key, 0) for key in
+                        ('success', 'failed', 'duplicates', 'suppressed', 'skipped'))
+
+        rate = None
+        if self.started_at is not None:
+            elapsed = (self.finished_at or time.time()) - self.started_at
+            attempts = results.get('success', 0) + results.get('failed', 0)
+            rate = attempts / elapsed * 60 if elapsed > 0 else 0.0
+        eta = None
+        if rate and self.total is not None and self.status == RUNNING:
+            eta = round(max(0, self.total - processed) / rate * 60)
+
+        return {
+            'id': self.id,
+            'status': self.status,
+            'priority': self.priority,
+            'weight': self.weight,
+            'cancel_requested': self.cancel_event.is_set(),
+            'total': self.total,
+            'processed': processed,
+            'progress': round(min(1.0, processed / self.total), 4) if self.total else None,
+            'results': results,
+            'messages_per_minute': round(rate, 1) if rate is not None else None,
+            'eta_seconds': eta,
+            'error': self.error,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at
+        }
+
+
+class JobQueue:
+    """
+    Bounded queue of campaign jobs run by a fixed pool of worker threads.
+
+    Without a dispatcher, each worker creates one sender with sender_factory
+    for its first job and reuses it for every job after that. With one, all
+    workers hand their jobs to the dispatcher and wait for them.
+
+    Args:
+        sender_factory: Callable returning a WhatsAppBulkSender
+        workers: Number of worker threads (campaigns running at once)
+        max_queued: Jobs that may wait for a worker before submissions are rejected
+        max_queued_contacts: Optional limit on the contacts waiting in queued jobs
+        history: Finished jobs kept for status queries
+        dispatcher: Dispatcher that runs the jobs (instead of sender_factory)
+    """
+
+    def __init__(self, sender_factory: Optional[Callable] = None, workers: int = 1, max_queued: int = 10,
+                 max_queued_contacts: Optional[int] = None, history: int = 100,
+                 dispatcher: Optional[Dispatcher] = None):
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        if (sender_factory is None) == (dispatcher is None):
+            raise ValueError("pass either sender_factory or dispatcher")
+        self.sender_factory = sender_factory
+        self.dispatcher = dispatcher
+        self.max_queued = max_queued
+        self.max_queued_contacts = max_queued_contacts
+        self.history = history
+        self._queue = queue.PriorityQueue()  # (priority rank, sequence, job)
+        self._sequence = itertools.count()
+        self._jobs = OrderedDict()
+        self._queued = 0
+        self._queued_contacts = 0
+        self._lock = threading.Lock()
+        self._workers = [
+            threading.Thread(target=self._work, name=f'job-worker-{i + 1}', daemon=True)
+            for i in range(workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, contacts: Union[List[Dict], Callable[..., Iterable[Dict]]], message: str = "",
+               total: Optional[int] = None, on_finish: Optional[Callable[[], None]] = None,
+               priority: str = NORMAL, weight: float = 1.0) -> Job:
+        """
+        Queue a campaign and return its job (see Job for the arguments).
+        Raises QueueFull if the queue has no room for it.
+        """
+        job = Job(contacts, message, total, on_finish, priority, weight)
+        with self._lock:
+            if self._queued >= self.max_queued:
+                raise QueueFull(f"{self._queued} jobs are already waiting")
+            if (self.max_queued_contacts is not None and self._queued > 0
+                    and self._queued_contacts + (job.total or 0) > self.max_queued_contacts):
+                raise QueueFull(f"{self._queued_contacts} contacts are already waiting")
+            self._queued += 1
+            self._queued_contacts += job.total or 0
+            self._jobs[job.id] = job
+            self._trim_history()
+        self._queue.put((PRIORITIES.index(priority), next(self._sequence), job))
+        logging.info(f"Queued {priority} job {job.id} with {job.total} contacts")
+        return job
+
+    def full(self) -> bool:
+        """Whether a job submitted now would be rejected for the number of queued jobs"""
+        with self._lock:
+            return self._queued >= self.max_queued
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self) -> List[Job]:
+        """Known jobs, most recent first"""
+        with self._lock:
+            return list(reversed(self._jobs.values()))
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Cancel a queued or running job. A running job stops after the message
+        it is sending. Returns False if the job is unknown or already finished.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status in FINISHED:
+                return False
+            job.cancel_event.set()
+            queued = job.status == QUEUED
+            if queued:
+                self._dequeue(job)
+        if queued:
+            self._finish(job, CANCELLED)
+        logging.info(f"Cancelled job {job_id}")
+        return True
+
+    def stats(self) -> Dict:
+        with self._lock:
+            running = sum(1 for job in self._jobs.values() if job.status == RUNNING)
+            return {'workers': len(self._workers), 'running': running, 'queued': self._queued,
+                    'max_queued': self.max_queued, 'queued_contacts': self._queued_contacts}
+
+    def shutdown(self, cancel: bool = True, timeout: Optional[float] = None):
+        """Stop the workers, cancelling queued and running jobs unless cancel is False."""
+        if cancel:
+            for job in self.list():
+                self.cancel(job.id)
+        for _ in self._workers:
+            self._queue.put((len(PRIORITIES), next(self._sequence), None))
+        for worker in self._workers:
+            worker.join(timeout)
+
+    def _dequeue(self, job: Job):
+        self._queued -= 1
+        self._queued_contacts -= job.total or 0
+
+    def _finish(self, job: Job, status: str):
+        with self._lock:
+            job.status = status
+            job.finished_at = time.time()
+            job.contacts = None  # no longer needed
+        job.touch()
+        if job.on_finish is not None:
+            try:
+                job.on_finish()
+            except Exception as e:
+                logging.error(f"Cleanup after job {job.id} failed: {e}")
+
+    def _trim_history(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.status in FINISHED]
+        for job_id in finished[:max(0, len(finished) - self.history)]:
+            del self._jobs[job_id]
+
+    def _work(self):
+        sender = None
+        while True:
+            _, _, job = self._queue.get()
+            if job is None:
+                return
+
+            with self._lock:
+                if job.status != QUEUED:
+                    continue  # cancelled while waiting
+                self._dequeue(job)
+                job.status = RUNNING
+                job.started_at = time.time()
+            job.touch()
+
+            try:
+                logging.info(f"Starting job {job.id}")
+                if self.dispatcher is not None:
+                    contacts = job.contacts(self.dispatcher.sender) if callable(job.contacts) else job.contacts
+                    results = self.dispatcher.send(contacts, job.message, priority=job.priority,
+                                                   weight=job.weight, progress=job.update,
+                                                   cancel_event=job.cancel_event, name=f'job-{job.id}')
+                else:
+                    if sender is None:
+                        sender = self.sender_factory()
+                    contacts = job.contacts(sender) if callable(job.contacts) else job.contacts
+                    results = sender.send_bulk_messages(contacts, job.message, progress=job.update,
+                                                        cancel_event=job.cancel_event)
+                job.update(results)
+                status = CANCELLED if results.get('cancelled') else DONE
+            except Exception as e:
+                logging.error(f"Job {job.id} failed: {e}")
+                job.error = str(e)
+                status = FAILED
+
+            self._finish(job, status)
+            logging.info(f"Job {job.id} {status}")
@@ -0,0 +1,151 @@
+"""
+Message templates for WhatsApp Bulk Sender.
+
+Placeholders refer to contact fields (any column of the contacts file):
+
+    Hello {name}, your order {order_id} ships on {ship_date|Monday}.
+
+- {field}          replaced with the contact's value; left as-is when the value is missing
+- {field|default}  falls back to `default` when the value is missing or empty
+- {{ and }}        literal braces (a lone brace that isn't a placeholder is kept as text)
+
+Recently used templates are kept in compiled form, and rendered output is
+cached per (template, values) so repeated combinations are free.
+"""
+
+import functools
+import hashlib
+import math
+import re
+import threading
+from collections import OrderedDict
+from typing import Mapping, Tuple
+
+
+_TOKEN = re.compile(r'\{\{|\}\}|\{([^{}|]+)(?:\|([^{}]*))?\}')
+
+
+def is_missing(value) -> bool:
+    """True for None, empty strings and pandas' empty-cell markers (NaN, NA, NaT)."""
+    if value is None:
+        return True
+    if isinstance(value, str):
+        return value == ''
+    if isinstance(value, float):
+        return math.isnan(value)
+    return type(value).__name__ in ('NAType', 'NaTType')
+
+
+class MessageTemplate:
+    """
+    A parsed template.
+
+    Args:
+        source: Template text
+    """
+
+    def __init__(self, source: str):
+        self.source = source
+        self.template_id = hashlib.sha1(source.encode('utf-8')).hexdigest()[:12]
+        self._parts = []  # literal strings and (field, default, placeholder) tuples
+
+        position = 0
+        literal = []
+        for match in _TOKEN.finditer(source):
+            literal.append(source[position:match.start()])
+            token = match.group(0)
+            if token == '{{':
+                literal.append('{')
+            elif token == '}}':
+                literal.append('}')
+            else:
+                if literal:
+                    self._parts.append(''.join(literal))
+                    literal = []
+                self._parts.append((match.group(1).strip(), match.group(2), token))
+            position = match.end()
+        literal.append(source[position:])
+        if ''.join(literal):
+            self._parts.append(''.join(literal))
+
+        self.fields = tuple(dict.fromkeys(part[0] for part in self._parts if isinstance(part, tuple)))
+        # (field, placeholder) for placeholders without a default, which stay in the text when the value is missing
+        self.required_fields = tuple(dict.fromkeys(
+            (part[0], part[2]) for part in self._parts if isinstance(part, tuple) and part[1] is None))
+
+    def render(self, values: Mapping) -> str:
+        """Render the template with values looked up by field name."""
+        out = []
+        for part in self._parts:
+            if isinstance(part, str):
+                out.append(part)
+                continue
+
+            field, default, placeholder = part
+            value = values.get(field)
+            if is_missing(value):
+                out.append(placeholder if default is None else default)
+            elif isinstance(value, float) and value.is_integer():
+                out.append(str(int(value)))  # numeric columns with blanks are read as floats
+            else:
+                out.append(str(value))
+        return ''.join(out)
+
+    def __repr__(self):
+        return f"MessageTemplate({self.source!r})"
+
+
+class TemplateRenderer:
+    """
+    Compiles templates once and caches rendered output.
+
+    Both caches are bounded, so per-row messages that are all different
+    don't pile up: a template's output is only cached once the template has
+    been used before, and only the most recently used templates are kept.
+
+    Args:
+        cache_size: Maximum number of rendered messages kept in the LRU cache
+        template_cache_size: Maximum number of compiled templates kept
+    """
+
+    def __init__(self, cache_size: int = 100000, template_cache_size: int = 1024):
+        self.template_cache_size = template_cache_size
+        self._templates: 'OrderedDict[str, MessageTemplate]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._render_cached = functools.lru_cache(maxsize=cache_size)(self._render)
+
+    def compile(self, source: str) -> MessageTemplate:
+        """Parsed template for `source`, parsing it only the first time."""
+        return self._compile(source)[0]
+
+    def _compile(self, source: str) -> Tuple[MessageTemplate, bool]:
+        """The parsed template and whether it was already cached."""
+        with self._lock:
+            template = self._templates.get(source)
+            if template is not None:
+                self._templates.move_to_end(source)
+                return template, True
+        template = MessageTemplate(source)
+        with self._lock:
+            self._templates[source] = template
+            if len(self._templates) > self.template_cache_size:
+                self._templates.popitem(last=False)
+        return template, False
+
+    def render(self, source: str, values: Mapping) -> str:
+        """Render `source` with values, reusing cached output for repeated values."""
+        template, reused = self._compile(source)
+        if not template.fields or not reused:
+            return template.render(values)  # most likely a one-off per-row message
+        key = tuple(values.get(field) for field in template.fields)
+        try:
+            return self._render_cached(source, key)
+        except TypeError:  # unhashable value, render without caching
+            return template.render(values)
+
+    def _render(self, source: str, key: Tuple) -> str:
+        template = self.compile(source)
+        return template.render(dict(zip(template.fields, key)))
+
+    def cache_info(self):
+        return self._render_cached.cache_info()
@@ -0,0 +1,340 @@
+"""
+Metrics for WhatsApp Bulk Sender.
+
+A small, dependency-free metrics registry with counters, gauges and latency
+histograms. Metrics are exported in the Prometheus text format, either over
+HTTP (GET /metrics) or to a file that a node_exporter textfile collector or
+any other tool can pick up.
+
+SenderMetrics defines the metrics WhatsAppBulkSender records for every
+campaign: contacts loaded, message render time, time spent waiting for a
+send slot, transport send latency and per-message end-to-end time.
+"""
+
+import bisect
+import logging
+import math
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Sequence, Tuple
+
+
+# Latency buckets in seconds, from render times (sub-millisecond) up to
+# browser-driven sends (tens of seconds)
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ''
+    escaped = (
+        f'{name}="' + str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+        for name, value in labels.items()
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+class Metric:
+    """
+    Base class for metrics. Values are kept per combination of label values,
+    which are passed as keyword arguments (e.g. counter.inc(session='s1')).
+
+    Args:
+        name: Metric name, e.g. 'whatsapp_messages_sent_total'
+        help: One-line description
+        labelnames: Names of the labels every observation must provide
+    """
+
+    type = 'untyped'
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict) -> Tuple:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> Iterator[Tuple[str, Dict[str, str], float]]:
+        """(sample name, labels, value) for every exported sample"""
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield self.name, dict(zip(self.labelnames, key)), value
+
+    def value(self, **labels) -> float:
+        """Current value for a label combination (0 if never recorded)"""
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Counter(Metric):
+    """A value that only goes up."""
+
+    type = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        if amount < 0:
+            raise ValueError("Counters can only be incremented")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    """A value that can go up and down."""
+
+    type = 'gauge'
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    """
+    Distribution of observed values (usually durations in seconds).
+
+    Args:
+        buckets: Upper bounds of the buckets, in increasing order
+    """
+
+    type = 'histogram'
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket counts (last one is +Inf), then sum
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][bisect.bisect_left(self.buckets, value)] += 1
+            state[1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of the with-block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def value(self, **labels) -> Dict:
+        """{'count': ..., 'sum': ...} for a label combination"""
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            if state is None:
+                return {'count': 0, 'sum': 0.0}
+            return {'count': sum(state[0]), 'sum': state[1]}
+
+    def samples(self):
+        with self._lock:
+            items = [(key, (list(state[0]), state[1])) for key, state in self._values.items()]
+        for key, (counts, total) in items:
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                yield f'{self.name}_bucket', {**labels, 'le': _format_value(bound)}, cumulative
+            yield f'{self.name}_sum', labels, total
+            yield f'{self.name}_count', labels, cumulative
+
+
+class MetricsRegistry:
+    """
+    Collection of metrics exported together.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, help, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help, labelnames, **kwargs)
+            elif type(metric) is not cls or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"Metric {name} is already registered as a different {metric.type}")
+            return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, help, labelnames)
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, help, labelnames)
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, help, labelnames, buckets=buckets)
+
+    def get(self, name: str) -> Optional[Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+    def write_file(self, path: str):
+        """
+        Write the metrics to a file. The file is replaced atomically, so a
+        collector never reads a half-written file.
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.metrics-')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(self.render())
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def start_file_exporter(self, path: str, interval: float = 10.0) -> 'FileExporter':
+        """Rewrite the metrics file every `interval` seconds until stopped."""
+        exporter = FileExporter(self, path, interval)
+        exporter.start()
+        return exporter
+
+    def serve(self, port: int = 9464, host: str = '0.0.0.0'):
+        """
+        Serve the metrics at http://host:port/metrics from a background thread.
+        Call shutdown() on the returned server to stop it.
+        """
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = registry.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # scrapes would flood the campaign log
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+        logging.info(f"Serving metrics on http://{host}:{server.server_port}/metrics")
+        return server
+
+
+class FileExporter:
+    """
+    Background thread that periodically writes a registry to a file.
+    stop() writes the file one last time.
+    """
+
+    def __init__(self, registry: MetricsRegistry, path: str, interval: float = 10.0):
+        self.registry = registry
+        self.path = path
+        self.interval = interval
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='metrics-file', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self._write()
+
+    def _write(self):
+        try:
+            self.registry.write_file(self.path)
+        except OSError as e:
+            logging.error(f"Failed to write metrics to {self.path}: {e}")
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+        self._write()
+
+
+class SenderMetrics:
+    """
+    The metrics recorded by WhatsAppBulkSender, registered on a registry.
+
+    Args:
+        registry: Registry to register the metrics on (a new one by default)
+    """
+
+    def __init__(self, registry: Optional[MetricsRegistry] = None):
+        self.registry = registry = registry or MetricsRegistry()
+
+        self.contacts_loaded = registry.counter(
+            'whatsapp_contacts_loaded_total', 'Contacts loaded from files', ['source'])
+        self.load_seconds = registry.histogram(
+            'whatsapp_load_seconds', 'Time to read and prepare a file or chunk of contacts', ['source'])
+        self.contacts_skipped = registry.counter(
+            'whatsapp_contacts_skipped_total', 'Contacts not messaged', ['reason'])
+
+        self.render_seconds = registry.histogram(
+            'whatsapp_render_seconds', 'Time to render a message from its template')
+        self.schedule_wait_seconds = registry.histogram(
+            'whatsapp_schedule_wait_seconds', 'Time a message waited for a rate-limit slot', ['session'])
+        self.send_seconds = registry.histogram(
+            'whatsapp_send_seconds', 'Time the transport took to send a message', ['session'])
+        self.message_seconds = registry.histogram(
+            'whatsapp_message_seconds', 'End-to-end time per message, from dispatch to recorded outcome',
+            ['session'])
+
+        self.messages_sent = registry.counter(
+            'whatsapp_messages_sent_total', 'Messages sent successfully', ['session'])
+        self.messages_failed = registry.counter(
+            'whatsapp_messages_failed_total', 'Messages that failed to send after all attempts', ['session'])
+        self.messages_retried = registry.counter(
+            'whatsapp_messages_retried_total', 'Failed attempts that were queued for a retry', ['session'])
+        self.in_flight = registry.gauge(
+            'whatsapp_messages_in_flight', 'Messages currently being sent')
+        self.campaigns_running = registry.gauge(
+            'whatsapp_campaigns_running', 'Bulk campaigns currently running')
+        self.last_success = registry.gauge(
+            'whatsapp_last_success_timestamp_seconds', 'Unix time of the last successful send')
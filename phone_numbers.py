@@ -0,0 +1,101 @@
+"""
+Phone number normalization and de-duplication for WhatsApp Bulk Sender.
+
+Numbers are brought into one canonical "+<country code><number>" form, both
+one at a time and vectorized over a pandas column. PhoneIndex keeps a hash
+set of canonical numbers so duplicates can be dropped in O(1) per contact
+before anything is scheduled.
+"""
+
+import os
+import re
+from typing import Optional
+
+
+_NON_DIGITS = re.compile(r'\D')
+
+
+def phone_key(phone: str) -> int:
+    """
+    Integer key for a canonical number, used by the in-memory and on-disk indexes.
+    """
+    # Leading '1' keeps numbers that differ only in leading zeros distinct
+    return int('1' + _NON_DIGITS.sub('', phone))
+
+
+class PhoneNormalizer:
+    """
+    Formats phone numbers to include a country code.
+    Numbers written with a leading '+' are treated as already international;
+    10-digit numbers (or 11 digits with a trunk '0') get the default code.
+
+    Args:
+        default_country_code: Code added to national numbers, e.g. '+91'
+            (defaults to the DEFAULT_COUNTRY_CODE environment variable, then +91)
+    """
+
+    def __init__(self, default_country_code: Optional[str] = None):
+        code = default_country_code or os.getenv('DEFAULT_COUNTRY_CODE', '+91')
+        self.default_country_code = '+' + _NON_DIGITS.sub('', code)
+
+    def normalize(self, phone: str) -> str:
+        """Canonical form of a single number."""
+        phone = str(phone)
+        international = phone.lstrip().startswith('+')
+
+        # Remove any non-digit characters
+        phone = _NON_DIGITS.sub('', phone)
+
+        # Add country code if not present
+        if international:
+            return '+' + phone
+        if len(phone) == 10:
+            return self.default_country_code + phone
+        if len(phone) == 11 and phone.startswith('0'):
+            return self.default_country_code + phone[1:]
+        return '+' + phone
+
+    def normalize_series(self, phones):
+        """
+        Vectorized normalize() for a pandas Series.
+        """
+        # Stringify like str(value) would, then strip non-digit characters
+        raw = phones.astype(str)
+        international = raw.str.lstrip().str.startswith('+').fillna(False).astype(bool)
+        digits = raw.str.replace(r'\D', '', regex=True).fillna('')
+        lengths = digits.str.len()
+
+        formatted = '+' + digits
+        formatted = formatted.mask(~international & (lengths == 10), self.default_country_code + digits)
+        formatted = formatted.mask(~international & (lengths == 11) & digits.str.startswith('0'),
+                                   self.default_country_code + digits.str[1:])
+        return formatted
+
+
+class PhoneIndex:
+    """
+    Hash index of canonical phone numbers seen in a campaign.
+
+    Numbers are stored as integers rather than strings, which keeps an index
+    of millions of numbers compact while lookups stay O(1).
+    """
+
+    def __init__(self):
+        self._seen = set()
+        self.duplicates = 0
+
+    def add(self, phone: str) -> bool:
+        """Add a canonical number. Returns False (and counts it) if it was already present."""
+        key = phone_key(phone)
+        if key in self._seen:
+            self.duplicates += 1
+            return False
+        self._seen.add(key)
+        return True
+
+    def __contains__(self, phone: str) -> bool:
+        return phone_key(phone) in self._seen
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
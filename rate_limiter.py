@@ -0,0 +1,203 @@
+"""
+Token-bucket rate limiting for WhatsApp Bulk Sender.
+
+A RateLimiter combines a per-sender token bucket with an optional global
+bucket shared by every sender in the process, adds random jitter, and backs
+off adaptively when the recent failure rate spikes.
+"""
+
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+
+class TokenBucket:
+    """
+    Classic token bucket: refills at `rate` tokens per second up to `burst`.
+
+    reserve() always takes a token and returns how long the caller must wait
+    before using it, so callers can sleep however suits them (time.sleep,
+    asyncio.sleep, a scheduler, ...).
+
+    Args:
+        rate: Sustained tokens per second (None or <= 0 means unlimited)
+        burst: Maximum number of tokens that can accumulate
+        clock: Monotonic clock function
+    """
+
+    def __init__(self, rate: Optional[float], burst: int = 1, clock=time.monotonic):
+        if burst < 1:
+            raise ValueError("burst must be at least 1")
+        self.rate = rate if rate and rate > 0 else None
+        self.burst = burst
+        self._clock = clock
+        self._tokens = float(burst)
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        if self.rate is not None:
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self) -> float:
+        """Take one token and return the seconds to wait until it is available."""
+        if self.rate is None:
+            return 0.0
+
+        with self._lock:
+            self._refill(self._clock())
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def set_rate(self, rate: Optional[float]):
+        with self._lock:
+            self._refill(self._clock())
+            self.rate = rate if rate and rate > 0 else None
+
+
+_global_bucket = None
+_global_lock = threading.Lock()
+
+
+def get_global_bucket() -> Optional[TokenBucket]:
+    """
+    Process-wide bucket shared by all senders, configured with the
+    GLOBAL_MESSAGE_DELAY and GLOBAL_BURST_SIZE environment variables.
+    Returns None when no global limit is configured.
+    """
+    global _global_bucket
+
+    with _global_lock:
+        if _global_bucket is None:
+            delay = float(os.getenv('GLOBAL_MESSAGE_DELAY', '0'))
+            if delay <= 0:
+                return None
+            _global_bucket = TokenBucket(1.0 / delay, int(os.getenv('GLOBAL_BURST_SIZE', '1')))
+        return _global_bucket
+
+
+class RateLimiter:
+    """
+    Per-sender rate limiter with burst, jitter and adaptive back-off.
+
+    Args:
+        rate: Sustained messages per second (None or <= 0 means unlimited)
+        burst: Number of messages that may be sent back to back
+        jitter: Maximum random extra delay in seconds added to each wait
+        global_bucket: Optional bucket shared with other senders
+        backoff_factor: Multiplier applied to the interval when failures spike
+        max_backoff: Upper bound for the accumulated back-off multiplier
+        failure_threshold: Failure ratio over the window that triggers back-off
+        window: Number of recent outcomes used to compute the failure ratio
+    """
+
+    def __init__(self, rate: Optional[float], burst: int = 1, jitter: float = 0.0,
+                 global_bucket: Optional[TokenBucket] = None, backoff_factor: float = 2.0,
+                 max_backoff: float = 8.0, failure_threshold: float = 0.5, window: int = 20,
+                 clock=time.monotonic, sleep=time.sleep, seed: Optional[int] = None):
+        self.base_rate = rate if rate and rate > 0 else None
+        self.bucket = TokenBucket(self.base_rate, burst, clock)
+        self.global_bucket = global_bucket
+        self.jitter = jitter
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.failure_threshold = failure_threshold
+        self.backoff = 1.0
+
+        self._clock = clock
+        self._sleep = sleep
+        self._random = random.Random(seed)
+        self._outcomes = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+        self.acquired = 0
+        self.total_wait = 0.0
+        self.last_wait = 0.0
+        self._started = None
+
+    @classmethod
+    def from_env(cls, message_delay: float, global_bucket: Optional[TokenBucket] = None) -> 'RateLimiter':
+        """
+        Build a limiter from MESSAGE_DELAY-style settings.
+        BURST_SIZE and RATE_JITTER environment variables tune burst and jitter.
+        """
+        return cls(
+            rate=1.0 / message_delay if message_delay > 0 else None,
+            burst=int(os.getenv('BURST_SIZE', '1')),
+            jitter=float(os.getenv('RATE_JITTER', '0')),
+            global_bucket=global_bucket if global_bucket is not None else get_global_bucket()
+        )
+
+    def reserve(self) -> float:
+        """
+        Reserve the next send slot and return the seconds to wait for it
+        without sleeping.
+        """
+        wait = self.bucket.reserve()
+        if self.global_bucket is not None:
+            wait = max(wait, self.global_bucket.reserve())
+        if self.jitter > 0:
+            wait += self._random.uniform(0, self.jitter)
+
+        with self._lock:
+            if self._started is None:
+                self._started = self._clock()
+            self.acquired += 1
+            self.total_wait += wait
+            self.last_wait = wait
+        return wait
+
+    def acquire(self) -> float:
+        """Block until the next send is allowed. Returns the seconds waited."""
+        wait = self.reserve()
+        if wait > 0:
+            self._sleep(wait)
+        return wait
+
+    def record_success(self):
+        self._record(False)
+
+    def record_failure(self):
+        self._record(True)
+
+    def _record(self, failed: bool):
+        with self._lock:
+            self._outcomes.append(failed)
+            if len(self._outcomes) < self._outcomes.maxlen // 2:
+                return
+            failure_ratio = sum(self._outcomes) / len(self._outcomes)
+
+            if failure_ratio >= self.failure_threshold:
+                backoff = min(self.backoff * self.backoff_factor, self.max_backoff)
+            elif not failed:
+                backoff = max(1.0, self.backoff / self.backoff_factor)
+            else:
+                return
+
+            if backoff == self.backoff:
+                return
+            if backoff > self.backoff:
+                logging.warning(f"Failure rate {failure_ratio:.0%} - slowing sends down {backoff:g}x")
+            self.backoff = backoff
+
+        if self.base_rate is not None:
+            self.bucket.set_rate(self.base_rate / backoff)
+
+    def stats(self) -> Dict:
+        """Waiting time and effective throughput so far."""
+        with self._lock:
+            elapsed = self._clock() - self._started if self._started is not None else 0.0
+            return {
+                'acquired': self.acquired,
+                'total_wait': self.total_wait,
+                'last_wait': self.last_wait,
+                'backoff': self.backoff,
+                'effective_rate': self.acquired / elapsed if elapsed > 0 else 0.0
+            }
@@ -0,0 +1,179 @@
+"""
+Per-attempt result log for WhatsApp Bulk Sender.
+
+send_bulk_messages() returns counts and the failed contacts. A ResultLog
+also records every send attempt, successful or not, in a columnar file that
+pandas reads directly, so large campaigns can be analyzed without parsing
+the log file:
+
+    df = pd.read_parquet('results.parquet')
+    df = pd.read_csv('results.csv', parse_dates=['scheduled_at', 'sent_at'], dtype={'phone': str})
+
+Parquet is written with pyarrow when it is installed (pip install pyarrow);
+otherwise the log is a CSV file. Attempts are buffered in memory and written
+in batches by a background thread, so the send loop only appends a tuple.
+"""
+
+import csv
+import logging
+import os
+import threading
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Optional
+
+
+COLUMNS = ('phone', 'template_id', 'scheduled_at', 'sent_at', 'duration_seconds', 'attempt', 'outcome',
+           'session', 'error')
+
+
+@lru_cache(maxsize=4096)
+def _second(whole: int) -> str:
+    return datetime.fromtimestamp(whole, timezone.utc).strftime('%Y-%m-%dT%H:%M:%S')
+
+
+def _timestamp(seconds: Optional[float]) -> str:
+    """ISO 8601 UTC timestamp with milliseconds for a time.time() value"""
+    if seconds is None:
+        return ''
+    # Attempts in a batch share their seconds, so only the milliseconds are formatted each time
+    milliseconds = round(seconds * 1000)
+    return f'{_second(milliseconds // 1000)}.{milliseconds % 1000:03d}+00:00'
+
+
+class ResultLog:
+    """
+    Columnar log of send attempts.
+
+    Args:
+        path: Output file; a .parquet path is written as Parquet if pyarrow is
+            installed (otherwise as CSV next to it), anything else as CSV
+        batch_size: Buffered attempts that trigger a write
+        flush_interval: Maximum seconds an attempt stays buffered
+    """
+
+    def __init__(self, path: str, batch_size: int = 10000, flush_interval: float = 5.0):
+        self.format = 'csv'
+        if path.lower().endswith('.parquet'):
+            try:
+                import pyarrow  # noqa: F401
+                self.format = 'parquet'
+            except ImportError:
+                path = os.path.splitext(path)[0] + '.csv'
+                logging.warning(f"pyarrow is not installed; writing the result log as CSV to {path}")
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.count = 0
+        self._batch = []
+        self._closed = False
+        self._changed = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._file = None
+        self._writer = None
+        self._thread = threading.Thread(target=self._run, name='result-log', daemon=True)
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def record(self, phone: str, template_id: str, scheduled_at: float, sent_at: Optional[float],
+               duration: Optional[float], attempt: int, outcome: str, session: str = '',
+               error: Optional[str] = None):
+        """
+        Buffer one attempt. Times are time.time() values; sent_at and duration
+        are None if the message never reached the transport.
+        """
+        with self._changed:
+            if self._closed:
+                raise ValueError("The result log is closed")
+            self._batch.append((phone, template_id, scheduled_at, sent_at, duration, attempt, outcome, session,
+                                error))
+            if len(self._batch) >= self.batch_size:
+                self._changed.notify()
+
+    def flush(self):
+        """Write all buffered attempts now."""
+        with self._write_lock:
+            with self._changed:
+                batch, self._batch = self._batch, []
+            if batch:
+                self._write(batch)
+
+    def close(self):
+        with self._changed:
+            if self._closed:
+                return
+            self._closed = True
+            self._changed.notify()
+        self._thread.join()
+        self.flush()
+        with self._write_lock:
+            if self.format == 'parquet' and self._writer is not None:
+                self._writer.close()
+            if self._file is not None:
+                self._file.close()
+            self._writer = None
+            self._file = None
+        logging.info(f"Wrote {self.count} send attempts to {self.path}")
+
+    def _run(self):
+        while True:
+            with self._changed:
+                self._changed.wait_for(lambda: self._closed or len(self._batch) >= self.batch_size,
+                                       self.flush_interval)
+                closed = self._closed
+            try:
+                self.flush()
+            except Exception as e:
+                logging.error(f"Writing the result log {self.path} failed: {e}")
+            if closed:
+                return
+
+    def _write(self, batch):
+        if self.format == 'parquet':
+            self._write_parquet(batch)
+        else:
+            self._write_csv(batch)
+        self.count += len(batch)
+
+    def _write_csv(self, batch):
+        if self._writer is None:
+            self._file = open(self.path, 'w', newline='')
+            self._writer = csv.writer(self._file)
+            self._writer.writerow(COLUMNS)
+        self._writer.writerows(
+            (phone, template_id, _timestamp(scheduled_at), _timestamp(sent_at),
+             '' if duration is None else f'{duration:.6f}', attempt, outcome, session, error or '')
+            for phone, template_id, scheduled_at, sent_at, duration, attempt, outcome, session, error in batch
+        )
+        self._file.flush()
+
+    def _write_parquet(self, batch):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        timestamp = pa.timestamp('ms', tz='UTC')
+        schema = pa.schema([
+            ('phone', pa.string()),
+            ('template_id', pa.string()),
+            ('scheduled_at', timestamp),
+            ('sent_at', timestamp),
+            ('duration_seconds', pa.float64()),
+            ('attempt', pa.int32()),
+            ('outcome', pa.string()),
+            ('session', pa.string()),
+            ('error', pa.string())
+        ])
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self.path, schema)
+
+        columns = list(zip(*batch))
+        for position in (2, 3):  # seconds -> milliseconds
+            columns[position] = [None if value is None else round(value * 1000) for value in columns[position]]
+        # Each batch becomes one row group
+        self._writer.write_table(pa.Table.from_arrays(
+            [pa.array(values, type=field.type) for values, field in zip(columns, schema)], schema=schema))
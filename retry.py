@@ -0,0 +1,133 @@
+"""
+Retries and dead-lettering for WhatsApp Bulk Sender.
+
+A failed send is retried with exponential backoff and jitter until the
+attempt limit is reached. Retries go back into the session's send scheduler,
+so waiting for one never holds up the rest of the campaign. Contacts that
+fail permanently (or run out of attempts) are written to a dead-letter CSV
+in the contacts file format, ready to be sent again with cli.py.
+"""
+
+import csv
+import logging
+import os
+import random
+import threading
+from datetime import datetime
+from typing import Dict, Optional
+
+from message_templates import is_missing
+from transports import PermanentTransportError
+
+
+class RetryPolicy:
+    """
+    When and how often failed sends are retried.
+
+    Args:
+        max_attempts: Attempts per contact, including the first (1 disables retries)
+        base_delay: Seconds before the first retry
+        max_delay: Upper bound for a single retry delay
+        multiplier: Factor the delay grows by with every attempt
+        jitter: Fraction of each delay that is randomized, so retries of
+            contacts that failed together don't all fire at once (0.0 - 1.0)
+        seed: Optional seed for reproducible delays
+    """
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 30.0, max_delay: float = 600.0,
+                 multiplier: float = 2.0, jitter: float = 0.5, seed: Optional[int] = None):
+        if max_attempts < 1:
+            raise ValueError("max_attempts must be at least 1")
+        if not 0.0 <= jitter <= 1.0:
+            raise ValueError("jitter must be between 0.0 and 1.0")
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.jitter = jitter
+        self._random = random.Random(seed)
+
+    @classmethod
+    def from_env(cls, max_attempts: Optional[int] = None) -> 'RetryPolicy':
+        """
+        Build a policy from the RETRY_MAX_ATTEMPTS, RETRY_BASE_DELAY and
+        RETRY_MAX_DELAY environment variables.
+        """
+        return cls(
+            max_attempts=max_attempts or int(os.getenv('RETRY_MAX_ATTEMPTS', '3')),
+            base_delay=float(os.getenv('RETRY_BASE_DELAY', '30')),
+            max_delay=float(os.getenv('RETRY_MAX_DELAY', '600'))
+        )
+
+    def is_retryable(self, error: Exception) -> bool:
+        return not isinstance(error, PermanentTransportError)
+
+    def delay(self, attempt: int) -> float:
+        """Seconds to wait after failed attempt number `attempt` (1-based)."""
+        delay = min(self.max_delay, self.base_delay * self.multiplier ** (attempt - 1))
+        return delay * (1 - self.jitter * self._random.random())
+
+    def next_delay(self, attempt: int, error: Exception) -> Optional[float]:
+        """
+        Delay before retrying a contact whose attempt number `attempt` failed
+        with `error`, or None if it should not be retried.
+        """
+        if attempt >= self.max_attempts or not self.is_retryable(error):
+            return None
+        return self.delay(attempt)
+
+
+class DeadLetterFile:
+    """
+    CSV of contacts that could not be delivered.
+
+    Rows keep the contact's columns, with the message column holding the
+    template that was used, plus the number of attempts and the last error.
+    The file is only created once the first contact fails.
+
+    Args:
+        path: CSV file to write (replaced if it exists)
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.count = 0
+        self._file = None
+        self._writer = None
+        self._lock = threading.Lock()
+
+    def write(self, contact: Dict, default_message: str, error: Exception, attempts: int):
+        message = contact.get('message')
+        row = {
+            **contact,
+            'message': default_message if is_missing(message) else message,
+            'attempts': attempts,
+            'last_error': str(error),
+            'failed_at': datetime.now().isoformat(timespec='seconds')
+        }
+
+        with self._lock:
+            if self._writer is None:
+                status = ['attempts', 'last_error', 'failed_at']
+                columns = ['phone', 'name', 'message']
+                columns += [column for column in contact if column not in columns + status] + status
+                self._file = open(self.path, 'w', newline='')
+                self._writer = csv.DictWriter(self._file, fieldnames=columns, restval='', extrasaction='ignore')
+                self._writer.writeheader()
+            self._writer.writerow(row)
+            self._file.flush()
+            self.count += 1
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+                self._writer = None
+                logging.info(f"Wrote {self.count} undeliverable contacts to {self.path}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
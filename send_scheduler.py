@@ -0,0 +1,87 @@
+"""
+Second-precision send scheduler for WhatsApp Bulk Sender.
+
+Items are kept in a priority queue ordered by their due time on the
+monotonic clock, and pop() sleeps exactly until the earliest one is due.
+Wall-clock targets such as "start at 09:30" are converted to monotonic
+deadlines once, so clock adjustments during a campaign don't affect it.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Optional
+
+
+def next_occurrence(hour: int, minute: int, second: int = 0, now: Optional[datetime] = None) -> datetime:
+    """
+    Next wall-clock datetime at hour:minute:second (today, or tomorrow if already past).
+    """
+    now = now or datetime.now()
+    target = now.replace(hour=hour, minute=minute, second=second, microsecond=0)
+    if target < now:
+        target += timedelta(days=1)
+    return target
+
+
+def monotonic_deadline(when: datetime, clock=time.monotonic) -> float:
+    """Convert a wall-clock datetime into a deadline on the monotonic clock."""
+    return clock() + max(0.0, (when - datetime.now()).total_seconds())
+
+
+def wall_time(deadline: float, clock=time.monotonic) -> float:
+    """Convert a monotonic time back into a time.time() value."""
+    return time.time() - (clock() - deadline)
+
+
+class SendScheduler:
+    """
+    Priority queue of items keyed by monotonic due time.
+
+    Items with the same due time come out in the order they were pushed.
+
+    Args:
+        clock: Monotonic clock function
+        sleep: Sleep function used while waiting for the next due item
+        interrupt: Optional event that cuts any wait short when set
+    """
+
+    def __init__(self, clock=time.monotonic, sleep=time.sleep, interrupt: Optional[threading.Event] = None):
+        self._clock = clock
+        self._sleep = interrupt.wait if interrupt is not None else sleep
+        self._interrupt = interrupt
+        self._heap = []
+        self._counter = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def push(self, item: Any, due: Optional[float] = None):
+        """Schedule item at monotonic time `due` (defaults to now)."""
+        if due is None:
+            due = self._clock()
+        heapq.heappush(self._heap, (due, next(self._counter), item))
+
+    def sleep_until(self, due: float) -> float:
+        """Sleep until the monotonic time `due`. Returns the seconds slept."""
+        slept = 0.0
+        remaining = due - self._clock()
+        while remaining > 0:
+            if self._interrupt is not None and self._interrupt.is_set():
+                break
+            self._sleep(remaining)
+            slept += remaining
+            remaining = due - self._clock()
+        return slept
+
+    def pop(self) -> Any:
+        """
+        Wait until the earliest item is due, then remove and return it
+        (early, if the interrupt event was set while waiting).
+        """
+        if not self._heap:
+            raise IndexError("pop from an empty scheduler")
+        self.sleep_until(self._heap[0][0])
+        return heapq.heappop(self._heap)[2]
@@ -0,0 +1,84 @@
+"""
+Sender sessions for WhatsApp Bulk Sender.
+
+A session is one WhatsApp account/browser profile: its own transport and its
+own rate limiter. WhatsAppBulkSender shards a campaign across a pool of
+sessions, so throughput grows with the number of accounts on the host and a
+misbehaving session only slows itself down.
+"""
+
+import logging
+import os
+import threading
+from typing import Dict, Iterator, List, Optional
+
+from rate_limiter import RateLimiter
+from transports import Transport, create_transport
+
+
+class SenderSession:
+    """
+    One sending session.
+
+    Args:
+        name: Label used in logs and per-session results
+        transport: Backend this session sends through
+        rate_limiter: Limiter pacing this session's sends
+    """
+
+    def __init__(self, name: str, transport: Transport, rate_limiter: RateLimiter):
+        self.name = name
+        self.transport = transport
+        self.rate_limiter = rate_limiter
+        self.success = 0
+        self.failed = 0
+
+    def stats(self) -> Dict:
+        return {
+            'success': self.success,
+            'failed': self.failed,
+            **self.rate_limiter.stats()
+        }
+
+    def close(self):
+        self.transport.close()
+
+
+def create_sessions(count: int, transport: Optional[str] = None, message_delay: Optional[float] = None,
+                    tab_close_delay: Optional[int] = None) -> List[SenderSession]:
+    """
+    Create `count` sessions, each with its own transport and rate limiter.
+    Delays default to the MESSAGE_DELAY and TAB_CLOSE_DELAY environment variables.
+    """
+    if message_delay is None:
+        message_delay = float(os.getenv('MESSAGE_DELAY', '15'))
+    if tab_close_delay is None:
+        tab_close_delay = int(os.getenv('TAB_CLOSE_DELAY', '3'))
+    if count > 1 and (transport or os.getenv('TRANSPORT', 'pywhatkit')) == 'pywhatkit':
+        logging.warning("pywhatkit always drives the default browser, so its sessions send one at a time "
+                        "and extra sessions won't increase throughput")
+
+    return [
+        SenderSession(
+            f"session-{i + 1}",
+            create_transport(transport, tab_close_delay=tab_close_delay, session=i + 1),
+            RateLimiter.from_env(message_delay)
+        )
+        for i in range(count)
+    ]
+
+
+class ContactFeed:
+    """
+    Thread-safe wrapper that lets several sessions pull from one contact
+    iterator. Each contact is handed to exactly one session.
+    """
+
+    def __init__(self, contacts: Iterator[Dict]):
+        self._contacts = contacts
+        self._lock = threading.Lock()
+
+    def next(self) -> Optional[Dict]:
+        """Next contact, or None when the feed is exhausted."""
+        with self._lock:
+            return next(self._contacts, None)
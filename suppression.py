@@ -0,0 +1,290 @@
+"""
+Suppression (opt-out / bounce) list for WhatsApp Bulk Sender.
+
+Suppressed numbers live in a SQLite table keyed by an integer form of the
+canonical number. A Bloom filter, persisted in the same database, sits in
+front of it: most numbers in a campaign are not suppressed, and those are
+rejected by the filter without touching the disk.
+"""
+
+import logging
+import math
+import sqlite3
+import threading
+import time
+from typing import Iterable, Optional
+
+from phone_numbers import PhoneNormalizer, phone_key
+
+
+# Keys above this aren't valid phone numbers (E.164 allows 15 digits)
+_MAX_KEY = int('1' + '9' * 15)
+
+_GOLDEN = 0x9E3779B97F4A7C15
+
+# Smallest Bloom filter capacity; it is sized from the list and grows with it
+MIN_CAPACITY = 100_000
+
+
+class BloomFilter:
+    """
+    Bloom filter over integer keys.
+
+    Args:
+        capacity: Expected number of items
+        error_rate: Target false-positive probability at capacity
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        self.capacity = max(1, capacity)
+        self.error_rate = error_rate
+        self.size = max(64, int(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    # Double hashing: the first probe is key % size, later probes step by a
+    # multiplicative hash of the key, computed only if the first bit is set.
+
+    def add(self, key: int):
+        bits, size = self.bits, self.size
+        index = key % size
+        step = ((key * _GOLDEN) >> 64) | 1
+        for _ in range(self.hashes):
+            bits[index >> 3] |= 1 << (index & 7)
+            index = (index + step) % size
+
+    def __contains__(self, key: int) -> bool:
+        # Hot path: most lookups are negative and stop at the first clear bit
+        bits, size = self.bits, self.size
+        index = key % size
+        if not bits[index >> 3] & (1 << (index & 7)):
+            return False
+        step = ((key * _GOLDEN) >> 64) | 1
+        for _ in range(self.hashes - 1):
+            index = (index + step) % size
+            if not bits[index >> 3] & (1 << (index & 7)):
+                return False
+        return True
+
+
+class SuppressionStore:
+    """
+    On-disk set of numbers that must never be messaged.
+
+    Args:
+        path: SQLite database file (created if it doesn't exist)
+        normalizer: Used to canonicalize numbers on import and lookup
+        capacity: Expected number of suppressed numbers (defaults to twice the
+            current count, at least MIN_CAPACITY); the Bloom filter is rebuilt
+            larger if the list outgrows it
+        error_rate: Bloom filter false-positive rate
+
+    The filter is saved after bulk imports and on close(). Single adds and
+    removals only mark the saved copy stale, so if the process dies first the
+    filter is rebuilt from the table on the next open. Changes committed by
+    other processes are picked up on the next lookup (via PRAGMA data_version).
+    """
+
+    def __init__(self, path: str, normalizer: Optional[PhoneNormalizer] = None,
+                 capacity: Optional[int] = None, error_rate: float = 0.001):
+        self.path = path
+        self.normalizer = normalizer or PhoneNormalizer()
+        self.error_rate = error_rate
+        self._lock = threading.Lock()
+        self._dirty = False  # the in-memory filter differs from the saved one
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS suppressed (
+                phone INTEGER PRIMARY KEY,
+                reason TEXT,
+                added_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS bloom (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                capacity INTEGER,
+                error_rate REAL,
+                count INTEGER,
+                bits BLOB
+            );
+        """)
+        self._conn.commit()
+
+        self.count = self._conn.execute('SELECT COUNT(*) FROM suppressed').fetchone()[0]
+        self._bloom = self._load_bloom(max(capacity or MIN_CAPACITY, self.count * 2))
+        self._data_version = self._version()
+
+    def _version(self) -> int:
+        return self._conn.execute('PRAGMA data_version').fetchone()[0]
+
+    def _sync(self):
+        """
+        Reload the count and filter if another connection committed since we
+        last looked; our own commits don't change the data version.
+        """
+        version = self._version()
+        if version == self._data_version:
+            return
+        self._data_version = version
+        self.count = self._conn.execute('SELECT COUNT(*) FROM suppressed').fetchone()[0]
+        self._bloom = self._load_bloom(max(self._bloom.capacity, self.count * 2))
+        self._dirty = False
+
+    def _load_bloom(self, capacity: int) -> BloomFilter:
+        row = self._conn.execute('SELECT capacity, error_rate, count, bits FROM bloom WHERE id = 1').fetchone()
+        if row is not None and row[2] == self.count and row[0] >= self.count:
+            bloom = BloomFilter(row[0], row[1])
+            bloom.bits = bytearray(row[3])
+            return bloom
+        return self._rebuild_bloom(capacity)
+
+    def _rebuild_bloom(self, capacity: int) -> BloomFilter:
+        logging.info(f"Building suppression filter for {self.count} numbers")
+        bloom = BloomFilter(capacity, self.error_rate)
+        for (key,) in self._conn.execute('SELECT phone FROM suppressed'):
+            bloom.add(key)
+        self._bloom = bloom
+        self._save_bloom()
+        return bloom
+
+    def _save_bloom(self):
+        bloom = self._bloom
+        self._conn.execute(
+            'INSERT OR REPLACE INTO bloom (id, capacity, error_rate, count, bits) VALUES (1, ?, ?, ?, ?)',
+            (bloom.capacity, bloom.error_rate, self.count, bytes(bloom.bits))
+        )
+        self._conn.commit()
+        self._dirty = False
+
+    def _mark_dirty(self):
+        """
+        Invalidate the saved filter before a change that isn't saved right
+        away, so a crash before close() leads to a rebuild, not a stale filter.
+        """
+        if not self._dirty:
+            self._conn.execute('UPDATE bloom SET count = -1 WHERE id = 1')
+            self._conn.commit()
+            self._dirty = True
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __contains__(self, phone: str) -> bool:
+        """True if the number (in any format) is suppressed."""
+        return self.contains_canonical(self.normalizer.normalize(phone))
+
+    def contains_canonical(self, phone: str) -> bool:
+        """
+        Lookup for a number that is already canonical ('+' followed by digits),
+        skipping normalization. Negative answers come from the Bloom filter once
+        it is known to be current.
+        """
+        key = int('1' + phone[1:])
+        with self._lock:
+            self._sync()
+            if key not in self._bloom:
+                return False
+            return self._conn.execute('SELECT 1 FROM suppressed WHERE phone = ?', (key,)).fetchone() is not None
+
+    def add(self, phone: str, reason: str = 'opt-out') -> int:
+        """Suppress a single number. Returns 1 if it was new, else 0."""
+        key = phone_key(self.normalizer.normalize(phone))
+        if key > _MAX_KEY:
+            return 0
+        with self._lock:
+            self._sync()
+            self._mark_dirty()
+        return self._insert_keys([key], reason)
+
+    def import_numbers(self, phones: Iterable[str], reason: str = 'opt-out', batch_size: int = 50000) -> int:
+        """
+        Bulk-add numbers in batched transactions. Returns how many were new.
+        """
+        added = 0
+        batch = []
+        for phone in phones:
+            key = phone_key(self.normalizer.normalize(phone))
+            if key <= _MAX_KEY:
+                batch.append(key)
+            if len(batch) >= batch_size:
+                added += self._insert_keys(batch, reason)
+                batch = []
+        if batch:
+            added += self._insert_keys(batch, reason)
+
+        with self._lock:
+            self._sync()
+            self._save_bloom()
+        return added
+
+    def import_file(self, file_path: str, reason: str = 'opt-out', chunksize: int = 100000) -> int:
+        """
+        Bulk-import a CSV with a 'phone' column, or a plain list with one number
+        per line. Numbers are normalized one chunk at a time.
+        """
+        import pandas as pd
+
+        with open(file_path) as f:
+            has_header = 'phone' in f.readline().lower()
+
+        added = 0
+        reader = pd.read_csv(file_path, dtype=str, chunksize=chunksize,
+                             header=0 if has_header else None, skip_blank_lines=True)
+        for chunk in reader:
+            phones = chunk['phone'] if has_header else chunk[chunk.columns[0]]
+            digits = self.normalizer.normalize_series(phones.dropna()).str[1:]
+            keys = [int('1' + d) for d in digits.tolist() if 0 < len(d) <= 15]
+            added += self._insert_keys(keys, reason)
+
+        with self._lock:
+            self._sync()
+            self._save_bloom()
+        logging.info(f"Imported {added} new suppressed numbers from {file_path}")
+        return added
+
+    def _insert_keys(self, keys, reason: str) -> int:
+        now = time.time()
+        with self._lock:
+            self._sync()
+            before = self._conn.total_changes
+            self._conn.executemany(
+                'INSERT OR IGNORE INTO suppressed (phone, reason, added_at) VALUES (?, ?, ?)',
+                [(key, reason, now) for key in keys]
+            )
+            self._conn.commit()
+            added = self._conn.total_changes - before
+            self.count += added
+
+            for key in keys:
+                self._bloom.add(key)
+            if self.count > self._bloom.capacity:
+                self._rebuild_bloom(self.count * 2)
+        return added
+
+    def remove(self, phone: str) -> bool:
+        """
+        Lift the suppression for a number. The Bloom filter keeps its bits, so
+        later lookups for it fall through to the database.
+        """
+        key = phone_key(self.normalizer.normalize(phone))
+        with self._lock:
+            self._sync()
+            self._mark_dirty()
+            cursor = self._conn.execute('DELETE FROM suppressed WHERE phone = ?', (key,))
+            self._conn.commit()
+            self.count -= cursor.rowcount
+        return cursor.rowcount > 0
+
+    def close(self):
+        with self._lock:
+            self._sync()
+            if self._dirty:
+                self._save_bloom()
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -124,6 +124,35 @@ def test_cli_interface():
     except Exception as e:
         print(f"    ❌ CLI test failed: {e}")
 
+def test_dispatcher_pacing():
+    """Test that the dispatcher keeps the per-session message spacing after an idle period"""
+    print("\n⏱️  Testing dispatcher pacing after an idle period...")
+    
+    import time
+    from dispatcher import Dispatcher
+    from rate_limiter import RateLimiter
+    from transports import FakeTransport
+    from whatsapp_bulk_sender import WhatsAppBulkSender
+    
+    sent_at = []
+    
+    class RecordingTransport(FakeTransport):
+        def send(self, phone, message, hour=None, minute=None):
+            sent_at.append(time.monotonic())
+            super().send(phone, message, hour, minute)
+    
+    interval = 0.2
+    sender = WhatsAppBulkSender(transport=RecordingTransport(), rate_limiter=RateLimiter(1.0 / interval))
+    with Dispatcher(sender) as dispatcher:
+        time.sleep(interval * 3)  # idle: the workers must not bank a send slot meanwhile
+        results = dispatcher.send([{'phone': f'+91987654321{i}'} for i in range(4)], 'Hello!')
+    
+    gaps = [later - earlier for earlier, later in zip(sent_at, sent_at[1:])]
+    print(f"    Gaps between messages: {', '.join(f'{gap:.2f}s' for gap in gaps)}")
+    assert results['success'] == 4
+    assert all(gap >= interval * 0.9 for gap in gaps), f"messages sent faster than every {interval}s: {gaps}"
+    print("    ✅ Messages stay spaced by the rate limit")
+
 def create_test_contact_file():
     """Create a small test contact file"""
     print("\n📝 Creating test contact file...")
@@ -160,6 +189,7 @@ def main():
     test_csv_operations()
     create_test_contact_file()
     test_cli_interface()
+    test_dispatcher_pacing()
     
     print("\n" + "=" * 50)
     print("✅ System test completed successfully!")
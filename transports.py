@@ -0,0 +1,340 @@
+"""
+Transport backends used by WhatsAppBulkSender to deliver messages.
+
+The sender never talks to pywhatkit directly; it dispatches every message
+through a transport object. This makes it possible to swap the browser-based
+pywhatkit path for an in-process fake when benchmarking or load testing, or
+for WebDriverTransport, which keeps one WhatsApp Web page open under Selenium
+instead of opening a tab and waiting a fixed time for every message.
+"""
+
+import os
+import random
+import threading
+import time
+from typing import Optional
+from urllib.parse import quote
+
+
+# pywhatkit types into whichever browser window has focus, so sends from
+# several sessions or in-flight tasks would interleave their keystrokes
+_PYWHATKIT_LOCK = threading.Lock()
+
+
+class TransportError(Exception):
+    """Raised by a transport when a message could not be delivered."""
+
+
+class PermanentTransportError(TransportError):
+    """
+    Raised when retrying cannot help (e.g. an invalid number), so the contact
+    goes straight to the dead-letter file instead of the retry queue.
+    """
+
+
+class Transport:
+    """
+    Base class for message transports.
+
+    Subclasses implement send(), which must either return normally once the
+    message has been handed over, or raise an exception describing the failure.
+    The message is sent immediately unless hour and minute are given.
+    """
+
+    name = 'base'
+
+    def send(self, phone: str, message: str, hour: int = None, minute: int = None):
+        raise NotImplementedError
+
+    async def send_async(self, phone: str, message: str):
+        """
+        Send a message from an event loop. Blocking transports run send() in a
+        worker thread; subclasses with native async support override this.
+        """
+        import asyncio  # only async callers pay for importing asyncio
+        await asyncio.to_thread(self.send, phone, message)
+
+    def close(self):
+        """Release any resources held by the transport."""
+
+
+class PyWhatKitTransport(Transport):
+    """
+    Sends messages through WhatsApp Web using pywhatkit.
+    Every send opens a browser tab, so a display is required.
+
+    pywhatkit always drives the one default browser, so sends are serialized
+    across all instances: extra sessions or in-flight sends don't add throughput.
+    """
+
+    name = 'pywhatkit'
+
+    def __init__(self, tab_close_delay: int = 3):
+        self.tab_close_delay = tab_close_delay
+
+    def send(self, phone: str, message: str, hour: int = None, minute: int = None):
+        # pywhatkit probes the display on import, so only load it when needed
+        import pywhatkit as kit
+        from pywhatkit.core.exceptions import CountryCodeException
+
+        try:
+            with _PYWHATKIT_LOCK:
+                if hour is None or minute is None:
+                    kit.sendwhatmsg_instantly(
+                        phone_no=phone,
+                        message=message,
+                        wait_time=self.tab_close_delay
+                    )
+                    return
+
+                kit.sendwhatmsg(
+                    phone_no=phone,
+                    message=message,
+                    time_hour=hour,
+                    time_min=minute,
+                    wait_time=self.tab_close_delay
+                )
+        except CountryCodeException as e:
+            raise PermanentTransportError(str(e)) from e
+
+
+class WebDriverTransport(Transport):
+    """
+    Sends messages through one long-lived WhatsApp Web page driven by
+    Selenium (an optional dependency: pip install selenium).
+
+    The page is loaded once. For every message the chat is opened in-page
+    through a WhatsApp send link, the send button is clicked, and send()
+    returns as soon as the message shows up in the chat as outgoing (queued
+    for delivery). Nothing waits a fixed time; every step waits for the page.
+
+    Args:
+        url: WhatsApp Web address, or a mock page such as mock_web/whatsapp.html for testing
+        browser: 'chrome' or 'firefox'
+        profile_dir: Browser profile directory, so the WhatsApp login is kept between runs
+        headless: Run the browser without a window
+        login_timeout: Seconds to wait for WhatsApp Web to load (and for the QR code to be scanned)
+        open_timeout: Seconds to wait for a chat to open
+        send_timeout: Seconds to wait for a message to be queued after clicking send
+        driver: An existing Selenium WebDriver to use instead of starting a browser
+    """
+
+    name = 'webdriver'
+
+    # CSS selectors for the parts of WhatsApp Web used here. WhatsApp changes
+    # its markup from time to time; mock_web/whatsapp.html implements the same ones.
+    SELECTORS = {
+        'ready': '#pane-side',
+        'compose': "footer div[contenteditable='true']",
+        'send': "footer span[data-icon='send']",
+        'outgoing': '#main div.message-out',
+        'invalid': "div[data-animate-modal-popup='true']",
+    }
+
+    # WhatsApp Web handles clicks on its own send links without reloading the page
+    OPEN_CHAT_SCRIPT = """
+        const link = document.createElement('a');
+        link.href = arguments[0];
+        document.body.appendChild(link);
+        link.click();
+        link.remove();
+    """
+
+    def __init__(self, url: str = 'https://web.whatsapp.com', browser: str = 'chrome',
+                 profile_dir: Optional[str] = None, headless: bool = False, login_timeout: float = 120.0,
+                 open_timeout: float = 20.0, send_timeout: float = 20.0, driver=None):
+        if browser not in ('chrome', 'firefox'):
+            raise ValueError(f"Unsupported browser: {browser}")
+        try:
+            import selenium  # noqa: F401
+        except ImportError as e:
+            raise TransportError("The webdriver transport needs Selenium: pip install selenium") from e
+        self.url = url
+        self.browser = browser
+        self.profile_dir = profile_dir
+        self.headless = headless
+        self.login_timeout = login_timeout
+        self.open_timeout = open_timeout
+        self.send_timeout = send_timeout
+        self._driver = driver
+        self._ready = False
+        self._lock = threading.Lock()  # there is one page, so sends take turns
+
+    def send(self, phone: str, message: str, hour: int = None, minute: int = None):
+        if hour is not None and minute is not None:
+            from send_scheduler import monotonic_deadline, next_occurrence
+            time.sleep(max(0.0, monotonic_deadline(next_occurrence(hour, minute)) - time.monotonic()))
+
+        from selenium.common.exceptions import TimeoutException, WebDriverException
+
+        with self._lock:
+            try:
+                self._open_page()
+                self._send(phone, message)
+            except TimeoutException as e:
+                raise TransportError(f"Timed out sending to {phone}: {e.msg or 'page did not respond'}") from e
+            except WebDriverException as e:
+                self._ready = False  # reload the page before the next message
+                raise TransportError(f"Browser error sending to {phone}: {e.msg}") from e
+
+    def _open_page(self):
+        if self._driver is None:
+            self._driver = self._create_driver()
+        if not self._ready:
+            self._driver.get(self.url)
+            self._wait(self.login_timeout, lambda driver: self._find('ready'),
+                       "WhatsApp Web did not load (scan the QR code if asked)")
+            self._ready = True
+
+    def _create_driver(self):
+        from selenium import webdriver
+
+        if self.browser == 'firefox':
+            options = webdriver.FirefoxOptions()
+            if self.headless:
+                options.add_argument('-headless')
+            if self.profile_dir:
+                options.add_argument('-profile')
+                options.add_argument(os.path.abspath(self.profile_dir))
+            return webdriver.Firefox(options=options)
+
+        options = webdriver.ChromeOptions()
+        if self.headless:
+            options.add_argument('--headless=new')
+        if self.profile_dir:
+            options.add_argument(f'--user-data-dir={os.path.abspath(self.profile_dir)}')
+        return webdriver.Chrome(options=options)
+
+    def _send(self, phone: str, message: str):
+        digits = ''.join(character for character in phone if character.isdigit())
+        link = f"https://api.whatsapp.com/send?phone={digits}&text={quote(message)}"
+        self._driver.execute_script(self.OPEN_CHAT_SCRIPT, link)
+
+        # The chat is open once its compose box holds the prefilled message
+        def chat_or_invalid(driver):
+            popup = self._find('invalid')
+            if popup is not None:
+                return popup
+            compose = self._find('compose')
+            return compose is not None and compose.text.strip() != ''
+
+        result = self._wait(self.open_timeout, chat_or_invalid, f"chat with {phone} did not open")
+        if result is not True:
+            self._dismiss(result)
+            raise PermanentTransportError(f"{phone} is not on WhatsApp")
+
+        outgoing = len(self._find_all('outgoing'))
+        self._wait(self.open_timeout, lambda driver: self._find('send'), "send button did not appear").click()
+
+        # Queued as soon as the new message appears in the chat (it may still show the clock icon)
+        self._wait(self.send_timeout, lambda driver: len(self._find_all('outgoing')) > outgoing,
+                   "message was not queued")
+
+    def _find(self, selector: str):
+        elements = self._find_all(selector)
+        return elements[0] if elements else None
+
+    def _find_all(self, selector: str):
+        from selenium.webdriver.common.by import By
+        return self._driver.find_elements(By.CSS_SELECTOR, self.SELECTORS[selector])
+
+    def _wait(self, timeout: float, condition, message: str):
+        from selenium.webdriver.support.ui import WebDriverWait
+        return WebDriverWait(self._driver, timeout, poll_frequency=0.05).until(condition, message)
+
+    def _dismiss(self, popup):
+        from selenium.common.exceptions import WebDriverException
+        from selenium.webdriver.common.by import By
+        try:
+            popup.find_element(By.CSS_SELECTOR, 'button').click()
+        except WebDriverException:
+            self._ready = False  # couldn't close it; reload the page next time
+
+    def close(self):
+        if self._driver is not None:
+            try:
+                self._driver.quit()
+            finally:
+                self._driver = None
+                self._ready = False
+
+
+class FakeTransport(Transport):
+    """
+    In-process transport that never touches the network or a browser.
+
+    Args:
+        latency: Seconds each send takes
+        failure_rate: Probability (0.0 - 1.0) that a send raises TransportError
+        seed: Optional seed for reproducible failure patterns
+        permanent_failure_rate: Probability (0.0 - 1.0) that a send raises
+            PermanentTransportError instead
+    """
+
+    name = 'fake'
+
+    def __init__(self, latency: float = 0.0, failure_rate: float = 0.0, seed: Optional[int] = None,
+                 permanent_failure_rate: float = 0.0):
+        if not 0.0 <= failure_rate <= 1.0 or not 0.0 <= permanent_failure_rate <= 1.0:
+            raise ValueError("failure rates must be between 0.0 and 1.0")
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.permanent_failure_rate = permanent_failure_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.sent = 0
+        self.failed = 0
+
+    def send(self, phone: str, message: str, hour: int = None, minute: int = None):
+        if self.latency > 0:
+            time.sleep(self.latency)
+        self._complete(phone)
+
+    async def send_async(self, phone: str, message: str):
+        import asyncio
+        if self.latency > 0:
+            await asyncio.sleep(self.latency)
+        self._complete(phone)
+
+    def _complete(self, phone: str):
+        with self._lock:
+            if self.permanent_failure_rate and self._random.random() < self.permanent_failure_rate:
+                self.failed += 1
+                raise PermanentTransportError(f"Simulated permanent failure sending to {phone}")
+            if self.failure_rate and self._random.random() < self.failure_rate:
+                self.failed += 1
+                raise TransportError(f"Simulated failure sending to {phone}")
+            self.sent += 1
+
+
+def create_transport(name: str = None, tab_close_delay: int = 3, session: Optional[int] = None) -> Transport:
+    """
+    Create a transport by name.
+
+    Args:
+        name: 'pywhatkit', 'webdriver' or 'fake' (defaults to the TRANSPORT environment variable)
+        tab_close_delay: Seconds before closing the browser tab (pywhatkit only)
+        session: Session number; webdriver sessions each get their own browser profile under WEBDRIVER_PROFILE
+    """
+    name = (name or os.getenv('TRANSPORT', 'pywhatkit')).lower()
+
+    if name == 'pywhatkit':
+        return PyWhatKitTransport(tab_close_delay=tab_close_delay)
+    if name == 'webdriver':
+        profile_dir = os.getenv('WEBDRIVER_PROFILE')
+        if profile_dir and session is not None:
+            profile_dir = os.path.join(profile_dir, f'session-{session}')
+        return WebDriverTransport(
+            url=os.getenv('WEBDRIVER_URL', 'https://web.whatsapp.com'),
+            browser=os.getenv('WEBDRIVER_BROWSER', 'chrome'),
+            profile_dir=profile_dir,
+            headless=os.getenv('WEBDRIVER_HEADLESS', '').lower() in ('1', 'true', 'yes')
+        )
+    if name == 'fake':
+        return FakeTransport(
+            latency=float(os.getenv('FAKE_LATENCY', '0')),
+            failure_rate=float(os.getenv('FAKE_FAILURE_RATE', '0')),
+            permanent_failure_rate=float(os.getenv('FAKE_PERMANENT_FAILURE_RATE', '0'))
+        )
+
+    raise ValueError(f"Unknown transport: {name}")
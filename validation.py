@@ -0,0 +1,324 @@
+"""
+Contact list validation for WhatsApp Bulk Sender.
+
+Checks a whole contacts file before a campaign is scheduled, so bad rows are
+reported up front instead of failing one send slot at a time:
+
+- schema: the file can be read and has a 'phone' column
+- phone numbers: present, no letters or stray characters, a plausible length
+  (8-15 digits with the country code, as in E.164), a country code that
+  doesn't start with 0, and not a placeholder such as 0000000000
+- templates: every {field} placeholder without a default has a value
+- duplicates: repeated numbers (a warning; the sender collapses them)
+
+Every check is a vectorized pandas operation over a chunk of rows, so
+millions of contacts are validated in seconds. Problems are collected in a
+ValidationReport with one line per row and problem.
+"""
+
+import logging
+import os
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional
+
+from contacts import frame_from_rows
+from message_templates import TemplateRenderer
+from phone_numbers import PhoneNormalizer
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+
+ERROR = 'error'
+WARNING = 'warning'
+
+# Digits in a full international number, country code included
+MIN_DIGITS = 8
+MAX_DIGITS = 15
+
+# Anything besides digits, whitespace and + - ( ) . / is suspicious in a phone number
+_INVALID_PHONE_CHARACTERS = r'[^\d\s+\-().\/]'
+
+# A number saved by a spreadsheet or pandas as a float, e.g. 9876543210.0
+_DECIMAL_NUMBER = r'\+?\d+\.0+'
+
+ISSUE_COLUMNS = ['source', 'row', 'phone', 'column', 'severity', 'code', 'message']
+
+
+class ValidationReport:
+    """
+    Problems found in one or more contact files.
+
+    Rows are numbered from 1 for the first contact after the header.
+    File-level problems (unreadable file, missing column) have no row.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.sources = []
+        self._issues = []  # DataFrames with ISSUE_COLUMNS
+
+    def add(self, source: str, rows: 'pd.Series', phones: 'pd.Series', code: str, message: str,
+            severity: str = ERROR, column: Optional[str] = None):
+        """Record one problem for every row in `rows` (with the matching raw phone numbers)."""
+        import pandas as pd
+
+        if len(rows) == 0:
+            return
+        self._issues.append(pd.DataFrame({
+            'source': source,
+            'row': rows.to_numpy(),
+            'phone': phones.to_numpy(),
+            'column': column or 'phone',
+            'severity': severity,
+            'code': code,
+            'message': message
+        }, columns=ISSUE_COLUMNS))
+
+    def add_file_issue(self, source: str, code: str, message: str, column: Optional[str] = None):
+        import pandas as pd
+
+        self._issues.append(pd.DataFrame([{
+            'source': source, 'row': None, 'phone': None, 'column': column, 'severity': ERROR,
+            'code': code, 'message': message
+        }], columns=ISSUE_COLUMNS))
+
+    @property
+    def issues(self) -> 'pd.DataFrame':
+        """All problems, one per row and check"""
+        import pandas as pd
+
+        if not self._issues:
+            return pd.DataFrame(columns=ISSUE_COLUMNS)
+        if len(self._issues) > 1:
+            issues = pd.concat(self._issues, ignore_index=True)
+            issues['row'] = issues['row'].astype('Int64')  # file-level problems have no row
+            self._issues = [issues]
+        return self._issues[0]
+
+    @property
+    def error_count(self) -> int:
+        return sum(int((issues['severity'] == ERROR).sum()) for issues in self._issues)
+
+    @property
+    def warning_count(self) -> int:
+        return sum(int((issues['severity'] == WARNING).sum()) for issues in self._issues)
+
+    @property
+    def ok(self) -> bool:
+        """True if nothing would stop the campaign (warnings are allowed)"""
+        return self.error_count == 0
+
+    def counts(self) -> Dict[str, int]:
+        """Number of problems per code"""
+        issues = self.issues
+        return {code: int(count) for code, count in issues['code'].value_counts().items()}
+
+    def examples(self, per_code: int = 3) -> 'pd.DataFrame':
+        """The first few problems of every code"""
+        return self.issues.groupby('code', sort=False).head(per_code)
+
+    def write_csv(self, path: str):
+        """Write the row-level report, sorted by source and row."""
+        self.issues.sort_values(['source', 'row'], kind='stable', na_position='first').to_csv(path, index=False)
+
+
+class _SeenNumbers:
+    """
+    Integer keys of every usable number checked so far, as one sorted int64
+    array, so the duplicate check across chunks and files costs 8 bytes per
+    distinct number.
+    """
+
+    def __init__(self):
+        import numpy as np
+
+        self._keys = np.empty(0, dtype=np.int64)
+
+    def repeated(self, keys: 'np.ndarray') -> 'np.ndarray':
+        """Mark the keys seen before (earlier in this array or in earlier calls), and remember the rest."""
+        import numpy as np
+
+        repeated = np.ones(len(keys), dtype=bool)
+        repeated[np.unique(keys, return_index=True)[1]] = False
+        if len(self._keys):
+            positions = np.minimum(np.searchsorted(self._keys, keys), len(self._keys) - 1)
+            repeated |= self._keys[positions] == keys
+
+        # Both parts are sorted, so the stable sort only has to merge them
+        self._keys = np.sort(np.concatenate([self._keys, np.sort(keys[~repeated])]), kind='stable')
+        return repeated
+
+
+class ContactValidator:
+    """
+    Validates contact files with the same parsing and normalization the
+    sender uses.
+
+    Args:
+        default_message: Message used for contacts without their own
+        country_code: Country code for numbers without one (defaults to the
+            DEFAULT_COUNTRY_CODE environment variable, then +91)
+        chunksize: Rows checked per vectorized pass
+    """
+
+    def __init__(self, default_message: str = "", country_code: Optional[str] = None, chunksize: int = 100000):
+        self.default_message = default_message
+        self.normalizer = PhoneNormalizer(country_code)
+        self.chunksize = chunksize
+        self.templates = TemplateRenderer()
+
+    def validate_files(self, paths: List[str], sheet_name: str = 'Sheet1') -> ValidationReport:
+        """Validate several files into one report (duplicates are checked across all of them)."""
+        report = ValidationReport()
+        seen = _SeenNumbers()
+        for path in paths:
+            self._validate_file(path, sheet_name, report, seen)
+        return report
+
+    def validate_file(self, path: str, sheet_name: str = 'Sheet1') -> ValidationReport:
+        return self.validate_files([path], sheet_name)
+
+    def _validate_file(self, path: str, sheet_name: str, report: ValidationReport, seen: _SeenNumbers):
+        report.sources.append(path)
+        first_row = 1
+        try:
+            for df in read_frames(path, sheet_name, self.chunksize):
+                if first_row == 1 and 'phone' not in df.columns:
+                    report.add_file_issue(path, 'missing_column', "No 'phone' column "
+                                          f"(columns: {', '.join(map(str, df.columns))})", 'phone')
+                    return
+                self.validate_frame(df, path, first_row, report, seen)
+                first_row += len(df)
+        except Exception as e:
+            report.add_file_issue(path, 'unreadable', f"Could not read the file: {e}")
+            return
+
+        rows = first_row - 1
+        report.rows += rows
+        if rows == 0:
+            report.add_file_issue(path, 'empty', 'The file has no contacts')
+        logging.info(f"Validated {rows} contacts in {path}")
+
+    def validate_frame(self, df: 'pd.DataFrame', source: str, first_row: int,
+                       report: ValidationReport, seen: Optional[_SeenNumbers] = None):
+        """
+        Check one chunk of contacts and record its problems in report.
+        Numbers already in `seen` (from earlier chunks and files) are
+        reported as duplicates; pass the same one for every chunk.
+        """
+        import numpy as np
+        import pandas as pd
+
+        rows = pd.Series(np.arange(first_row, first_row + len(df)), index=df.index)
+        raw = df['phone']
+        text = raw.astype(str).str.strip()
+
+        # Phone numbers
+        missing = raw.isna() | (text == '')
+        invalid = ~missing & text.str.contains(_INVALID_PHONE_CHARACTERS, regex=True)
+        decimal = ~missing & ~invalid & text.str.fullmatch(_DECIMAL_NUMBER)
+        invalid |= decimal
+        normalized = self.normalizer.normalize_series(raw)
+        digits = normalized.str[1:]
+        lengths = digits.str.len()
+        checked = ~missing & ~invalid
+        too_short = checked & (lengths < MIN_DIGITS)
+        too_long = checked & (lengths > MAX_DIGITS)
+        checked &= ~too_short & ~too_long
+        bad_country_code = checked & digits.str.startswith('0')
+        placeholder = checked & ~bad_country_code & digits.str[-9:].str.fullmatch(r'(\d)\1{8}')
+
+        report.add(source, rows[missing], raw[missing], 'missing_phone', 'No phone number')
+        report.add(source, rows[invalid & ~decimal], raw[invalid & ~decimal], 'invalid_characters',
+                   'Phone number contains letters or other characters that are not part of a number')
+        report.add(source, rows[decimal], raw[decimal], 'decimal_number',
+                   'Phone number was saved as a decimal number (e.g. 9876543210.0); store it as text')
+        report.add(source, rows[too_short], raw[too_short], 'too_short',
+                   f'Fewer than {MIN_DIGITS} digits including the country code')
+        report.add(source, rows[too_long], raw[too_long], 'too_long',
+                   f'More than {MAX_DIGITS} digits including the country code')
+        report.add(source, rows[bad_country_code], raw[bad_country_code], 'invalid_country_code',
+                   'Country code starts with 0')
+        report.add(source, rows[placeholder], raw[placeholder], 'placeholder_number',
+                   'Looks like a placeholder (the same digit repeated)')
+
+        # Message templates: one check per distinct template in the chunk
+        if 'message' in df.columns:
+            own = df['message']
+            templates = own.where(~(own.isna() | (own.astype(str) == '')), self.default_message).astype(str)
+        else:
+            templates = pd.Series(self.default_message, index=df.index)
+
+        for source_text, index in templates.groupby(templates, sort=False).groups.items():
+            if source_text == '':
+                report.add(source, rows[index], raw[index], 'missing_message',
+                           'No message in the row and no default message', column='message')
+                continue
+            template = self.templates.compile(source_text)
+            for field, placeholder_text in template.required_fields:
+                if field in df.columns:
+                    values = df.loc[index, field]
+                    empty = values.index[(values.isna() | (values.astype(str) == '')).to_numpy()]
+                else:
+                    empty = index
+                report.add(source, rows[empty], raw[empty], 'missing_field',
+                           f"No value for {placeholder_text} (the message would contain it literally)",
+                           column=field)
+
+        # Repeated numbers; too long ones are errors already and don't fit the keys
+        if seen is not None:
+            usable = ~missing & ~invalid & ~too_long
+            keys = ('1' + digits[usable]).astype('int64').to_numpy()
+            repeated = usable.copy()
+            repeated[usable] = seen.repeated(keys)
+            report.add(source, rows[repeated], raw[repeated], 'duplicate',
+                       'Number appears earlier in the list; only the first is messaged', WARNING)
+
+
+def read_frames(path: str, sheet_name: str = 'Sheet1', chunksize: int = 100000) -> Iterator['pd.DataFrame']:
+    """
+    Read a CSV or Excel file as DataFrames of up to `chunksize` rows, parsed
+    the same way the sender's loaders parse them.
+    """
+    import pandas as pd
+
+    if not path.lower().endswith(('.xlsx', '.xlsm', '.xls')):
+        yield from pd.read_csv(path, chunksize=chunksize, dtype={'phone': str})
+        return
+
+    if path.lower().endswith('.xls'):
+        # openpyxl can't read the old binary format; pandas reads it with xlrd
+        df = pd.read_excel(path, sheet_name=sheet_name, dtype={'phone': str})
+        for start in range(0, max(len(df), 1), chunksize):
+            yield df.iloc[start:start + chunksize]
+        return
+
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook[sheet_name].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(column) for column in header]
+        batch = []
+        chunks = 0
+        for row in rows:
+            if all(value is None for value in row):
+                continue  # the loaders skip blank rows too
+            batch.append(row)
+            if len(batch) >= chunksize:
+                yield frame_from_rows(batch, columns)
+                chunks += 1
+                batch = []
+        if batch or chunks == 0:
+            yield frame_from_rows(batch, columns)
+    finally:
+        workbook.close()
+
+
+def report_path(file_path: str) -> str:
+    """Default report file for a contacts file: contacts.csv -> contacts.validation.csv"""
+    return os.path.splitext(file_path)[0] + '.validation.csv'
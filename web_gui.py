@@ -1,9 +1,18 @@
-from flask import Flask, render_template_string, request, redirect, url_for, flash
-from whatsapp_bulk_sender import WhatsAppBulkSender
+from flask import Flask, Response, render_template_string, request, redirect, url_for, flash, jsonify, \
+    stream_with_context
+from whatsapp_bulk_sender import WhatsAppBulkSender, load_environment, setup_logging
+from jobs import FINISHED, JobQueue, QueueFull
+from dispatcher import NORMAL, PRIORITIES, Dispatcher, validate_weight
+from sessions import create_sessions
+import json
+import os
+import tempfile
 import threading
+import time
 
 app = Flask(__name__)
 app.secret_key = 'whatsapp-bulk-sender-demo'
+app.config['MAX_CONTENT_LENGTH'] = int(os.getenv('WEB_MAX_UPLOAD_MB', '100')) * 1024 * 1024
 
 HTML = '''
 <!DOCTYPE html>
@@ -15,10 +24,14 @@ HTML = '''
         body { font-family: Arial, sans-serif; background: #f7f7f7; }
         .container { max-width: 500px; margin: 40px auto; background: #fff; padding: 30px; border-radius: 10px; box-shadow: 0 2px 8px #ccc; }
         h2 { color: #25D366; }
-        textarea, input[type=text] { width: 100%; padding: 10px; margin: 8px 0 16px 0; border: 1px solid #ccc; border-radius: 5px; }
+        textarea, input[type=text], select { width: 100%; padding: 10px; margin: 8px 0 16px 0; border: 1px solid #ccc; border-radius: 5px; }
         button { background: #25D366; color: #fff; border: none; padding: 12px 30px; border-radius: 5px; font-size: 16px; cursor: pointer; }
         button:hover { background: #128C7E; }
         .flash { color: #d8000c; background: #ffd2d2; padding: 10px; border-radius: 5px; margin-bottom: 10px; }
+        table { width: 100%; border-collapse: collapse; margin-top: 24px; font-size: 14px; }
+        th, td { text-align: left; padding: 6px; border-bottom: 1px solid #eee; }
+        .link-button { background: none; color: #d8000c; padding: 0; font-size: 14px; }
+        .recent { font-size: 12px; color: #666; }
     </style>
 </head>
 <body>
@@ -34,16 +47,133 @@ HTML = '''
             <textarea name="message" rows="5" required placeholder="Type your message here..."></textarea>
             <label>Phone Numbers (comma separated):</label>
             <input type="text" name="phones" required placeholder="e.g. +911234567890, +919876543210">
+            <label>Priority:</label>
+            <select name="priority">
+                {% for priority in priorities %}<option{% if priority == 'normal' %} selected{% endif %}>{{ priority }}</option>{% endfor %}
+            </select>
             <button type="submit">Send</button>
         </form>
+        <h3>Or upload a contacts file</h3>
+        <form method="post" action="{{ url_for('upload') }}" enctype="multipart/form-data">
+            <label>CSV or Excel file (columns: phone, name, message):</label>
+            <input type="file" name="file" accept=".csv,.xlsx,.xlsm" required>
+            <label>Message (for contacts without their own):</label>
+            <textarea name="message" rows="3" placeholder="Hello {name}!"></textarea>
+            <label>Excel sheet:</label>
+            <input type="text" name="sheet" placeholder="Sheet1">
+            <label>Priority:</label>
+            <select name="priority">
+                {% for priority in priorities %}<option{% if priority == 'bulk' %} selected{% endif %}>{{ priority }}</option>{% endfor %}
+            </select>
+            <button type="submit">Upload and Send</button>
+        </form>
+        {% if jobs %}
+        <table>
+            <tr><th>Job</th><th>Priority</th><th>Status</th><th>Progress</th><th></th></tr>
+            {% for job in jobs %}
+            <tr id="job-{{ job.id }}" data-events="{{ url_for('job_events', job_id=job.id) if job.status == 'running' }}">
+                <td><a href="{{ url_for('job_status', job_id=job.id) }}">{{ job.id }}</a></td>
+                <td>{{ job.priority }}</td>
+                <td class="status">{{ job.status }}</td>
+                <td>
+                    <span class="progress">{{ job.processed }} / {{ job.total if job.total is not none else '?' }}</span>
+                    <div class="recent"></div>
+                </td>
+                <td>
+                    {% if job.status in ('queued', 'running') %}
+                    <form method="post" action="{{ url_for('cancel_job', job_id=job.id) }}">
+                        <button type="submit" class="link-button">Cancel</button>
+                    </form>
+                    {% endif %}
+                </td>
+            </tr>
+            {% endfor %}
+        </table>
+        {% endif %}
     </div>
+    <script>
+        // Follow running jobs; queued ones show up as running after the next page load
+        document.querySelectorAll('tr[data-events]').forEach(function (row) {
+            if (!row.dataset.events) return;
+            var source = new EventSource(row.dataset.events);
+            source.addEventListener('progress', function (e) {
+                var job = JSON.parse(e.data);
+                var rate = job.messages_per_minute !== null ? ' (' + job.messages_per_minute + '/min)' : '';
+                row.querySelector('.status').textContent = job.status;
+                row.querySelector('.progress').textContent =
+                    job.processed + ' / ' + (job.total !== null ? job.total : '?') + rate;
+                if (job.contacts.length) {
+                    var last = job.contacts[job.contacts.length - 1];
+                    row.querySelector('.recent').textContent = last.phone + ': ' + last.status;
+                }
+            });
+            source.addEventListener('end', function () {
+                source.close();
+                window.location.reload();
+            });
+        });
+    </script>
 </body>
 </html>
 '''
 
-def send_bulk_async(contacts, message):
-    sender = WhatsAppBulkSender()
-    sender.send_bulk_messages(contacts, message)
+# Seconds a client is asked to wait before resubmitting when the queue is full
+RETRY_AFTER = 30
+
+# Progress streams send at most one update per this many seconds, covering
+# every contact finished since the previous one
+PROGRESS_INTERVAL = float(os.getenv('WEB_PROGRESS_INTERVAL', '1'))
+
+# Seconds between keep-alive comments on an idle progress stream
+KEEPALIVE_INTERVAL = 15
+
+# Uploads are copied to disk this many bytes at a time
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Rows parsed at a time from an uploaded file; sending starts after the first chunk
+UPLOAD_PARSE_CHUNK_SIZE = 1000
+
+UPLOAD_EXTENSIONS = ('.csv', '.xlsx', '.xlsm')
+
+_job_queue = None
+_job_queue_lock = threading.Lock()
+
+def get_job_queue():
+    """
+    The job queue shared by all requests, created on first use.
+    Running jobs share one dispatcher over WEB_SESSIONS sender sessions, which
+    interleaves them by priority. WEB_WORKERS sets how many campaigns run at
+    once and WEB_MAX_QUEUED_JOBS how many may wait before new submissions are
+    rejected.
+    """
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            sessions = int(os.getenv('WEB_SESSIONS', '1'))
+            sender = WhatsAppBulkSender(sessions=create_sessions(sessions) if sessions > 1 else None)
+            max_contacts = os.getenv('WEB_MAX_QUEUED_CONTACTS')
+            _job_queue = JobQueue(
+                workers=int(os.getenv('WEB_WORKERS', '4')),
+                max_queued=int(os.getenv('WEB_MAX_QUEUED_JOBS', '10')),
+                max_queued_contacts=int(max_contacts) if max_contacts else None,
+                dispatcher=Dispatcher(sender)
+            )
+        return _job_queue
+
+def job_priority(params, default=NORMAL):
+    """
+    Priority and weight from request parameters.
+    Raises ValueError for an unknown priority or a weight that is not a positive finite number.
+    """
+    priority = str(params.get('priority') or default).strip().lower()
+    if priority not in PRIORITIES:
+        raise ValueError(f"priority must be one of {', '.join(PRIORITIES)}")
+    return priority, validate_weight(float(params.get('weight') or 1))
+
+def parse_contacts(message, phones):
+    """Contacts for a message and comma-separated phone numbers"""
+    phone_list = [p.strip() for p in phones.split(',') if p.strip()]
+    return [{"phone": num, "name": "", "message": message} for num in phone_list]
 
 @app.route('/', methods=['GET', 'POST'])
 def index():
@@ -53,15 +183,254 @@ def index():
         if not message or not phones:
             flash('Please enter both message and phone numbers.')
             return redirect(url_for('index'))
-        phone_list = [p.strip() for p in phones.split(',') if p.strip()]
-        if not phone_list:
+        contacts = parse_contacts(message, phones)
+        if not contacts:
             flash('Please enter at least one phone number.')
             return redirect(url_for('index'))
-        contacts = [{"phone": num, "name": "", "message": message} for num in phone_list]
-        threading.Thread(target=send_bulk_async, args=(contacts, message)).start()
-        flash(f'Sending to {len(contacts)} numbers. Please keep WhatsApp Web open.')
+        try:
+            priority, weight = job_priority(request.form)
+            job = get_job_queue().submit(contacts, message, priority=priority, weight=weight)
+        except ValueError as e:
+            flash(f'Invalid priority: {e}')
+            return redirect(url_for('index'))
+        except QueueFull:
+            flash('The sender is busy with other campaigns. Please try again in a few minutes.')
+            return redirect(url_for('index'))
+        flash(f'Job {job.id} queued to send to {len(contacts)} numbers. Please keep WhatsApp Web open.')
+        return redirect(url_for('index'))
+    jobs = [job.to_dict() for job in get_job_queue().list()[:20]]
+    return render_template_string(HTML, jobs=jobs, priorities=PRIORITIES)
+
+def upload_dir():
+    """Where uploaded contact files are kept while their job runs (WEB_UPLOAD_DIR)"""
+    path = os.getenv('WEB_UPLOAD_DIR') or os.path.join(tempfile.gettempdir(), 'whatsapp_uploads')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+def save_upload(stream, extension):
+    """
+    Copy an uploaded file to the upload directory in chunks, so it is never
+    held in memory. Returns the path and, for CSV files, the number of data
+    rows (counted from the line breaks while copying).
+    """
+    fd, path = tempfile.mkstemp(suffix=extension, dir=upload_dir())
+    lines = 0
+    last = b''
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            while True:
+                chunk = stream.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                f.write(chunk)
+                lines += chunk.count(b'\n')
+                last = chunk[-1:]
+    except BaseException:
+        os.remove(path)
+        raise
+    if last not in (b'', b'\n'):
+        lines += 1  # no line break after the last row
+    return path, (max(0, lines - 1) if extension == '.csv' else None)
+
+def queue_upload(stream, extension, message='', sheet=None, country_code=None, priority=NORMAL, weight=1.0):
+    """
+    Save an uploaded contacts file and queue a job that streams contacts
+    from it with the sender's loaders, so messages go out while the rest of
+    the file is still being parsed. The file is deleted when the job ends.
+    """
+    job_queue = get_job_queue()
+    if job_queue.full():
+        raise QueueFull(f"{job_queue.max_queued} jobs are already waiting")  # don't bother saving the file
+
+    path, rows = save_upload(stream, extension)
+    if extension == '.csv':
+        def contacts(sender):
+            return sender.iter_contacts_from_csv(path, UPLOAD_PARSE_CHUNK_SIZE, country_code)
+    else:
+        def contacts(sender):
+            return sender.iter_contacts_from_excel(path, sheet or 'Sheet1', UPLOAD_PARSE_CHUNK_SIZE, country_code)
+
+    try:
+        return job_queue.submit(contacts, message, total=rows, on_finish=lambda: os.remove(path),
+                                priority=priority, weight=weight)
+    except QueueFull:
+        os.remove(path)
+        raise
+
+def queue_full_response(error):
+    response = jsonify({'error': f'Queue is full: {error}'})
+    response.headers['Retry-After'] = str(RETRY_AFTER)
+    return response, 429
+
+def job_accepted_response(job):
+    response = jsonify(job.to_dict())
+    response.headers['Location'] = url_for('job_status', job_id=job.id)
+    return response, 202
+
+def upload_extension(filename):
+    extension = os.path.splitext(filename or '')[1].lower()
+    return extension if extension in UPLOAD_EXTENSIONS else None
+
+@app.route('/upload', methods=['POST'])
+def upload():
+    file = request.files.get('file')
+    extension = upload_extension(file.filename) if file else None
+    if extension is None:
+        flash('Please choose a CSV or Excel (.xlsx) file.')
+        return redirect(url_for('index'))
+    try:
+        priority, weight = job_priority(request.form)
+        job = queue_upload(file.stream, extension, request.form.get('message', '').strip(),
+                           request.form.get('sheet', '').strip() or None, priority=priority, weight=weight)
+    except ValueError as e:
+        flash(f'Invalid priority: {e}')
+        return redirect(url_for('index'))
+    except QueueFull:
+        flash('The sender is busy with other campaigns. Please try again in a few minutes.')
+        return redirect(url_for('index'))
+    flash(f'Job {job.id} queued from {file.filename}. Please keep WhatsApp Web open.')
+    return redirect(url_for('index'))
+
+@app.route('/jobs/upload', methods=['POST'])
+def submit_upload():
+    """
+    Queue a campaign from a contacts file, sent either as multipart form data
+    (field "file") or as the raw request body with ?format=csv|xlsx, which is
+    streamed straight to disk. Optional parameters: message, sheet,
+    country_code, priority (urgent, normal or bulk; default bulk) and weight.
+    Responds 202 with the job, or 429 when the queue is full.
+    """
+    params = request.args.to_dict()
+    file = request.files.get('file')
+    if file is not None:
+        params.update(request.form.to_dict())
+        extension = upload_extension(file.filename)
+        stream = file.stream
+    else:
+        default_format = 'csv' if request.mimetype == 'text/csv' else ''
+        extension = upload_extension('upload.' + params.get('format', default_format))
+        stream = request.stream
+    if extension is None:
+        return jsonify({'error': 'Upload a .csv or .xlsx file (or pass ?format=csv|xlsx)'}), 400
+
+    try:
+        priority, weight = job_priority(params, default='bulk')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        job = queue_upload(stream, extension, params.get('message', '').strip(), params.get('sheet') or None,
+                           params.get('country_code') or None, priority, weight)
+    except QueueFull as e:
+        return queue_full_response(e)
+    return job_accepted_response(job)
+
+@app.route('/jobs', methods=['GET'])
+def list_jobs():
+    job_queue = get_job_queue()
+    return jsonify({'queue': job_queue.stats(), 'jobs': [job.to_dict() for job in job_queue.list()]})
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    """
+    Queue a campaign from JSON: {"message": "...", "phones": ["+91..."]}
+    (or "phones" as a comma-separated string, or "contacts" as a list of
+    contact objects), with optional "priority" (urgent, normal or bulk) and
+    "weight". Responds 202 with the job, or 429 when the queue is full.
+    """
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Expected a JSON object'}), 400
+    message = str(data.get('message', '')).strip()
+    if 'contacts' in data:
+        items = data['contacts']
+        if not isinstance(items, list) or not all(isinstance(contact, dict) for contact in items):
+            return jsonify({'error': '"contacts" must be a list of contact objects'}), 400
+        contacts = [dict(contact) for contact in items if contact.get('phone')]
+    else:
+        phones = data.get('phones', '')
+        if not isinstance(phones, (str, list)):
+            return jsonify({'error': '"phones" must be a list or a comma-separated string'}), 400
+        contacts = parse_contacts(message, phones if isinstance(phones, str) else ','.join(map(str, phones)))
+    if not contacts:
+        return jsonify({'error': 'No contacts given'}), 400
+    if not message and any(not contact.get('message') for contact in contacts):
+        return jsonify({'error': 'A message is required'}), 400
+    try:
+        priority, weight = job_priority(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        job = get_job_queue().submit(contacts, message, priority=priority, weight=weight)
+    except QueueFull as e:
+        return queue_full_response(e)
+    return job_accepted_response(job)
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    job = get_job_queue().get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    """
+    Server-Sent Events stream of a job's progress. Each "progress" event
+    carries the job status (see GET /jobs/<id>) plus "contacts", the
+    per-contact outcomes since the previous event, and "missed", how many
+    outcomes were too old to include. Updates are coalesced to at most one
+    per WEB_PROGRESS_INTERVAL seconds. An "end" event follows once the job
+    has finished. Reconnecting clients resume from Last-Event-ID.
+    """
+    job = get_job_queue().get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    try:
+        sequence = int(request.headers.get('Last-Event-ID', 0))
+    except ValueError:
+        sequence = 0
+
+    def generate(sequence):
+        version = None
+        while True:
+            current = job.wait_for_update(version, timeout=KEEPALIVE_INTERVAL)
+            if current == version:
+                yield ': keep-alive\n\n'
+                continue
+            version = current
+
+            contacts, missed = job.events_since(sequence)
+            if contacts:
+                sequence = contacts[-1]['seq']
+            data = {**job.to_dict(), 'contacts': contacts, 'missed': missed}
+            yield f"id: {sequence}\nevent: progress\ndata: {json.dumps(data)}\n\n"
+
+            if job.status in FINISHED:
+                yield f"event: end\ndata: {json.dumps({'status': job.status})}\n\n"
+                return
+            time.sleep(PROGRESS_INTERVAL)
+
+    response = Response(stream_with_context(generate(sequence)), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # don't let nginx buffer the stream
+    return response
+
+@app.route('/jobs/<job_id>/cancel', methods=['POST'])
+@app.route('/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    job_queue = get_job_queue()
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    cancelled = job_queue.cancel(job_id)
+    if request.mimetype == 'application/x-www-form-urlencoded':  # the Cancel button on the page
+        flash(f'Job {job_id} cancelled.' if cancelled else f'Job {job_id} already finished.')
         return redirect(url_for('index'))
-    return render_template_string(HTML)
+    return jsonify(job.to_dict()), 200 if cancelled else 409
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    load_environment()
+    setup_logging()
+    app.run(host='0.0.0.0', port=5000, debug=True, use_reloader=False)
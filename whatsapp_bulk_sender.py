@@ -1,47 +1,185 @@
-import pywhatkit as kit
-import pandas as pd
-import time
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime
 import os
-from typing import List, Dict, Optional
-import schedule
-from dotenv import load_dotenv
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Callable, List, Dict, Iterable, Iterator, Optional
+from transports import Transport, create_transport
+from rate_limiter import RateLimiter
+from sessions import SenderSession, ContactFeed
+from send_scheduler import SendScheduler, monotonic_deadline, next_occurrence, wall_time
+from phone_numbers import PhoneNormalizer, PhoneIndex
+from message_templates import TemplateRenderer, is_missing
+from campaign_journal import CampaignJournal, QUEUED, SENT, RETRY, FAILED
+from suppression import SuppressionStore
+from metrics import MetricsRegistry, SenderMetrics
+from contacts import Contact, ContactStore, FailedContact, frame_from_rows, with_phone
+from retry import DeadLetterFile, RetryPolicy
+from result_log import ResultLog
+from campaign_scheduler import CampaignStore, default_store_path, parse_send_time
+
+# pandas is imported where it's used: it is slow to import and most
+# commands never touch it.
+if TYPE_CHECKING:
+    import pandas as pd
+
+_environment_loaded = False
+
+
+def load_environment():
+    """
+    Load variables from a .env file into the environment (only the first call does anything).
+    """
+    global _environment_loaded
+    if not _environment_loaded:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _environment_loaded = True
 
-# Load environment variables
-load_dotenv()
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('whatsapp_bulk_sender.log'),
-        logging.StreamHandler()
-    ]
-)
+def setup_logging(log_file: str = 'whatsapp_bulk_sender.log', level: int = logging.INFO):
+    """
+    Configure logging to the console and a log file. Called by the entry
+    points (cli, GUIs, main()) rather than on import.
+    """
+    logging.basicConfig(
+        level=level,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler(log_file),
+            logging.StreamHandler()
+        ]
+    )
+
+
+class _SendAttempt:
+    """
+    Bookkeeping for one send attempt of a bulk campaign, shared by the
+    blocking and async send paths: the journal, metrics, results, retries,
+    dead letters and the result log.
+    
+    Use it as a context manager around rendering and sending the message.
+    Leaving the block normally records the message as sent (unless skip()
+    was called); an exception records a failure or schedules a retry and is
+    not propagated. The outcome is then in `outcome`.
+    """
+    
+    def __init__(self, sender: 'WhatsAppBulkSender', session: SenderSession, contact: Dict, default_message: str,
+                 results: Dict, journal: Optional[CampaignJournal] = None, attempt: int = 1, requeue=None,
+                 dead_letter: Optional[DeadLetterFile] = None, result_log: Optional[ResultLog] = None,
+                 scheduled_at: Optional[float] = None):
+        self.sender = sender
+        self.session = session
+        self.contact = contact
+        self.default_message = default_message
+        self.results = results
+        self.journal = journal
+        self.attempt = attempt
+        self.requeue = requeue
+        self.dead_letter = dead_letter
+        self.result_log = result_log
+        self.scheduled_at = scheduled_at or time.time()
+        self.outcome = None
+        self._skipped = False
+        self._started = None
+        self._sent_at = None
+        self._send_started = None
+    
+    def __enter__(self) -> '_SendAttempt':
+        self._started = time.perf_counter()
+        if self.journal is not None and self.attempt == 1:
+            self.journal.record(self.contact['phone'], QUEUED, self.contact.get('name', ''))
+        self.sender.metrics.in_flight.inc()
+        return self
+    
+    def sending(self):
+        """Call right before the message is handed to the transport."""
+        logging.info(f"[{self.session.name}] Sending message to {self.contact['phone']} "
+                     f"({self.contact.get('name', '')}) at {datetime.now():%H:%M:%S}")
+        self._sent_at, self._send_started = time.time(), time.perf_counter()
+    
+    def skip(self):
+        """The message won't be sent after all; nothing is recorded."""
+        self._skipped = True
+    
+    def __exit__(self, exc_type, exc, tb):
+        sender = self.sender
+        session = self.session
+        duration = time.perf_counter() - self._send_started if self._send_started is not None else None
+        error = exc if exc_type is not None and issubclass(exc_type, Exception) else None
+        try:
+            if exc_type is None and not self._skipped:
+                sender._record_success(session, self.contact, self.results, self.journal)
+                self.outcome = SENT
+            elif error is not None:
+                self.outcome = sender._handle_failure(session, self.contact, error, self.default_message,
+                                                      self.results, self.journal, self.attempt, self.requeue,
+                                                      self.dead_letter)
+        finally:
+            sender.metrics.in_flight.dec()
+            sender.metrics.message_seconds.observe(time.perf_counter() - self._started, session=session.name)
+        
+        if self.outcome is not None and self.result_log is not None:
+            sender._log_attempt(self.result_log, session, self.contact, self.default_message, self.attempt,
+                                self.outcome, self.scheduled_at, self._sent_at, duration, error)
+        return error is not None  # the failure has been handled
+
 
 class WhatsAppBulkSender:
-    def __init__(self):
-        self.message_delay = int(os.getenv('MESSAGE_DELAY', '15'))  # seconds between messages
+    def __init__(self, transport: Optional[Transport] = None, message_delay: Optional[float] = None,
+                 rate_limiter: Optional[RateLimiter] = None, sessions: Optional[List[SenderSession]] = None,
+                 default_country_code: Optional[str] = None, suppression: Optional[SuppressionStore] = None,
+                 metrics: Optional[MetricsRegistry] = None, retry_policy: Optional[RetryPolicy] = None):
+        """
+        Args:
+            transport: Backend used to deliver messages (defaults to the TRANSPORT environment variable)
+            message_delay: Seconds between messages (defaults to MESSAGE_DELAY)
+            rate_limiter: Limiter pacing the sends (defaults to one message per message_delay)
+            sessions: Pool of sessions to shard campaigns across (overrides transport and rate_limiter)
+            default_country_code: Code for numbers without one (defaults to DEFAULT_COUNTRY_CODE, then +91)
+            suppression: Opt-out list; suppressed numbers are never messaged (defaults to the
+                database named by SUPPRESSION_DB, if set)
+            metrics: Registry the sender's metrics are recorded on (a new one by default)
+            retry_policy: How failed bulk sends are retried (defaults to RETRY_* environment variables)
+        """
+        load_environment()
+        
+        if message_delay is None:
+            message_delay = float(os.getenv('MESSAGE_DELAY', '15'))
+        self.message_delay = message_delay  # seconds between messages
         self.tab_close_delay = int(os.getenv('TAB_CLOSE_DELAY', '3'))  # seconds before closing tab
         
-    def load_contacts_from_csv(self, file_path: str) -> List[Dict]:
+        if not sessions:
+            sessions = [SenderSession(
+                'default',
+                transport or create_transport(tab_close_delay=self.tab_close_delay),
+                rate_limiter or RateLimiter.from_env(self.message_delay)
+            )]
+        self.sessions = sessions
+        self.transport = sessions[0].transport
+        self.rate_limiter = sessions[0].rate_limiter
+        self.templates = TemplateRenderer()
+        self.normalizer = PhoneNormalizer(default_country_code)
+        if suppression is None and os.getenv('SUPPRESSION_DB'):
+            suppression = SuppressionStore(os.getenv('SUPPRESSION_DB'), self.normalizer)
+        self.suppression = suppression
+        self.metrics = SenderMetrics(metrics)
+        self.retry_policy = retry_policy or RetryPolicy.from_env()
+        self._results_lock = threading.Lock()
+        
+    def load_contacts_from_csv(self, file_path: str, country_code: Optional[str] = None) -> ContactStore:
         """
-        Load contacts from a CSV file.
+        Load contacts from a CSV file into a compact ContactStore.
         Expected columns: 'phone', 'name', 'message' (optional)
+        country_code overrides the sender's default country code for this file.
         """
         try:
-            df = pd.read_csv(file_path)
-            contacts = []
-            
-            for _, row in df.iterrows():
-                contact = {
-                    'phone': self._format_phone_number(str(row['phone'])),
-                    'name': row.get('name', ''),
-                    'message': row.get('message', '')
-                }
-                contacts.append(contact)
+            import pandas as pd
+            started = time.perf_counter()
+            df = pd.read_csv(file_path, dtype={'phone': str})
+            contacts = self._contacts_from_dataframe(df, country_code)
+            self._record_load('csv', started, contacts)
             
             logging.info(f"Loaded {len(contacts)} contacts from {file_path}")
             return contacts
@@ -50,22 +188,19 @@ class WhatsAppBulkSender:
             logging.error(f"Error loading contacts from CSV: {e}")
             return []
     
-    def load_contacts_from_excel(self, file_path: str, sheet_name: str = 'Sheet1') -> List[Dict]:
+    def load_contacts_from_excel(self, file_path: str, sheet_name: str = 'Sheet1',
+                                 country_code: Optional[str] = None) -> ContactStore:
         """
-        Load contacts from an Excel file.
+        Load contacts from an Excel file into a compact ContactStore.
         Expected columns: 'phone', 'name', 'message' (optional)
+        country_code overrides the sender's default country code for this file.
         """
         try:
-            df = pd.read_excel(file_path, sheet_name=sheet_name)
-            contacts = []
-            
-            for _, row in df.iterrows():
-                contact = {
-                    'phone': self._format_phone_number(str(row['phone'])),
-                    'name': row.get('name', ''),
-                    'message': row.get('message', '')
-                }
-                contacts.append(contact)
+            import pandas as pd
+            started = time.perf_counter()
+            df = pd.read_excel(file_path, sheet_name=sheet_name, dtype={'phone': str})
+            contacts = self._contacts_from_dataframe(df, country_code)
+            self._record_load('excel', started, contacts)
             
             logging.info(f"Loaded {len(contacts)} contacts from {file_path}")
             return contacts
@@ -74,93 +209,495 @@ class WhatsAppBulkSender:
             logging.error(f"Error loading contacts from Excel: {e}")
             return []
     
-    def _format_phone_number(self, phone: str) -> str:
+    def iter_contacts_from_csv(self, file_path: str, chunksize: int = 10000,
+                               country_code: Optional[str] = None) -> Iterator[Contact]:
         """
-        Format phone number to include country code.
-        Assumes Indian numbers if no country code is provided.
+        Stream contacts from a CSV file, reading it in chunks.
+        Only one chunk is held in memory at a time, so the first contact is
+        available as soon as the first chunk has been parsed.
+        Expected columns: 'phone', 'name', 'message' (optional)
+        """
+        import pandas as pd
+        
+        count = 0
+        try:
+            reader = iter(pd.read_csv(file_path, chunksize=chunksize, dtype={'phone': str}))
+            while True:
+                started = time.perf_counter()
+                chunk = next(reader, None)
+                if chunk is None:
+                    break
+                contacts = self._contacts_from_dataframe(chunk, country_code)
+                self._record_load('csv', started, contacts)
+                for contact in contacts:
+                    count += 1
+                    yield contact
+            
+            logging.info(f"Streamed {count} contacts from {file_path}")
+            
+        except Exception as e:
+            logging.error(f"Error streaming contacts from CSV after {count} rows: {e}")
+    
+    def iter_contacts_from_excel(self, file_path: str, sheet_name: str = 'Sheet1',
+                                 chunksize: int = 10000, country_code: Optional[str] = None) -> Iterator[Contact]:
+        """
+        Stream contacts from an Excel file, reading it in chunks.
+        Uses openpyxl's read-only mode so the workbook is never fully loaded
+        (old .xls files, which openpyxl can't read, are loaded whole by pandas).
+        Expected columns: 'phone', 'name', 'message' (optional)
         """
-        # Remove any non-digit characters
-        phone = ''.join(filter(str.isdigit, phone))
+        if file_path.lower().endswith('.xls'):
+            yield from self._iter_contacts_from_xls(file_path, sheet_name, chunksize, country_code)
+            return
+        
+        from openpyxl import load_workbook
         
-        # Add country code if not present
-        if len(phone) == 10:
-            phone = '+91' + phone  # Default to India
-        elif len(phone) == 11 and phone.startswith('0'):
-            phone = '+91' + phone[1:]
-        elif not phone.startswith('+'):
-            phone = '+' + phone
+        count = 0
+        workbook = None
+        try:
+            workbook = load_workbook(file_path, read_only=True, data_only=True)
+            rows = workbook[sheet_name].iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                return
+            
+            columns = [str(column) for column in header]
+            batch = []
+            started = time.perf_counter()
+            for row in rows:
+                if all(value is None for value in row):
+                    continue  # pd.read_excel skips blank rows too
+                batch.append(row)
+                if len(batch) >= chunksize:
+                    contacts = self._contacts_from_dataframe(frame_from_rows(batch, columns), country_code)
+                    self._record_load('excel', started, contacts)
+                    for contact in contacts:
+                        count += 1
+                        yield contact
+                    batch = []
+                    started = time.perf_counter()
+            
+            if batch:
+                contacts = self._contacts_from_dataframe(frame_from_rows(batch, columns), country_code)
+                self._record_load('excel', started, contacts)
+                for contact in contacts:
+                    count += 1
+                    yield contact
+            
+            logging.info(f"Streamed {count} contacts from {file_path}")
             
-        return phone
+        except Exception as e:
+            logging.error(f"Error streaming contacts from Excel after {count} rows: {e}")
+        finally:
+            if workbook is not None:
+                workbook.close()
+    
+    def _iter_contacts_from_xls(self, file_path: str, sheet_name: str, chunksize: int,
+                                country_code: Optional[str]) -> Iterator[Contact]:
+        """Stream contacts from an old-format .xls file (read with pandas and xlrd)."""
+        import pandas as pd
+        
+        count = 0
+        try:
+            started = time.perf_counter()
+            df = pd.read_excel(file_path, sheet_name=sheet_name, dtype={'phone': str})
+            for start in range(0, len(df), chunksize):
+                contacts = self._contacts_from_dataframe(df.iloc[start:start + chunksize], country_code)
+                self._record_load('excel', started, contacts)
+                for contact in contacts:
+                    count += 1
+                    yield contact
+                started = time.perf_counter()
+            
+            logging.info(f"Streamed {count} contacts from {file_path}")
+            
+        except Exception as e:
+            logging.error(f"Error streaming contacts from Excel after {count} rows: {e}")
+    
+    def iter_contacts_from_files(self, sources, sheet_name: str = 'Sheet1', country_code: Optional[str] = None,
+                                 workers: Optional[int] = None, dedupe: bool = True) -> Iterator[Contact]:
+        """
+        Stream contacts from many CSV and Excel files, given as file paths,
+        directories or glob patterns. Files are parsed in parallel worker
+        processes (one per CPU unless workers is given) and merged in order;
+        with dedupe, numbers already seen in an earlier file are dropped.
+        Files that fail to load are logged and skipped.
+        """
+        from batch_loader import expand_sources, file_source, load_files
+        
+        try:
+            files = expand_sources(sources)
+        except FileNotFoundError as e:
+            logging.error(f"Error loading contact files: {e}")
+            return
+        if not files:
+            logging.error(f"No contact files found in {sources}")
+            return
+        
+        country_code = country_code or self.normalizer.default_country_code
+        index = PhoneIndex() if dedupe else None
+        count = 0
+        for path, df, seconds, error in load_files(files, sheet_name, country_code, workers, dedupe):
+            if error is not None:
+                logging.error(f"Error loading contacts from {path}: {error}")
+                continue
+            
+            contacts = self._contacts_from_dataframe(df, normalized=True)
+            source = file_source(path)
+            self.metrics.load_seconds.observe(seconds, source=source)
+            self.metrics.contacts_loaded.inc(len(contacts), source=source)
+            logging.info(f"Loaded {len(contacts)} contacts from {path} in {seconds:.2f}s")
+            for contact in contacts:
+                if index is not None and not index.add(contact['phone']):
+                    continue
+                count += 1
+                yield contact
+        
+        duplicates = f", dropped {index.duplicates} repeated across files" if index is not None else ""
+        logging.info(f"Streamed {count} contacts from {len(files)} files{duplicates}")
     
-    def send_bulk_messages(self, contacts: List[Dict], default_message: str = "", 
-                          start_hour: int = None, start_minute: int = None) -> Dict:
+    def _record_load(self, source: str, started: float, contacts: ContactStore):
+        self.metrics.load_seconds.observe(time.perf_counter() - started, source=source)
+        self.metrics.contacts_loaded.inc(len(contacts), source=source)
+    
+    def _contacts_from_dataframe(self, df: 'pd.DataFrame', country_code: Optional[str] = None,
+                                 normalized: bool = False) -> ContactStore:
+        """
+        Build a compact contact store column-wise from a loaded DataFrame.
+        Phone numbers are normalized in one vectorized pass instead of per row
+        (unless normalized says they already are). Any other columns are kept
+        so templates can use them as placeholders.
+        """
+        if normalized:
+            phones = df['phone'].tolist()
+        else:
+            normalizer = PhoneNormalizer(country_code) if country_code else self.normalizer
+            phones = normalizer.normalize_series(df['phone']).tolist()
+        return ContactStore.from_dataframe(df, phones)
+    
+    def _format_phone_series(self, phones: 'pd.Series') -> 'pd.Series':
+        """
+        Vectorized equivalent of _format_phone_number for a whole column.
+        """
+        return self.normalizer.normalize_series(phones)
+    
+    def _format_phone_number(self, phone: str) -> str:
+        """
+        Format phone number to include country code.
+        Uses the sender's default country code if none is provided.
+        """
+        return self.normalizer.normalize(phone)
+    
+    def send_bulk_messages(self, contacts: Iterable[Dict], default_message: str = "", 
+                          start_hour: int = None, start_minute: int = None,
+                          journal: Optional[CampaignJournal] = None, dedupe: bool = True,
+                          dead_letter: Optional[DeadLetterFile] = None,
+                          progress: Optional[Callable[[Dict, Dict, str], None]] = None,
+                          cancel_event: Optional[threading.Event] = None,
+                          result_log: Optional[ResultLog] = None,
+                          suppression: Optional[SuppressionStore] = None) -> Dict:
         """
         Send bulk messages to a list of contacts.
         
         Args:
-            contacts: List of contact dictionaries
+            contacts: Contact dictionaries (a list or any iterable, e.g. from iter_contacts_from_csv)
             default_message: Default message to send if contact doesn't have specific message
             start_hour: Hour to start sending (24-hour format)
             start_minute: Minute to start sending
+            journal: Optional campaign journal; contacts it marks as delivered are skipped
+            dedupe: Drop contacts whose phone number already appeared in this campaign
+            dead_letter: Optional file that contacts are written to once they finally fail
+            progress: Called as progress(results, contact, outcome) after every send attempt, from the
+                sending thread; outcome is 'sent', 'retry' or 'failed'
+            cancel_event: Set it to stop the campaign; messages already being sent finish first
+            result_log: Optional columnar log that every send attempt is recorded in
+            suppression: Opt-out list for this campaign instead of the sender's
         """
-        results = {
+        results = self._new_results()
+        start_at = self._campaign_start(contacts, start_hour, start_minute)
+        
+        # Contacts are pulled from the iterable one at a time and shared by all
+        # sessions, so a slow or failing session simply takes fewer of them.
+        feed = ContactFeed(self._pending_contacts(contacts, journal, results, dedupe, cancel_event, suppression))
+        self.metrics.campaigns_running.inc()
+        try:
+            if len(self.sessions) == 1:
+                self._run_session(self.sessions[0], feed, default_message, start_at, results, journal, dead_letter,
+                                  progress, cancel_event, result_log)
+            else:
+                logging.info(f"Sharding campaign across {len(self.sessions)} sessions")
+                with ThreadPoolExecutor(max_workers=len(self.sessions)) as pool:
+                    futures = [
+                        pool.submit(self._run_session, session, feed, default_message, start_at, results, journal,
+                                    dead_letter, progress, cancel_event, result_log)
+                        for session in self.sessions
+                    ]
+                    for session, future in zip(self.sessions, futures):
+                        try:
+                            future.result()
+                        except Exception as e:
+                            logging.error(f"Session {session.name} stopped: {e}")
+        finally:
+            self.metrics.campaigns_running.dec()
+            if journal is not None:
+                journal.flush()
+            if result_log is not None:
+                result_log.flush()
+        
+        if cancel_event is not None and cancel_event.is_set():
+            results['cancelled'] = True
+            logging.warning("Bulk sending cancelled")
+        self._log_completion(results)
+        return results
+    
+    def _run_session(self, session: SenderSession, feed: ContactFeed, default_message: str,
+                     start_at: float, results: Dict, journal: Optional[CampaignJournal] = None,
+                     dead_letter: Optional[DeadLetterFile] = None,
+                     progress: Optional[Callable[[Dict, Dict, str], None]] = None,
+                     cancel_event: Optional[threading.Event] = None, result_log: Optional[ResultLog] = None):
+        """
+        Send messages through one session until the shared feed is exhausted
+        and no retries are pending, or the campaign is cancelled.
+        """
+        scheduler = SendScheduler(interrupt=cancel_event)
+        
+        # Heap items are (contact, attempt, due). New contacts are due now and
+        # retries once their backoff has passed, so a retry never holds up new
+        # contacts and is sent as soon as it is due.
+        def schedule(contact: Dict, attempt: int, due: float):
+            scheduler.push((contact, attempt, due), due)
+        
+        def requeue(contact: Dict, attempt: int, delay: float):
+            schedule(contact, attempt, time.monotonic() + delay)
+        
+        contact = feed.next()
+        if contact is not None:
+            schedule(contact, 1, start_at)
+        
+        while scheduler:
+            contact, attempt, due = scheduler.pop()
+            if cancel_event is not None and cancel_event.is_set():
+                break
+            outcome = self._send_contact(session, contact, default_message, results, journal, attempt, requeue,
+                                         dead_letter, result_log=result_log, scheduled_at=wall_time(due),
+                                         cancel_event=cancel_event)
+            if outcome is None:
+                break
+            if progress is not None:
+                progress(results, contact, outcome)
+            
+            if attempt == 1:
+                contact = feed.next()
+                if contact is not None:
+                    schedule(contact, 1, max(start_at, time.monotonic()))
+    
+    def _new_results(self) -> Dict:
+        return {
             'success': 0,
             'failed': 0,
-            'failed_contacts': []
+            'skipped': 0,
+            'duplicates': 0,
+            'suppressed': 0,
+            'retried': 0,
+            'cancelled': False,
+            'failed_contacts': [],
+            'sessions': {}
         }
-        
+    
+    def _campaign_start(self, contacts: Iterable[Dict], start_hour: Optional[int],
+                        start_minute: Optional[int]) -> float:
+        """
+        Log the campaign start and return its monotonic start time.
+        """
         # If no start time specified, start immediately
         if start_hour is None or start_minute is None:
-            now = datetime.now()
-            start_hour = now.hour
-            start_minute = now.minute + 1
+            start = datetime.now()
+        else:
+            start = next_occurrence(start_hour, start_minute)
         
-        logging.info(f"Starting bulk message sending to {len(contacts)} contacts")
-        logging.info(f"Start time: {start_hour:02d}:{start_minute:02d}")
+        total = len(contacts) if hasattr(contacts, '__len__') else 'streamed'
+        logging.info(f"Starting bulk message sending to {total} contacts")
+        logging.info(f"Start time: {start:%Y-%m-%d %H:%M:%S}")
+        return monotonic_deadline(start)
+    
+    def _log_completion(self, results: Dict):
+        # Failed contacts are compact records while the campaign runs; callers get plain dicts
+        results['failed_contacts'] = [contact.to_dict() if hasattr(contact, 'to_dict') else contact
+                                      for contact in results['failed_contacts']]
+        if results['duplicates']:
+            logging.info(f"Collapsed {results['duplicates']} duplicate phone numbers")
+        if results['suppressed']:
+            logging.info(f"Skipped {results['suppressed']} suppressed phone numbers")
+        if results['skipped']:
+            logging.info(f"Skipped {results['skipped']} contacts already delivered according to the journal")
+        logging.info(f"Bulk sending completed. Success: {results['success']}, Failed: {results['failed']}")
         
-        for i, contact in enumerate(contacts):
-            try:
-                phone = contact['phone']
-                name = contact.get('name', '')
-                message = contact.get('message', default_message)
-                
-                # Personalize message with name if available
-                if name and '{name}' in message:
-                    message = message.replace('{name}', name)
-                
-                # Calculate send time (add delay between messages)
-                send_time = datetime.now() + timedelta(minutes=i * (self.message_delay / 60))
-                send_hour = send_time.hour
-                send_minute = send_time.minute
-                
-                logging.info(f"Sending message to {phone} ({name}) at {send_hour:02d}:{send_minute:02d}")
-                
-                # Send message
-                kit.sendwhatmsg(
-                    phone_no=phone,
-                    message=message,
-                    time_hour=send_hour,
-                    time_min=send_minute,
-                    wait_time=self.tab_close_delay
-                )
-                
-                results['success'] += 1
-                logging.info(f"Message sent successfully to {phone}")
-                
-                # Wait between messages to avoid being blocked
-                time.sleep(self.message_delay)
-                
-            except Exception as e:
-                logging.error(f"Failed to send message to {contact['phone']}: {e}")
-                results['failed'] += 1
-                results['failed_contacts'].append({
-                    'phone': contact['phone'],
-                    'name': contact.get('name', ''),
-                    'error': str(e)
-                })
+        for session in self.sessions:
+            limiter_stats = session.rate_limiter.stats()
+            logging.info(f"[{session.name}] Rate limiter waited {limiter_stats['total_wait']:.1f}s in total, "
+                         f"effective throughput {limiter_stats['effective_rate'] * 60:.1f} messages/min")
+    
+    def _pending_contacts(self, contacts: Iterable[Dict], journal: Optional[CampaignJournal],
+                          results: Dict, dedupe: bool = True,
+                          cancel_event: Optional[threading.Event] = None,
+                          suppression: Optional[SuppressionStore] = None) -> Iterator[Dict]:
+        """
+        Yield the contacts that still need a message with canonical phone
+        numbers, dropping repeated numbers, suppressed numbers (checked against
+        `suppression`, or the sender's list) and those the journal marks as
+        delivered. Stops early once cancel_event is set.
+        """
+        suppression = suppression or self.suppression
+        index = PhoneIndex() if dedupe else None
+        for contact in contacts:
+            if cancel_event is not None and cancel_event.is_set():
+                return
+            phone = self.normalizer.normalize(contact['phone'])
+            if index is not None and not index.add(phone):
+                results['duplicates'] += 1
+                self.metrics.contacts_skipped.inc(reason='duplicate')
+                continue
+            if suppression is not None and suppression.contains_canonical(phone):
+                results['suppressed'] += 1
+                self.metrics.contacts_skipped.inc(reason='suppressed')
+                continue
+            if journal is not None and journal.is_delivered(phone):
+                results['skipped'] += 1
+                self.metrics.contacts_skipped.inc(reason='delivered')
+                continue
+            if phone != contact['phone']:
+                contact = with_phone(contact, phone)
+            yield contact
+    
+    def _send_contact(self, session: SenderSession, contact: Dict, default_message: str, results: Dict,
+                      journal: Optional[CampaignJournal] = None, attempt: int = 1, requeue=None,
+                      dead_letter: Optional[DeadLetterFile] = None, waited: Optional[float] = None,
+                      result_log: Optional[ResultLog] = None, scheduled_at: Optional[float] = None,
+                      cancel_event: Optional[threading.Event] = None) -> Optional[str]:
+        """
+        Send one message of a bulk campaign through a session and record the
+        outcome in results. Returns the outcome: SENT, RETRY or FAILED, or None
+        if cancel_event was set before the message was handed to the transport.
+        On a retryable failure, requeue(contact, next_attempt, delay) is called.
+        Pass `waited` if the caller already took the session's send slot, and
+        `scheduled_at` (a time.time() value) if the message was due earlier than now.
+        """
+        with self._attempt(session, contact, default_message, results, journal, attempt, requeue, dead_letter,
+                           result_log, scheduled_at) as record:
+            message = self._render_message(contact, default_message)
+            
+            # Wait for a send slot to avoid being blocked
+            if waited is None:
+                waited = self._wait_for_slot(session, cancel_event)
+            self.metrics.schedule_wait_seconds.observe(waited, session=session.name)
+            if cancel_event is not None and cancel_event.is_set():
+                logging.info(f"[{session.name}] Campaign cancelled before messaging {contact['phone']}")
+                record.skip()
+                return None
+            
+            record.sending()
+            with self.metrics.send_seconds.time(session=session.name):
+                session.transport.send(contact['phone'], message)
+        return record.outcome
+    
+    def _attempt(self, session: SenderSession, contact: Dict, default_message: str, results: Dict,
+                 journal: Optional[CampaignJournal] = None, attempt: int = 1, requeue=None,
+                 dead_letter: Optional[DeadLetterFile] = None, result_log: Optional[ResultLog] = None,
+                 scheduled_at: Optional[float] = None) -> _SendAttempt:
+        """Bookkeeping for one send attempt (see _SendAttempt)."""
+        return _SendAttempt(self, session, contact, default_message, results, journal, attempt, requeue,
+                            dead_letter, result_log, scheduled_at)
+    
+    def _wait_for_slot(self, session: SenderSession, cancel_event: Optional[threading.Event] = None) -> float:
+        """
+        Take the session's next send slot and wait for it, stopping early if
+        cancel_event is set. Returns the seconds the slot was reserved ahead.
+        """
+        if cancel_event is None:
+            return session.rate_limiter.acquire()
+        wait = session.rate_limiter.reserve()
+        if wait > 0:
+            SendScheduler(interrupt=cancel_event).sleep_until(time.monotonic() + wait)
+        return wait
+    
+    def _log_attempt(self, result_log: ResultLog, session: SenderSession, contact: Dict, default_message: str,
+                     attempt: int, outcome: str, scheduled_at: float, sent_at: Optional[float],
+                     duration: Optional[float], error: Optional[Exception]):
+        """Record one send attempt in the result log."""
+        template_id = self.templates.compile(self._message_source(contact, default_message)).template_id
+        result_log.record(contact['phone'], template_id, scheduled_at, sent_at, duration, attempt, outcome,
+                          session.name, str(error) if error is not None else None)
+    
+    def _message_source(self, contact: Dict, default_message: str) -> str:
+        """The contact's own message template when present, otherwise the default"""
+        message = contact.get('message')
+        return default_message if is_missing(message) else str(message)
+    
+    def _render_message(self, contact: Dict, default_message: str) -> str:
+        """
+        Personalized message text for a contact.
+        The contact's own message is used when present, otherwise the default;
+        placeholders are filled from the contact's fields (see message_templates).
+        """
+        started = time.perf_counter()
+        rendered = self.templates.render(self._message_source(contact, default_message), contact)
+        self.metrics.render_seconds.observe(time.perf_counter() - started)
+        return rendered
+    
+    def _session_results(self, results: Dict, session: SenderSession) -> Dict:
+        return results['sessions'].setdefault(session.name, {'success': 0, 'failed': 0})
+    
+    def _record_success(self, session: SenderSession, contact: Dict, results: Dict,
+                        journal: Optional[CampaignJournal] = None):
+        session.rate_limiter.record_success()
+        self.metrics.messages_sent.inc(session=session.name)
+        self.metrics.last_success.set(time.time())
+        with self._results_lock:
+            results['success'] += 1
+            self._session_results(results, session)['success'] += 1
+            session.success += 1
+        if journal is not None:
+            journal.record(contact['phone'], SENT, contact.get('name', ''))
+        logging.info(f"Message sent successfully to {contact['phone']}")
+    
+    def _handle_failure(self, session: SenderSession, contact: Dict, error: Exception, default_message: str,
+                        results: Dict, journal: Optional[CampaignJournal] = None, attempt: int = 1,
+                        requeue=None, dead_letter: Optional[DeadLetterFile] = None) -> str:
+        """
+        Requeue a failed contact if the retry policy allows it, otherwise
+        record it as failed. Returns RETRY or FAILED accordingly.
+        """
+        delay = self.retry_policy.next_delay(attempt, error) if requeue is not None else None
+        if delay is None:
+            self._record_failure(session, contact, error, results, journal, attempt)
+            if dead_letter is not None:
+                dead_letter.write(contact, default_message, error, attempt)
+            return FAILED
         
-        logging.info(f"Bulk sending completed. Success: {results['success']}, Failed: {results['failed']}")
-        return results
+        session.rate_limiter.record_failure()
+        self.metrics.messages_retried.inc(session=session.name)
+        logging.warning(f"[{session.name}] Attempt {attempt} to message {contact['phone']} failed: {error}; "
+                        f"retrying in {delay:.1f}s")
+        with self._results_lock:
+            results['retried'] += 1
+        if journal is not None:
+            journal.record(contact['phone'], RETRY, contact.get('name', ''), str(error))
+        requeue(contact, attempt + 1, delay)
+        return RETRY
+    
+    def _record_failure(self, session: SenderSession, contact: Dict, error: Exception, results: Dict,
+                        journal: Optional[CampaignJournal] = None, attempts: int = 1):
+        session.rate_limiter.record_failure()
+        self.metrics.messages_failed.inc(session=session.name)
+        logging.error(f"[{session.name}] Failed to send message to {contact['phone']}: {error}")
+        with self._results_lock:
+            results['failed'] += 1
+            self._session_results(results, session)['failed'] += 1
+            session.failed += 1
+            results['failed_contacts'].append(
+                FailedContact(contact['phone'], contact.get('name', ''), str(error), attempts))
+        if journal is not None:
+            journal.record(contact['phone'], FAILED, contact.get('name', ''), str(error))
     
     def send_single_message(self, phone: str, message: str, hour: int = None, minute: int = None):
         """
@@ -169,20 +706,15 @@ class WhatsAppBulkSender:
         try:
             phone = self._format_phone_number(phone)
             
-            if hour is None or minute is None:
-                now = datetime.now()
-                hour = now.hour
-                minute = now.minute + 1
+            # Send immediately unless a time is given
+            if hour is not None and minute is not None:
+                send_time = next_occurrence(hour, minute)
+                logging.info(f"Waiting until {send_time:%Y-%m-%d %H:%M:%S} to message {phone}")
+                SendScheduler().sleep_until(monotonic_deadline(send_time))
             
-            logging.info(f"Sending message to {phone} at {hour:02d}:{minute:02d}")
+            logging.info(f"Sending message to {phone} at {datetime.now():%H:%M:%S}")
             
-            kit.sendwhatmsg(
-                phone_no=phone,
-                message=message,
-                time_hour=hour,
-                time_min=minute,
-                wait_time=self.tab_close_delay
-            )
+            self.transport.send(phone, message)
             
             logging.info(f"Message sent successfully to {phone}")
             return True
@@ -192,30 +724,40 @@ class WhatsAppBulkSender:
             return False
     
     def schedule_bulk_messages(self, contacts: List[Dict], message: str, 
-                             send_time: str, date: str = None):
+                             send_time: str, date: str = None, store: Optional[CampaignStore] = None) -> int:
         """
-        Schedule bulk messages to be sent at a specific time.
+        Schedule bulk messages to be sent once at a specific time.
+        The campaign is stored on disk and sent by the scheduler daemon
+        (`python cli.py daemon`). Returns the campaign id.
         
         Args:
             contacts: List of contact dictionaries
             message: Message to send
             send_time: Time in HH:MM format
-            date: Date in YYYY-MM-DD format (optional, defaults to today)
+            date: Date in YYYY-MM-DD format (optional, defaults to the next time send_time comes round)
+            store: Campaign store (defaults to SCHEDULE_DB, or scheduled_campaigns.db)
         """
-        def job():
-            self.send_bulk_messages(contacts, message)
+        due = parse_send_time(send_time, date)
         
-        if date:
-            schedule.every().day.at(send_time).do(job).tag(f'bulk_{date}')
-        else:
-            schedule.every().day.at(send_time).do(job)
+        # Stored as JSON, so Contact records become plain dicts
+        spec = {'contacts': [dict(contact) for contact in contacts], 'message': message}
+        owned = store is None
+        store = store or CampaignStore(default_store_path())
+        try:
+            campaign_id = store.add(due, spec)
+        finally:
+            if owned:
+                store.close()
         
-        logging.info(f"Scheduled bulk messages for {send_time}" + (f" on {date}" if date else ""))
+        logging.info(f"Scheduled campaign {campaign_id} for {due:%Y-%m-%d %H:%M} ({len(contacts)} contacts)")
+        return campaign_id
     
     def create_sample_contacts_file(self, file_path: str = "sample_contacts.csv"):
         """
         Create a sample contacts file for reference.
         """
+        import pandas as pd
+        
         sample_data = {
             'phone': ['+91XXXXXXXXXX', '+91XXXXXXXXXX', '+91XXXXXXXXXX'],
             'name': ['John Doe', 'Jane Smith', 'Mike Johnson'],
@@ -235,6 +777,8 @@ def main():
     """
     Main function to demonstrate usage
     """
+    load_environment()
+    setup_logging()
     sender = WhatsAppBulkSender()
     
     print("WhatsApp Bulk Message Sender")